@@ -0,0 +1,47 @@
+# archive_leads.py
+"""
+Run lead retention by hand, or read archived leads back.
+Run:
+    python archive_leads.py                      # archive + scrub using settings
+    python archive_leads.py --days 180           # archive leads older than 180 days
+    python archive_leads.py --read 2024-01-01 2024-02-01 > audit.ndjson
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from bson import json_util
+
+from db import connect_to_mongo, close_mongo_connection
+from services.lead_retention import archive_old_leads, scrub_request_meta, iter_archived_leads
+
+
+async def run(days):
+    await connect_to_mongo()
+    try:
+        scrubbed = await scrub_request_meta()
+        archived = await archive_old_leads(older_than_days=days)
+        print(f"Archived {archived} lead(s); scrubbed request metadata from {scrubbed}")
+    finally:
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lead retention / archive reader")
+    parser.add_argument("--days", type=int, default=None,
+                        help="archive leads older than this many days")
+    parser.add_argument("--read", nargs=2, metavar=("FROM", "TO"),
+                        help="print archived leads created in [FROM, TO) as NDJSON")
+    args = parser.parse_args()
+
+    if args.read:
+        start, end = (datetime.strptime(d, "%Y-%m-%d") for d in args.read)
+        for doc in iter_archived_leads(start, end):
+            print(json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS))
+        return
+
+    asyncio.run(run(args.days))
+
+
+if __name__ == "__main__":
+    main()
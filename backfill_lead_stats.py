@@ -0,0 +1,23 @@
+# backfill_lead_stats.py
+"""
+Rebuild the lead_stats_daily rollups from the full `leads` collection.
+Safe to re-run: every day document is replaced with freshly computed counts.
+Run: python backfill_lead_stats.py
+"""
+import asyncio
+
+from db import connect_to_mongo, close_mongo_connection
+from repositories.lead_stats_repository import rebuild_from_leads
+
+
+async def main():
+    await connect_to_mongo()
+    try:
+        written = await rebuild_from_leads()
+        print(f"Rebuilt lead stats for {written} day(s)")
+    finally:
+        close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+# bench_json.py
+"""
+JSON response cost: the old path (convert ObjectId / datetime by hand, then
+stdlib JSONResponse, as the routes did) vs MongoJSONResponse on raw Mongo
+documents, for the lead submission, login and admin lead-list payloads, plus
+the constant contact-form reply vs PrecomputedJSON.
+Needs no database.
+Run: python bench_json.py [--leads 200] [--number 2000]
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+from repositories.lead_repository import LEAD_FIELDS
+from utils.json_response import MongoJSONResponse, PrecomputedJSON, orjson
+
+
+def make_lead(i: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "name": f"Lead {i}",
+        "email": f"lead{i}@example.com",
+        "company": "Example Pvt Ltd",
+        "platform": "Flutter",
+        "budget": "1L-3L",
+        "timeline": "1-2 months",
+        "message": "We need a cross-platform app with a web admin panel. " * 3,
+        "status": "new",
+        "created_at": datetime(2024, 1, 1) + timedelta(minutes=i),
+    }
+
+
+def old_lead(doc):
+    lead = {f: doc.get(f) for f in LEAD_FIELDS}
+    lead["id"] = str(doc["_id"])
+    lead["created_at"] = lead["created_at"].isoformat()
+    return lead
+
+
+def new_lead(doc):
+    return {**{f: doc.get(f) for f in LEAD_FIELDS}, "id": doc["_id"]}
+
+
+def bench(label: str, old, new, number: int) -> None:
+    assert old().body == new().body, f"{label}: outputs differ"
+    t_old = timeit.timeit(old, number=number) / number * 1e6
+    t_new = timeit.timeit(new, number=number) / number * 1e6
+    print(f"{label:28s} old {t_old:9.1f} us   new {t_new:9.1f} us   x{t_old / t_new:5.1f}")
+
+
+def main(n_leads: int, number: int) -> None:
+    leads = [make_lead(i) for i in range(n_leads)]
+    lead_id = ObjectId()
+    user = {"_id": ObjectId(), "name": "Admin", "email": "admin@example.com"}
+    token = "eyJhbGciOiJIUzI1NiJ9." + "x" * 160
+    contact = {"success": True,
+               "message": "Thank you for your message! We will get back to you soon."}
+    contact_pre = PrecomputedJSON(contact)
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    bench("lead submission",
+          lambda: JSONResponse(
+              {"success": True, "message": "Lead received", "lead_id": str(lead_id)}),
+          lambda: MongoJSONResponse({"success": True, "message": "Lead received", "lead_id": lead_id}),
+          number)
+    bench("login",
+          lambda: JSONResponse(
+              {"success": True, "message": "Login successful", "access_token": token,
+               "token_type": "bearer",
+               "user": {"id": str(user["_id"]), "name": user["name"], "email": user["email"]}}),
+          lambda: MongoJSONResponse(
+              {"success": True, "message": "Login successful", "access_token": token,
+               "token_type": "bearer",
+               "user": {"id": user["_id"], "name": user["name"], "email": user["email"]}}),
+          number)
+    bench(f"lead list ({n_leads})",
+          lambda: JSONResponse(
+              {"success": True, "leads": [old_lead(d) for d in leads], "next_cursor": None}),
+          lambda: MongoJSONResponse(
+              {"success": True, "leads": [new_lead(d) for d in leads], "next_cursor": None}),
+          max(1, number // 20))
+    bench("contact reply (constant)",
+          lambda: JSONResponse(contact),
+          lambda: contact_pre.response(),
+          number)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JSON response encoding")
+    parser.add_argument("--leads", type=int, default=200)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.leads, args.number)
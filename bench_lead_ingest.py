@@ -0,0 +1,107 @@
+# bench_lead_ingest.py
+"""
+Compare lead insert throughput: one insert_one per request vs the
+micro-batched InsertBuffer (services/lead_ingest.py).
+
+By default runs against an in-memory fake collection that sleeps for a
+simulated round trip, so it needs no database:
+    python bench_lead_ingest.py --rtt-ms 20 --pool-size 10 --leads 500
+
+Use --mongo to hit the real MONGO_URI / MONGO_DB (writes to `bench_leads`,
+which is dropped afterwards).
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+from services.lead_ingest import InsertBuffer
+
+
+class FakeCollection:
+    """
+    Models a Motor collection behind a bounded connection pool: each call
+    holds one of `pool_size` connections for one round trip plus a small
+    per-document server cost.
+    """
+
+    def __init__(self, rtt: float, pool_size: int, per_doc: float):
+        self.rtt = rtt
+        self.per_doc = per_doc
+        self.pool = asyncio.Semaphore(pool_size)
+
+    async def insert_one(self, doc):
+        async with self.pool:
+            await asyncio.sleep(self.rtt + self.per_doc)
+        doc.setdefault("_id", ObjectId())
+
+    async def insert_many(self, docs, ordered=True):
+        async with self.pool:
+            await asyncio.sleep(self.rtt + self.per_doc * len(docs))
+
+
+def make_lead(i: int) -> dict:
+    return {
+        "name": f"Bench {i}",
+        "email": f"bench{i}@example.com",
+        "platform": "Web",
+        "budget": "50k-2L",
+        "timeline": "8 weeks",
+        "message": "benchmark lead",
+        "created_at": datetime.utcnow(),
+        "status": "new",
+    }
+
+
+async def run_submitters(submit, total: int, concurrency: int) -> float:
+    counter = iter(range(total))
+
+    async def submitter():
+        for i in counter:
+            await submit(make_lead(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(submitter() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--leads", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--per-doc-ms", type=float, default=0.2)
+    parser.add_argument("--mongo", action="store_true")
+    args = parser.parse_args()
+
+    if args.mongo:
+        from db import connect_to_mongo, get_database, close_mongo_connection
+        await connect_to_mongo()
+        coll = get_database()["bench_leads"]
+    else:
+        coll = FakeCollection(args.rtt_ms / 1000.0, args.pool_size,
+                              args.per_doc_ms / 1000.0)
+
+    print(f"{'submitters':>10} {'insert_one/s':>14} {'batched/s':>12} {'speedup':>8}")
+    for concurrency in (1, 10, 100):
+        async def single(doc):
+            await coll.insert_one(doc)
+
+        t_single = await run_submitters(single, args.leads, concurrency)
+
+        buffer = InsertBuffer(lambda: coll)
+        t_batched = await run_submitters(buffer.insert, args.leads, concurrency)
+        await buffer.close()
+
+        print(f"{concurrency:>10} {args.leads / t_single:>14.1f} "
+              f"{args.leads / t_batched:>12.1f} {t_single / t_batched:>7.1f}x")
+
+    if args.mongo:
+        await coll.drop()
+        close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
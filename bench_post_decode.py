@@ -0,0 +1,99 @@
+# bench_post_decode.py
+"""
+Per-document decode cost of blog post reads: the old path (decode the full
+document, then normalize it in Python) vs PostRepository (decode the
+server-projected document straight into a slotted dataclass).
+Needs no database: documents are BSON-encoded locally to stand in for
+what the server sends back.
+Run: python bench_post_decode.py [--docs 2000] [--content-kb 20]
+"""
+import argparse
+import timeit
+from datetime import datetime
+
+import bson
+from bson import ObjectId
+
+from repositories.post_repository import PostSummary, PostDetail, _CODEC_OPTIONS
+
+
+def make_post(content_kb: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "title": "Building Responsive UIs with Flutter",
+        "slug": "building-responsive-uis-with-flutter",
+        "excerpt": "Discover best practices for creating responsive user interfaces." * 2,
+        "content": "<p>" + "lorem ipsum " * (content_kb * 85) + "</p>",
+        "author": "Manosay Team",
+        "author_id": ObjectId(),
+        "published_date": datetime.utcnow(),
+        "image": "/static/uploads/7fb1292a88e9461288c40c47ca29e8eb.png",
+        "tags": ["Flutter", "UI/UX", "Responsive Design"],
+        "status": "published",
+    }
+
+
+def projected(doc: dict, with_content: bool) -> dict:
+    """What the $project pipeline returns for `doc`."""
+    out = {
+        "id": str(doc["_id"]),
+        "title": doc["title"],
+        "slug": doc["slug"],
+        "excerpt": doc["excerpt"],
+        "author": doc["author"],
+        "image": doc["image"],
+        "tags": doc["tags"],
+        "published_date": doc["published_date"].strftime("%Y-%m-%d"),
+    }
+    if with_content:
+        out["content"] = doc["content"]
+    return out
+
+
+def old_path(raw: bytes) -> dict:
+    doc = bson.decode(raw)
+    doc["_id"] = str(doc["_id"])
+    pd = doc.get("published_date")
+    if pd is not None:
+        try:
+            doc["published_date"] = pd.isoformat()
+        except Exception:
+            pass
+    doc.setdefault("content", "")
+    doc.setdefault("excerpt", "")
+    doc.setdefault("author", "")
+    doc.setdefault("image", "")
+    doc.setdefault("tags", [])
+    return doc
+
+
+def new_path(raw: bytes, cls):
+    return cls(**bson.decode(raw, codec_options=_CODEC_OPTIONS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--content-kb", type=int, default=20)
+    args = parser.parse_args()
+
+    docs = [make_post(args.content_kb) for _ in range(args.docs)]
+    full = [bson.encode(d) for d in docs]
+    summary = [bson.encode(projected(d, False)) for d in docs]
+    detail = [bson.encode(projected(d, True)) for d in docs]
+
+    cases = [
+        ("list (old)", lambda: [old_path(r) for r in full], full),
+        ("list (PostSummary)", lambda: [new_path(r, PostSummary) for r in summary], summary),
+        ("detail (old)", lambda: [old_path(r) for r in full], full),
+        ("detail (PostDetail)", lambda: [new_path(r, PostDetail) for r in detail], detail),
+    ]
+    print(f"{'case':<22} {'us/doc':>8} {'bytes/doc':>10}")
+    for name, fn, raws in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=5))
+        avg_bytes = sum(len(r) for r in raws) // len(raws)
+        print(f"{name:<22} {best / args.docs * 1e6:>8.2f} {avg_bytes:>10}")
+
+
+if __name__ == "__main__":
+    main()
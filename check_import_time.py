@@ -0,0 +1,96 @@
+# check_import_time.py
+"""
+Startup import budget for the web app.
+Runs `python -X importtime -c "import main"` in a fresh interpreter (best of
+--runs), prints the slowest modules and fails (exit 1) when:
+  * importing main takes longer than STARTUP_IMPORT_BUDGET_MS, or
+  * a module that should load lazily (SMTP, email.mime, bcrypt) is imported
+    at startup.
+Run: python check_import_time.py [--runs 3] [--top 15] [--budget-ms 1500]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from config.settings import settings
+
+# must not be on the `import main` path; they are imported where used
+LAZY_MODULES = ("aiosmtplib", "email.mime.multipart", "email.mime.text", "bcrypt")
+
+# (self_us, cumulative_us, indent, module)
+Row = Tuple[int, int, int, str]
+
+
+def _parse(stderr: str) -> List[Row]:
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        module = name.strip()
+        indent = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cumulative_us), indent, module))
+    return rows
+
+
+def _measure() -> List[Row]:
+    env = dict(os.environ)
+    # db.py refuses to import without these; nothing connects at import time
+    env.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    env.setdefault("MONGO_DB", "import_time_check")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit("import main failed")
+    return _parse(proc.stderr)
+
+
+def _total_ms(rows: List[Row]) -> float:
+    # cumulative time of the top-level `main` import
+    return next(cum for _, cum, indent, module in rows
+                if indent == 0 and module == "main") / 1000
+
+
+def main(runs: int, top: int, budget_ms: float) -> int:
+    best = min((_measure() for _ in range(max(1, runs))), key=_total_ms)
+    total = _total_ms(best)
+
+    print(f"slowest modules (self time), best of {runs}:")
+    for self_us, cum_us, _, module in sorted(best, reverse=True)[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  (cumulative {cum_us / 1000:8.1f} ms)  {module}")
+
+    own: Dict[str, int] = {}
+    for _, cum_us, _, module in best:
+        if module.split(".")[0] in ("main", "db", "config", "routes", "services",
+                                    "repositories", "utils", "models"):
+            own[module] = cum_us
+    print("app modules (cumulative):")
+    for module, cum_us in sorted(own.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {cum_us / 1000:8.1f} ms  {module}")
+
+    failed = False
+    eager = sorted({m for _, _, _, m in best if m in LAZY_MODULES})
+    for module in eager:
+        print(f"eager import of lazy module: {module}")
+        failed = True
+
+    print(f"total import time: {total:.1f} ms (budget {budget_ms:.0f} ms)")
+    if total > budget_ms:
+        failed = True
+    print("FAILED" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the startup import-time budget")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=settings.STARTUP_IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.top, args.budget_ms))
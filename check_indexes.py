@@ -0,0 +1,48 @@
+# check_indexes.py
+"""
+Verify MongoDB indexes against repositories/index_registry.py.
+Reports drift (missing / extra / mismatched indexes) and explains every
+registered query shape, failing if any plan uses a COLLSCAN or an
+in-memory SORT. Exit code 1 on any problem, so it can run in CI.
+Run: python check_indexes.py [--build]
+"""
+import argparse
+import asyncio
+import sys
+
+from db import connect_to_mongo, close_mongo_connection, get_database
+from repositories.index_registry import build_indexes, index_drift, verify_query_plans
+
+
+async def main(build: bool) -> int:
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        if build:
+            await build_indexes(db)
+
+        failed = False
+        drift = await index_drift(db)
+        for kind in ("missing", "mismatched", "extra"):
+            for name in drift[kind]:
+                print(f"{kind}: {name}")
+        if drift["missing"] or drift["mismatched"]:
+            failed = True
+
+        problems = await verify_query_plans(db)
+        for problem in problems:
+            print(f"bad plan: {problem}")
+        if problems:
+            failed = True
+
+        print("FAILED" if failed else "OK")
+        return 1 if failed else 0
+    finally:
+        close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check MongoDB indexes and query plans")
+    parser.add_argument("--build", action="store_true", help="build registered indexes first")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.build)))
@@ -0,0 +1,77 @@
+# check_read_routing.py
+"""
+Show where the role-specific database handles in db.py send their reads,
+and check read-your-writes for the admin role.
+
+Needs a replica set to be meaningful; a local three-member one:
+
+    mongod --replSet rs0 --port 27017 --dbpath /tmp/rs0-0 &
+    mongod --replSet rs0 --port 27018 --dbpath /tmp/rs0-1 &
+    mongod --replSet rs0 --port 27019 --dbpath /tmp/rs0-2 &
+    mongosh --port 27017 --eval 'rs.initiate({_id: "rs0", members: [
+        {_id: 0, host: "localhost:27017"},
+        {_id: 1, host: "localhost:27018"},
+        {_id: 2, host: "localhost:27019"}]})'
+
+then MONGO_URI="mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0".
+On a standalone server everything is served by the one node and sessions
+report no operation time.
+Run: python check_read_routing.py [--reads 20]
+"""
+import argparse
+import asyncio
+import sys
+from collections import Counter
+from datetime import datetime
+
+from db import (
+    connect_to_mongo, close_mongo_connection, get_database,
+    causal_session, format_optime,
+)
+
+_COLLECTION = "read_routing_check"
+
+
+async def _served_by(role: str, reads: int) -> Counter:
+    # a real find() goes through server selection for the handle's read preference
+    coll = get_database(role)[_COLLECTION]
+    hosts: Counter = Counter()
+    for _ in range(reads):
+        cursor = coll.find({}).limit(1)
+        await cursor.to_list(length=1)
+        address = cursor.address
+        hosts[f"{address[0]}:{address[1]}" if address else "?"] += 1
+    return hosts
+
+
+async def main(reads: int) -> int:
+    await connect_to_mongo()
+    try:
+        for role in ("primary", "public", "admin"):
+            hosts = await _served_by(role, reads)
+            print(f"{role:8s} reads served by: "
+                  + ", ".join(f"{h} x{n}" for h, n in hosts.most_common()))
+
+        # write on the primary, then read it back through the admin handle in
+        # a fresh session resumed from the write's operation time
+        marker = {"created_at": datetime.utcnow()}
+        async with causal_session() as session:
+            res = await get_database()[_COLLECTION].insert_one(marker, session=session)
+            token = format_optime(session.operation_time)
+        async with causal_session(token) as session:
+            found = await get_database("admin")[_COLLECTION].find_one(
+                {"_id": res.inserted_id}, session=session)
+        await get_database()[_COLLECTION].delete_one({"_id": res.inserted_id})
+
+        print(f"operation time token: {token}")
+        print("read-your-writes: " + ("OK" if found else "FAILED"))
+        return 0 if found else 1
+    finally:
+        close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check read routing per database role")
+    parser.add_argument("--reads", type=int, default=20, help="reads per role")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.reads)))
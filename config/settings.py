@@ -1,9 +1,35 @@
+# config/settings.py
+"""
+Single place configuration is read from the environment. `.env` is loaded
+here, once, on first import; other modules read `settings` instead of
+calling load_dotenv() / os.getenv() themselves.
+"""
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+def _csv_env(name: str, default: str = ""):
+    return [v.strip() for v in os.getenv(name, default).split(",") if v.strip()]
+
+
+def _optional_int_env(name: str):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+
+def _write_concerns_env(name: str, default: str = ""):
+    """Parse "leads=1,users=majority" into {"leads": 1, "users": "majority"}."""
+    result = {}
+    for item in _csv_env(name, default):
+        coll, _, w = item.partition("=")
+        if coll.strip() and w.strip():
+            w = w.strip()
+            result[coll.strip()] = int(w) if w.isdigit() else w
+    return result
+
+
 class Settings:
     # SMTP Configuration
     SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -12,6 +38,206 @@ class Settings:
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
     RECIPIENT_EMAIL = os.getenv("RECIPIENT_EMAIL")
 
+    # Lead notification digest (coalesce bursts of leads into one email)
+    LEAD_DIGEST_ENABLED = os.getenv(
+        "LEAD_DIGEST_ENABLED", "False").lower() == "true"
+    LEAD_DIGEST_WINDOW_SECONDS = float(
+        os.getenv("LEAD_DIGEST_WINDOW_SECONDS", 60))
+    LEAD_DIGEST_MAX_LEADS = int(os.getenv("LEAD_DIGEST_MAX_LEADS", 20))
+    # Urgent leads skip the digest and are emailed immediately
+    LEAD_URGENT_BUDGETS = _csv_env("LEAD_URGENT_BUDGETS", "5L+")
+    LEAD_URGENT_MAX_WEEKS = int(os.getenv("LEAD_URGENT_MAX_WEEKS", 2))
+    LEAD_URGENT_KEYWORDS = _csv_env(
+        "LEAD_URGENT_KEYWORDS", "asap,urgent,immediately")
+
+    # Lead ingestion micro-batching (one insert_many for a burst of leads)
+    LEAD_INGEST_BATCHING = os.getenv(
+        "LEAD_INGEST_BATCHING", "False").lower() == "true"
+    LEAD_INGEST_MAX_BATCH = int(os.getenv("LEAD_INGEST_MAX_BATCH", 50))
+    LEAD_INGEST_MAX_DELAY_MS = float(os.getenv("LEAD_INGEST_MAX_DELAY_MS", 5))
+    LEAD_INGEST_MAX_PENDING = int(os.getenv("LEAD_INGEST_MAX_PENDING", 1000))
+    LEAD_INGEST_MAX_INFLIGHT = int(os.getenv("LEAD_INGEST_MAX_INFLIGHT", 4))
+    LEAD_INGEST_ENQUEUE_TIMEOUT_SECONDS = float(
+        os.getenv("LEAD_INGEST_ENQUEUE_TIMEOUT_SECONDS", 2))
+
+    # MongoDB connection (db.py refuses to import without these)
+    MONGO_URI = os.getenv("MONGO_URI")
+    MONGO_DB = os.getenv("MONGO_DB")
+    # Startup connects in the background; per-round settings, rounds repeat
+    # (with MONGO_CONNECT_RETRY_SECONDS between them) until Mongo answers
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 20000))
+    MONGO_CONNECT_RETRIES = int(os.getenv("MONGO_CONNECT_RETRIES", 5))
+    MONGO_CONNECT_RETRY_SECONDS = float(
+        os.getenv("MONGO_CONNECT_RETRY_SECONDS", 30))
+    # Retry-After sent with 503s while the database is not ready
+    DB_NOT_READY_RETRY_AFTER_SECONDS = int(
+        os.getenv("DB_NOT_READY_RETRY_AFTER_SECONDS", 5))
+
+    # MongoDB connection pool (unset values fall back to the driver defaults)
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 2))
+    MONGO_MAX_IDLE_TIME_MS = _optional_int_env("MONGO_MAX_IDLE_TIME_MS")
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = _optional_int_env(
+        "MONGO_WAIT_QUEUE_TIMEOUT_MS")
+    # Wire compression, in order of preference; entries whose library is not
+    # installed are skipped (zstd -> zstandard, snappy -> python-snappy)
+    MONGO_COMPRESSORS = _csv_env("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+    MONGO_ZLIB_LEVEL = _optional_int_env("MONGO_ZLIB_LEVEL")
+
+    # Read routing for public pages: "secondaryPreferred" or "primary".
+    # Max staleness must be >= 90s (server minimum).
+    MONGO_PUBLIC_READ_PREFERENCE = os.getenv(
+        "MONGO_PUBLIC_READ_PREFERENCE", "secondaryPreferred")
+    MONGO_PUBLIC_MAX_STALENESS_SECONDS = int(
+        os.getenv("MONGO_PUBLIC_MAX_STALENESS_SECONDS", 90))
+
+    # Command monitoring: slow-query log threshold, background explain of
+    # slow query shapes, and per-request X-DB-Calls / X-DB-Time-Ms headers
+    MONGO_SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", 100))
+    MONGO_EXPLAIN_SLOW_QUERIES = os.getenv(
+        "MONGO_EXPLAIN_SLOW_QUERIES", "True").lower() == "true"
+    DB_STATS_HEADERS = os.getenv(
+        "DB_STATS_HEADERS", os.getenv("DEBUG", "False")).lower() == "true"
+
+    # Per-collection write concern, e.g. "leads=1,users=majority"
+    MONGO_WRITE_CONCERNS = _write_concerns_env("MONGO_WRITE_CONCERNS")
+
+    # Duplicate suppression for lead / contact submissions
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+    DUPLICATE_WINDOW_SECONDS = int(os.getenv("DUPLICATE_WINDOW_SECONDS", 600))
+    DUPLICATE_BLOOM_CAPACITY = int(
+        os.getenv("DUPLICATE_BLOOM_CAPACITY", 100000))
+    DUPLICATE_BLOOM_ERROR_RATE = float(
+        os.getenv("DUPLICATE_BLOOM_ERROR_RATE", 0.001))
+
+    # Lead retention / cold archiving
+    LEAD_RETENTION_ENABLED = os.getenv(
+        "LEAD_RETENTION_ENABLED", "False").lower() == "true"
+    LEAD_RETENTION_DAYS = int(os.getenv("LEAD_RETENTION_DAYS", 365))
+    LEAD_RETENTION_INTERVAL_HOURS = float(
+        os.getenv("LEAD_RETENTION_INTERVAL_HOURS", 24))
+    LEAD_RETENTION_BATCH = int(os.getenv("LEAD_RETENTION_BATCH", 1000))
+    LEAD_ARCHIVE_DIR = os.getenv("LEAD_ARCHIVE_DIR", "archives/leads")
+    # ip / user_agent are only kept this long
+    LEAD_META_TTL_DAYS = int(os.getenv("LEAD_META_TTL_DAYS", 30))
+
+    # Logging (utils/log_setup.py): queued, written by a background thread
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | text
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    LOG_DEDUP_SECONDS = float(os.getenv("LOG_DEDUP_SECONDS", 60))
+    ACCESS_LOG_ENABLED = os.getenv("ACCESS_LOG_ENABLED", "True").lower() == "true"
+    ACCESS_LOG_SKIP_PATHS = [p.strip() for p in os.getenv(
+        "ACCESS_LOG_SKIP_PATHS", "/livez,/readyz,/metrics").split(",") if p.strip()]
+
+    # Server-Timing header (db / tpl / ser / app phases) on this fraction of
+    # requests; REQUEST_TIMING_LOG_SAMPLE_RATE also logs them as one JSON line
+    SERVER_TIMING_SAMPLE_RATE = float(os.getenv(
+        "SERVER_TIMING_SAMPLE_RATE", "1" if os.getenv("DEBUG", "False").lower() == "true" else "0"))
+    REQUEST_TIMING_LOG_SAMPLE_RATE = float(
+        os.getenv("REQUEST_TIMING_LOG_SAMPLE_RATE", 0))
+
+    # On-demand request profiler (utils/profiler.py): requests sending
+    # `X-Profile: <PROFILE_TOKEN>` or picked by PROFILE_SAMPLE_RATE are
+    # profiled; the middleware isn't installed at all when both are unset
+    PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 50))
+
+    # Event-loop watchdog (utils/loop_watchdog.py): stalls longer than the
+    # threshold are logged with the loop thread's stack and counted per
+    # route; LOOP_WATCHDOG_STRICT (tests) makes such requests raise
+    LOOP_WATCHDOG_ENABLED = os.getenv(
+        "LOOP_WATCHDOG_ENABLED", "True").lower() == "true"
+    LOOP_WATCHDOG_THRESHOLD_MS = float(os.getenv("LOOP_WATCHDOG_THRESHOLD_MS", 100))
+    LOOP_WATCHDOG_INTERVAL_MS = float(os.getenv("LOOP_WATCHDOG_INTERVAL_MS", 20))
+    LOOP_WATCHDOG_STRICT = os.getenv(
+        "LOOP_WATCHDOG_STRICT", "False").lower() == "true"
+
+    # Published posts cache (PostRepository): fresh for the TTL, then served
+    # stale for up to POST_CACHE_STALE_SECONDS while one request refreshes it.
+    # Per worker; other workers pick up a new post within the TTL
+    POST_CACHE_TTL_SECONDS = float(os.getenv("POST_CACHE_TTL_SECONDS", 30))
+    POST_CACHE_STALE_SECONDS = float(os.getenv("POST_CACHE_STALE_SECONDS", 300))
+    POST_CACHE_MAX_ENTRIES = int(os.getenv("POST_CACHE_MAX_ENTRIES", 1000))
+    # Unknown slugs are remembered separately (so scanners can't evict real
+    # posts) and only briefly
+    POST_MISS_CACHE_SECONDS = float(os.getenv("POST_MISS_CACHE_SECONDS", 10))
+    POST_MISS_CACHE_MAX_ENTRIES = int(os.getenv("POST_MISS_CACHE_MAX_ENTRIES", 256))
+
+    # Blog view counters (services/view_counter.py): buffered in memory and
+    # written every POST_VIEWS_FLUSH_SECONDS; the popular list is refreshed then
+    POST_VIEWS_FLUSH_SECONDS = float(os.getenv("POST_VIEWS_FLUSH_SECONDS", 30))
+    POPULAR_POSTS_COUNT = int(os.getenv("POPULAR_POSTS_COUNT", 5))
+
+    # Admission control (utils/admission.py): in-flight limits per route
+    # class (0 = unlimited) and the loop lag above which sheddable classes
+    # (expensive, default) get a fast 503
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "True").lower() == "true"
+    ADMISSION_LIMIT_EXPENSIVE = int(os.getenv("ADMISSION_LIMIT_EXPENSIVE", 8))
+    ADMISSION_LIMIT_DEFAULT = int(os.getenv("ADMISSION_LIMIT_DEFAULT", 100))
+    ADMISSION_LIMIT_PAGES = int(os.getenv("ADMISSION_LIMIT_PAGES", 200))
+    ADMISSION_LIMIT_STATIC = int(os.getenv("ADMISSION_LIMIT_STATIC", 200))
+    ADMISSION_SHED_LAG_MS = float(os.getenv("ADMISSION_SHED_LAG_MS", 200))
+    ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 2))
+
+    # Response compression (utils/compression.py): br (needs the optional
+    # `brotli` package) or gzip for text-like bodies of at least MIN_BYTES;
+    # bodies (or streamed chunks) over THREAD_MIN_BYTES are compressed off the
+    # event loop, and variants of ETag'd responses are memoized up to CACHE_MAX_BYTES
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+    COMPRESSION_THREAD_MIN_BYTES = int(os.getenv("COMPRESSION_THREAD_MIN_BYTES", 64 * 1024))
+    COMPRESSION_CACHE_MAX_BYTES = int(
+        os.getenv("COMPRESSION_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+    # tracemalloc snapshots kept for /api/admin/memory diffs
+    MEMORY_MAX_SNAPSHOTS = int(os.getenv("MEMORY_MAX_SNAPSHOTS", 5))
+
+    # Health probing (services/health.py); /readyz serves the cached result
+    HEALTH_PROBE_INTERVAL_SECONDS = float(
+        os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", 10))
+    HEALTH_SMTP_PROBE_INTERVAL_SECONDS = float(
+        os.getenv("HEALTH_SMTP_PROBE_INTERVAL_SECONDS", 300))
+    HEALTH_PROBE_TIMEOUT_SECONDS = float(
+        os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", 3))
+    # a check older than this no longer counts as passing
+    HEALTH_STALE_SECONDS = float(os.getenv("HEALTH_STALE_SECONDS", 60))
+    HEALTH_LOOP_LAG_THRESHOLD_MS = float(
+        os.getenv("HEALTH_LOOP_LAG_THRESHOLD_MS", 500))
+    HEALTH_FAILURE_LOG_INTERVAL_SECONDS = float(
+        os.getenv("HEALTH_FAILURE_LOG_INTERVAL_SECONDS", 300))
+
+    # Prefork launcher (serve.py)
+    WEB_CONCURRENCY = _optional_int_env("WEB_CONCURRENCY")  # default: CPU count
+    # recycle a worker after this many requests (+ random jitter); 0 = never
+    SERVE_MAX_REQUESTS = int(os.getenv("SERVE_MAX_REQUESTS", 0))
+    SERVE_MAX_REQUESTS_JITTER = int(os.getenv("SERVE_MAX_REQUESTS_JITTER", 0))
+    # recycle a worker whose RSS grows past this; 0 = never
+    SERVE_MAX_RSS_MB = int(os.getenv("SERVE_MAX_RSS_MB", 0))
+    SERVE_GRACEFUL_TIMEOUT_SECONDS = int(
+        os.getenv("SERVE_GRACEFUL_TIMEOUT_SECONDS", 30))
+    # how often the launcher logs per-worker memory; 0 = only on SIGUSR1
+    SERVE_RSS_REPORT_SECONDS = float(os.getenv("SERVE_RSS_REPORT_SECONDS", 300))
+
+    # GET /metrics (Prometheus text format). Off by default; when enabled it
+    # is only served with `Authorization: Bearer <METRICS_TOKEN>`. Under
+    # serve.py every sample carries a worker="<n>" label, as each scrape
+    # reaches one worker; aggregate with sum(rate(...)) by the other labels
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False").lower() == "true"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+    # Auth
+    JWT_SECRET = os.getenv("JWT_SECRET", "change_this_in_prod")
+    JWT_EXP_HOURS = int(os.getenv("JWT_EXP_HOURS", "24"))
+
+    # `python check_import_time.py` fails when `import main` exceeds this
+    STARTUP_IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", 1500))
+
     # App Configuration
     APP_NAME = "Manosay Contact API"
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
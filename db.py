@@ -1,35 +1,129 @@
 # db.py
 from __future__ import annotations
-import os
 import asyncio
+import importlib.util
+import os
 import logging
+from contextlib import asynccontextmanager
 from typing import Optional, Dict, Any
 
-from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from bson.timestamp import Timestamp
 from pymongo.errors import PyMongoError
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Primary, SecondaryPreferred
+from pymongo.write_concern import WriteConcern
+
+from config.settings import settings
+from utils.mongo_monitoring import pool_metrics, command_metrics
+from utils.log_throttle import LogThrottle
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 # Globals (module-level singletons per process)
 _client: Optional[AsyncIOMotorClient] = None
 _database = None
+# Role-specific handles (see get_database)
+_role_databases: Dict[str, Any] = {}
+# True once connect_to_mongo() has pinged successfully
+_ready = False
 
-# Read env (these should exist in your .env as you provided)
-MONGO_URI: Optional[str] = os.getenv("MONGO_URI")
-MONGO_DB: Optional[str] = os.getenv("MONGO_DB")
+# Read from settings (which loads .env)
+MONGO_URI: Optional[str] = settings.MONGO_URI
+MONGO_DB: Optional[str] = settings.MONGO_DB
 
 # Basic validation
 if not MONGO_URI or not MONGO_DB:
     raise RuntimeError(
         "MONGO_URI and MONGO_DB must be set in environment / .env")
 
+class DatabaseNotReady(RuntimeError):
+    """MongoDB is still connecting (or never connected); main.py maps it to 503."""
+
+
 # Default connection tuning
 _DEFAULT_SERVER_SELECTION_TIMEOUT_MS = 5000
 _DEFAULT_CONNECT_RETRIES = 3
 _DEFAULT_RETRY_BACKOFF_SECONDS = 1.0  # will exponentiate
 
+# Python module each wire compressor needs (zlib is always available)
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+
+def _available_compressors() -> list:
+    available = []
+    for name in settings.MONGO_COMPRESSORS:
+        if name not in _COMPRESSOR_MODULES:
+            logger.warning("Unknown MongoDB compressor %r ignored", name)
+            continue
+        module = _COMPRESSOR_MODULES[name]
+        if module is None or importlib.util.find_spec(module) is not None:
+            available.append(name)
+    return available
+
+
+def _read_preference(max_staleness: int):
+    if settings.MONGO_PUBLIC_READ_PREFERENCE == "primary":
+        return Primary()
+    return SecondaryPreferred(max_staleness=max_staleness)
+
+
+def _build_role_databases() -> Dict[str, Any]:
+    """
+    public: anonymous blog / sitemap / feed reads; may be served by a
+            secondary lagging at most MONGO_PUBLIC_MAX_STALENESS_SECONDS.
+    admin:  secondary-capable too, but with majority read concern so reads
+            in a causally consistent session (causal_session) observe the
+            admin's own earlier writes.
+    """
+    staleness = settings.MONGO_PUBLIC_MAX_STALENESS_SECONDS
+    return {
+        "primary": _database,
+        "public": _client.get_database(
+            MONGO_DB, read_preference=_read_preference(staleness)),
+        "admin": _client.get_database(
+            MONGO_DB, read_preference=_read_preference(staleness),
+            read_concern=ReadConcern("majority")),
+    }
+
+
+def _client_options(server_selection_timeout_ms: int) -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "serverSelectionTimeoutMS": server_selection_timeout_ms,
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "event_listeners": [pool_metrics, command_metrics],
+    }
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    compressors = _available_compressors()
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+        if "zlib" in compressors and settings.MONGO_ZLIB_LEVEL is not None:
+            options["zlibCompressionLevel"] = settings.MONGO_ZLIB_LEVEL
+    return options
+
+
+async def _explain_command(db_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    """Run `explain` (queryPlanner verbosity) for a command; used by the slow-query log."""
+    return await get_client()[db_name].command({"explain": command, "verbosity": "queryPlanner"})
+
+
+async def _prewarm_pool(size: int) -> None:
+    """
+    Open `size` connections up front (concurrent pings each check out their
+    own connection), so the first requests after boot skip the TLS handshake.
+    """
+    if size <= 0 or _client is None:
+        return
+    results = await asyncio.gather(
+        *(_client.admin.command("ping") for _ in range(size)), return_exceptions=True)
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    if failed:
+        logger.warning("MongoDB pool pre-warm: %d/%d pings failed", failed, size)
+
 
 async def connect_to_mongo(
     *,
@@ -38,7 +132,7 @@ async def connect_to_mongo(
     base_backoff: float = _DEFAULT_RETRY_BACKOFF_SECONDS,
 ) -> None:
 
-    global _client, _database
+    global _client, _database, _ready
 
     if _client is not None:
         # already connected
@@ -49,13 +143,17 @@ async def connect_to_mongo(
         try:
             _client = AsyncIOMotorClient(
                 MONGO_URI,
-                serverSelectionTimeoutMS=server_selection_timeout_ms,
+                **_client_options(server_selection_timeout_ms),
             )
             _database = _client[MONGO_DB]
+            _role_databases.update(_build_role_databases())
             # Ping to ensure connectivity
             await _client.admin.command("ping")
             logger.info("Connected to MongoDB (uri=%s, db=%s)",
                         _safe_uri_display(MONGO_URI), MONGO_DB)
+            command_metrics.attach(asyncio.get_running_loop(), _explain_command)
+            await _prewarm_pool(settings.MONGO_MIN_POOL_SIZE)
+            _ready = True
             return
         except Exception as exc:  # broad because Motor/PyMongo can raise different errors
             last_exc = exc
@@ -74,6 +172,7 @@ async def connect_to_mongo(
                     "Error closing partial MongoDB client after failed attempt")
             _client = None
             _database = None
+            _role_databases.clear()
 
             if attempt < max_retries:
                 backoff = base_backoff * (2 ** (attempt - 1))
@@ -87,7 +186,8 @@ async def connect_to_mongo(
 
 
 def close_mongo_connection() -> None:
-    global _client, _database
+    global _client, _database, _ready
+    _ready = False
     if _client:
         try:
             _client.close()
@@ -96,44 +196,123 @@ def close_mongo_connection() -> None:
             logger.exception("Error while closing MongoDB connection")
     _client = None
     _database = None
+    _role_databases.clear()
+
+
+def _reset_after_fork() -> None:
+    """
+    Drop the parent's client in a forked child (serve.py prefork workers).
+    A MongoClient is not fork-safe: its sockets and monitor threads belong
+    to the parent, so each worker connects on its own in its startup event.
+    """
+    global _client, _database, _ready
+    _client = None
+    _database = None
+    _ready = False
+    _role_databases.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def is_ready() -> bool:
+    return _ready
 
 
 def get_client() -> AsyncIOMotorClient:
-    if _client is None:
-        raise RuntimeError(
-            "MongoDB client is not initialized. Call connect_to_mongo() in startup.")
+    if not _ready or _client is None:
+        raise DatabaseNotReady(
+            "MongoDB client is not ready yet (still connecting or connect failed).")
     return _client
 
 
-def get_database():
-    if _database is None:
-        raise RuntimeError(
-            "MongoDB database is not initialized. Call connect_to_mongo() in startup.")
-    return _database
+def get_database(role: str = "primary"):
+    """
+    Database handle for a workload role: "primary" (default, all writes and
+    consistency-sensitive reads), "public" (anonymous page reads, may hit a
+    secondary) or "admin" (use with causal_session for read-your-writes).
+    """
+    if not _ready:
+        raise DatabaseNotReady(
+            "MongoDB database is not ready yet (still connecting or connect failed).")
+    return _role_databases.get(role, _database)
+
+
+def format_optime(ts: Optional[Timestamp]) -> Optional[str]:
+    """Serialize a session operationTime for a cookie ("<time>.<inc>")."""
+    return f"{ts.time}.{ts.inc}" if ts is not None else None
+
+
+def parse_optime(token: Optional[str]) -> Optional[Timestamp]:
+    try:
+        t, i = (token or "").split(".", 1)
+        return Timestamp(int(t), int(i))
+    except (ValueError, TypeError):
+        return None
+
+
+@asynccontextmanager
+async def causal_session(after: Optional[str] = None):
+    """
+    Causally consistent session. Pass the operation-time token saved after
+    an earlier write (format_optime(session.operation_time)) so reads in this
+    session - even from a secondary - see that write.
+    """
+    async with await get_client().start_session(causal_consistency=True) as session:
+        optime = parse_optime(after)
+        if optime is not None:
+            session.advance_operation_time(optime)
+        yield session
+
+
+def get_collection(name: str):
+    """
+    Return a collection handle with the write concern configured for it in
+    MONGO_WRITE_CONCERNS (falls back to the client default).
+    """
+    coll = get_database()[name]
+    w = settings.MONGO_WRITE_CONCERNS.get(name)
+    if w is not None:
+        coll = coll.with_options(write_concern=WriteConcern(w=w))
+    return coll
 
 
 async def ensure_indexes() -> None:
+    """
+    Build every index declared in repositories/index_registry.py and log any
+    drift between the declared and actual indexes.
+    """
+    from repositories.index_registry import build_indexes, index_drift
+
     db = get_database()
     try:
-        # Ensure unique user email
-        await db["users"].create_index("email", unique=True)
-        logger.info("Ensured index: users.email (unique)")
-
-        # Ensure unique slug for posts (so two posts can't share same slug)
-        # NOTE: this will fail if duplicate slugs already exist in the collection.
-        await db["posts"].create_index("slug", unique=True)
-        logger.info("Ensured index: posts.slug (unique)")
+        report = await build_indexes(db)
+        drift = await index_drift(db)
+        if any(drift.values()):
+            logger.warning("Index drift: %s", drift)
+        if report["failed"]:
+            logger.warning("Indexes not built: %s", report["failed"])
     except PyMongoError:
         logger.exception("Failed to ensure indexes on startup")
 
 
+# ping failures during an outage: one warning per interval, not a traceback per probe
+_ping_failures = LogThrottle(settings.HEALTH_FAILURE_LOG_INTERVAL_SECONDS)
+
+
 async def ping_db() -> bool:
+    if not _ready:
+        return False
     try:
-        client = get_client()
-        await client.admin.command("ping")
+        await get_client().admin.command("ping")
+        _ping_failures.reset("ping")
         return True
-    except Exception:
-        logger.exception("DB ping failed")
+    except Exception as exc:
+        allowed, suppressed = _ping_failures.allow("ping")
+        if allowed:
+            logger.warning("DB ping failed: %s%s", exc,
+                           f" ({suppressed} similar suppressed)" if suppressed else "")
         return False
 
 
@@ -142,6 +321,10 @@ def connection_info() -> Dict[str, Any]:
         "uri": _safe_uri_display(MONGO_URI),
         "db": MONGO_DB,
         "connected": _client is not None,
+        "ready": _ready,
+        "compressors": _available_compressors(),
+        "pool": pool_metrics.snapshot(),
+        "commands": command_metrics.snapshot(),
     }
 
 
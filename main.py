@@ -1,51 +1,140 @@
 # main.py
 import os
+import hmac
 import logging
 import asyncio
+import time
 from datetime import datetime
 from typing import List, Optional
 
-from dotenv import load_dotenv
-
-from fastapi import FastAPI, Request, HTTPException, Form
+from fastapi import FastAPI, Request, HTTPException, Form, Header
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from pydantic import BaseModel, EmailStr
 
-# Email
-import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-
-# security / db utils
-import bcrypt
+# db utils (aiosmtplib / email.mime / bcrypt are imported where used, to
+# keep them off the cold-start import path - see check_import_time.py)
 from bson import ObjectId
 
 # Import db helpers (Motor async)
 from db import (
+    DatabaseNotReady,
     get_database,
     connect_to_mongo,
     close_mongo_connection,
     ensure_indexes,
-    ping_db, connection_info
+    connection_info,
+    causal_session,
+)
+from services.idempotency import begin_submission, warm_fingerprints
+from services.health import health_prober
+from repositories.post_repository import post_repository
+from services.view_counter import view_counter
+from utils.mongo_monitoring import RequestDbStats, current_db_stats
+from config.settings import settings
+from utils.json_response import MongoJSONResponse, PrecomputedJSON
+from utils.metrics import (
+    bcrypt_seconds, render_prometheus, smtp_send_failures, smtp_send_seconds, timed,
 )
+from utils.access_log import AccessLogMiddleware
+from utils.admission import AdmissionControlMiddleware
+from utils.compression import CompressionMiddleware
+from utils.log_setup import setup_logging
+from utils.loop_watchdog import LoopWatchdogMiddleware, loop_watchdog
+from utils.profiler import ProfilerMiddleware, profiling_enabled
+from utils.request_metrics import RequestMetricsMiddleware
+from utils.request_timing import (
+    RequestTimings, breakdown, current_timings, sampled, server_timing_header,
+)
+from utils.templating import instrument_templates
 
 # Optional route modules (if present)
 # We'll include them below using try/except to keep app startup resilient.
 # from routes.auth import router as auth_router
 # from routes.admin import router as admin
 
-# Load environment variables
-load_dotenv()
+# Environment variables (.env) are loaded once, by config.settings
 
 # App & logging
-app = FastAPI(title="ManoSay")
+# Queued, non-blocking logging (JSON to stdout); set up before anything logs
+setup_logging()
+
+app = FastAPI(title="ManoSay", default_response_class=MongoJSONResponse)
 logger = logging.getLogger(__name__)
 
-# Configure CORS
+# On-demand request profiler; added first so it is the innermost middleware
+# and runs in the endpoint's task. Not installed at all unless enabled.
+if profiling_enabled():
+    app.add_middleware(ProfilerMiddleware)
+
+# Ties event-loop stalls seen by the watchdog thread to the running route;
+# like the profiler it has to run in the endpoint's task
+if settings.LOOP_WATCHDOG_ENABLED:
+    app.add_middleware(LoopWatchdogMiddleware)
+
+# Request latency per route template + in-flight gauge (served at /metrics)
+app.add_middleware(RequestMetricsMiddleware)
+
+
+
+# Count DB round trips / DB time per request (fed by the Mongo command listener)
+# and, for sampled requests, the Server-Timing phase breakdown
+timing_logger = logging.getLogger("request_timing")
+
+
+@app.middleware("http")
+async def db_stats_middleware(request: Request, call_next):
+    stats = RequestDbStats()
+    token = current_db_stats.set(stats)
+    send_header = sampled(settings.SERVER_TIMING_SAMPLE_RATE)
+    log_line = sampled(settings.REQUEST_TIMING_LOG_SAMPLE_RATE)
+    timings = RequestTimings() if (send_header or log_line) else None
+    timings_token = current_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_db_stats.reset(token)
+        current_timings.reset(timings_token)
+    request.state.db_stats = stats
+    if settings.DB_STATS_HEADERS:
+        response.headers["X-DB-Calls"] = str(stats.calls)
+        response.headers["X-DB-Time-Ms"] = f"{stats.time * 1000:.1f}"
+    if timings is not None:
+        phases = breakdown(timings, stats, time.perf_counter() - start)
+        if send_header:
+            response.headers["Server-Timing"] = server_timing_header(phases)
+        if log_line:
+            route = request.scope.get("route")
+            record = {
+                "method": request.method,
+                "route": route.path if route is not None else request.url.path,
+                "status": response.status_code,
+            }
+            for name, value in phases.items():
+                if name == "db_calls":
+                    record[name] = value
+                else:
+                    record[f"{name}_ms"] = round(value, 2)
+            timing_logger.info("request timing", extra={"timing": record})
+    return response
+
+
+# br / gzip response compression; outside db_stats_middleware so the
+# headers it adds are final when the encoding is chosen
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Admission control / load shedding; outside everything but CORS and the
+# access log, so a rejected request skips the rest of the stack
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
+# Configure CORS; outside admission control so shed 503s carry
+# Access-Control-Allow-Origin and the page's JS can read them (and Retry-After)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:8000",
@@ -53,13 +142,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# Request id + access log; outside admission control so shed requests are
+# logged too
+app.add_middleware(AccessLogMiddleware)
+
+_DB_NOT_READY = PrecomputedJSON({"detail": "Service is starting up, please retry shortly"})
+
+
+# Requests that need Mongo while it is still connecting get a 503 instead
+# of a 500; static files and DB-free pages are served from boot
+@app.exception_handler(DatabaseNotReady)
+async def database_not_ready_handler(request: Request, exc: DatabaseNotReady):
+    return _DB_NOT_READY.response(
+        status_code=503,
+        headers={"Retry-After": str(settings.DB_NOT_READY_RETRY_AFTER_SECONDS)},
+    )
+
 # Static files (CSS, JS, Images)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Templates folder
-templates = Jinja2Templates(directory="templates")
+templates = instrument_templates(Jinja2Templates(directory="templates"))
 
 # Include routers if they exist
 try:
@@ -99,17 +205,50 @@ except ImportError:
 
 @app.on_event("startup")
 async def startup_event():
-    # Initialize Motor client and database
+    # Connect in the background so the app serves static / DB-free pages
+    # right away; DB routes answer 503 (DatabaseNotReady) until it is up
+    app.state.mongo_task = asyncio.create_task(_connect_mongo_background())
+    # Cached DB / SMTP / loop-lag status for /readyz and /api/health
+    health_prober.start()
+    if settings.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
+    if settings.METRICS_ENABLED and not settings.METRICS_TOKEN:
+        logger.warning("METRICS_ENABLED is set but METRICS_TOKEN is empty; /metrics stays off")
+
+
+async def _connect_mongo_background():
+    # Initialize Motor client and database; keep trying until Mongo answers
+    while True:
+        try:
+            await connect_to_mongo(
+                server_selection_timeout_ms=settings.MONGO_CONNECT_TIMEOUT_MS,
+                max_retries=settings.MONGO_CONNECT_RETRIES, base_backoff=1.0)
+            logger.info("Mongo connection info: %s", connection_info())
+            break
+        except Exception:
+            logger.exception("Failed to connect to MongoDB; retrying in %.0fs",
+                             settings.MONGO_CONNECT_RETRY_SECONDS)
+            await asyncio.sleep(settings.MONGO_CONNECT_RETRY_SECONDS)
+
+    # Build indexes in the background so a long build doesn't hold up boot
+    app.state.index_task = asyncio.create_task(_ensure_indexes_background())
+
+    # Periodic flush of buffered post views (also loads the popular list)
+    view_counter.start()
+
+    # Scheduled archiving of old leads (see LEAD_RETENTION_* settings)
+    if settings.LEAD_RETENTION_ENABLED:
+        from services.lead_retention import run_retention_forever
+        app.state.retention_task = asyncio.create_task(run_retention_forever())
+
+    # Re-populate the duplicate-submission Bloom filter after a restart
     try:
-        await connect_to_mongo(server_selection_timeout_ms=20000, max_retries=5, base_backoff=1.0)
-        logger.info("Mongo connection info: %s", connection_info())
+        await warm_fingerprints()
     except Exception:
-        logger.exception(
-            "Failed to connect to MongoDB during startup — aborting startup")
-        # Raise so the process fails (Render will show failing deploy logs)
-        raise
+        logger.exception("warm_fingerprints() failed during startup")
 
-    # Ensure indexes (optional)
+
+async def _ensure_indexes_background():
     try:
         await ensure_indexes()
     except Exception:
@@ -117,7 +256,29 @@ async def startup_event():
 
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
+    health_prober.stop()
+    loop_watchdog.stop()
+    for name in ("mongo_task", "index_task", "retention_task"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+
+    try:
+        await view_counter.close()
+    except Exception:
+        logger.exception("Error while flushing post views on shutdown")
+
+    # Write any buffered leads, then send leads still waiting in the digest
+    try:
+        from routes.leads import lead_digest, lead_ingest
+        await lead_ingest.close()
+        await lead_digest.flush()
+    except ImportError:
+        pass
+    except Exception:
+        logger.exception("Error while flushing lead buffers on shutdown")
+
     try:
         close_mongo_connection()
     except Exception:
@@ -231,6 +392,10 @@ BLOG_POSTS = [
 
 async def send_contact_email(form_data: ContactForm):
     """Send email from contact form (standalone function)."""
+    import aiosmtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
     try:
         msg = MIMEMultipart()
         msg['From'] = SMTP_USERNAME
@@ -248,16 +413,17 @@ async def send_contact_email(form_data: ContactForm):
         msg.attach(MIMEText(body, "plain"))
 
         # Use STARTTLS for port 587
-        await aiosmtplib.send(
-            msg,
-            hostname=SMTP_SERVER,
-            port=SMTP_PORT,
-            username=SMTP_USERNAME,
-            password=SMTP_PASSWORD,
-            start_tls=(SMTP_PORT == 587),
-            use_tls=(SMTP_PORT == 465),
-            timeout=30,
-        )
+        with timed(smtp_send_seconds.labels("contact"), smtp_send_failures.labels("contact")):
+            await aiosmtplib.send(
+                msg,
+                hostname=SMTP_SERVER,
+                port=SMTP_PORT,
+                username=SMTP_USERNAME,
+                password=SMTP_PASSWORD,
+                start_tls=(SMTP_PORT == 587),
+                use_tls=(SMTP_PORT == 465),
+                timeout=30,
+            )
 
         return True
 
@@ -355,55 +521,22 @@ async def home(request: Request):
 # Blog list - load from DB
 @app.get("/blog", response_class=HTMLResponse)
 async def blog_list(request: Request):
-    db = get_database()
-    posts_coll = db["posts"]
-    cursor = posts_coll.find({"status": "published"}
-                             ).sort("published_date", -1)
-    posts = []
-    async for doc in cursor:
-        # convert _id and datetime for templates
-        doc["_id"] = str(doc["_id"])
-        pd = doc.get("published_date")
-        if pd is not None:
-            try:
-                # Motor returns datetime objects already; convert to ISO for template display
-                doc["published_date"] = pd.isoformat()
-            except Exception:
-                pass
-        # ensure required fields exist to avoid template errors
-        doc.setdefault("excerpt", "")
-        doc.setdefault("author", "")
-        doc.setdefault("image", "")
-        doc.setdefault("tags", [])
-        posts.append(doc)
-
-    return templates.TemplateResponse("blog.html", {"request": request, "posts": posts, "page_title": "Blog - Manosay", "active_page": "blog"})
+    # template-ready summaries (normalized server-side by PostRepository)
+    posts = await post_repository.list_published()
+    return templates.TemplateResponse("blog.html", {"request": request, "posts": posts, "popular_posts": view_counter.popular, "page_title": "Blog - Manosay", "active_page": "blog"})
 
 
 # Single blog post - load from DB by slug
 @app.get("/blog/{slug}", response_class=HTMLResponse)
 async def blog_post(request: Request, slug: str):
-    db = get_database()
-    post = await db["posts"].find_one({"slug": slug, "status": "published"})
+    post = await post_repository.get_published(slug)
     if not post:
         # if not found, redirect to blog list
         return RedirectResponse("/blog")
-    # normalize for template
-    post["_id"] = str(post["_id"])
-    pd = post.get("published_date")
-    if pd is not None:
-        try:
-            post["published_date"] = pd.isoformat()
-        except Exception:
-            pass
-    # Ensure fields exist
-    post.setdefault("content", "")
-    post.setdefault("excerpt", "")
-    post.setdefault("author", "")
-    post.setdefault("image", "")
-    post.setdefault("tags", [])
 
-    return templates.TemplateResponse("blog-post.html", {"request": request, "post": post, "page_title": f"{post.get('title','Post')} - Manosay", "active_page": "blog"})
+    # buffered; written in batches by services/view_counter.py
+    view_counter.record(post.slug)
+    return templates.TemplateResponse("blog-post.html", {"request": request, "post": post, "popular_posts": view_counter.popular, "page_title": f"{post.title or 'Post'} - Manosay", "active_page": "blog"})
 
 
 # Privacy policy
@@ -454,8 +587,8 @@ async def admin_login_submit(request: Request, email: str = Form(...), password:
             stored_bytes = bytes(stored)
         else:
             stored_bytes = bytes(stored)
-    except Exception as e:
-        print("Error normalizing stored password:", e)
+    except Exception:
+        logger.warning("Could not normalize stored password for %s", email, exc_info=True)
         stored_bytes = None
 
     if not stored_bytes:
@@ -463,9 +596,11 @@ async def admin_login_submit(request: Request, email: str = Form(...), password:
 
     # Check password
     try:
-        ok = bcrypt.checkpw(password.encode("utf-8"), stored_bytes)
-    except Exception as e:
-        print("bcrypt error:", e)
+        import bcrypt
+        with timed(bcrypt_seconds.labels("verify")):
+            ok = bcrypt.checkpw(password.encode("utf-8"), stored_bytes)
+    except Exception:
+        logger.warning("bcrypt check failed for %s", email, exc_info=True)
         ok = False
 
     if not ok:
@@ -511,23 +646,18 @@ async def admin_dashboard(request: Request):
 
     try:
         user = await users.find_one({"_id": ObjectId(admin_user_id)})
-    except Exception as e:
-        print("Invalid admin_user_id cookie:", e)
+    except Exception:
+        logger.warning("Invalid admin_user_id cookie: %r", admin_user_id)
         user = None
 
     if not user or user.get("role", "").lower() != "admin":
         return RedirectResponse(url="/admin/login")
 
     # fetch recent posts by this admin (optional: fetch all posts)
-    posts_cursor = db["posts"].find(
-        {"author_id": ObjectId(admin_user_id)}).sort("published_date", -1)
-    posts = []
-    async for p in posts_cursor:
-        p["_id"] = str(p["_id"])
-        pd = p.get("published_date")
-        if isinstance(pd, datetime):
-            p["published_date"] = pd.isoformat()
-        posts.append(p)
+    # causal session resumed from the last create-post write (admin_optime
+    # cookie, see routes/admin_web.py) so a new post shows up even on a secondary
+    async with causal_session(request.cookies.get("admin_optime")) as session:
+        posts = await post_repository.list_by_author(ObjectId(admin_user_id), session=session)
 
     return templates.TemplateResponse(
         "admin_dashboard.html",
@@ -537,20 +667,31 @@ async def admin_dashboard(request: Request):
 
 
 # Contact API
+_CONTACT_SUCCESS = PrecomputedJSON({
+    "success": True,
+    "message": "Thank you for your message! We will get back to you soon."
+})
+
+
 @app.post("/api/contact")
-async def submit_contact_form(form_data: ContactForm):
+async def submit_contact_form(form_data: ContactForm, idempotency_key: Optional[str] = Header(None)):
+    # Suppress retries / double submits so they don't send a second email;
+    # best effort, the email still goes out while the database is down
+    submission = await begin_submission("contact", idempotency_key, form_data.email,
+                                        form_data.message, (form_data.name, form_data.subject))
+    if submission.replay:
+        return MongoJSONResponse(status_code=submission.replay["status_code"],
+                                 content=submission.replay["body"],
+                                 headers={"Idempotent-Replayed": "true"})
+
     try:
         # Send email
         await send_contact_email(form_data)
 
-        return JSONResponse(
-            status_code=200,
-            content={
-                "success": True,
-                "message": "Thank you for your message! We will get back to you soon."
-            }
-        )
+        await submission.complete(200, _CONTACT_SUCCESS.content)
+        return _CONTACT_SUCCESS.response(200)
     except Exception as e:
+        await submission.abort()
         logger.exception("Contact form send error")
         raise HTTPException(
             status_code=500,
@@ -558,20 +699,49 @@ async def submit_contact_form(form_data: ContactForm):
         )
 
 
-# Health check (DB-aware)
+# Liveness: the process is up and the event loop answers (no I/O)
+_ALIVE = PrecomputedJSON({"status": "alive"})
+
+
+@app.get("/livez")
+async def livez():
+    return _ALIVE.response()
+
+
+# Readiness: cached composite state from the background prober
+@app.get("/readyz")
+async def readyz():
+    state = health_prober.snapshot()
+    return MongoJSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+
+# Prometheus exposition: routes, templates, MongoDB, SMTP, bcrypt
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404)
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+            token.strip().encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(render_prometheus(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Health check (DB-aware, served from the prober's cache)
 @app.get("/api/health")
 async def health_check():
-    db_ok = False
-    try:
-        db_ok = await ping_db()
-    except Exception:
-        db_ok = False
-
-    status = "healthy" if db_ok else "degraded"
-    return {"status": status, "service": "Manosay API", "db_connected": db_ok}
+    state = health_prober.snapshot()
+    db_check = state["checks"].get("db") or {}
+    return {"status": "healthy" if state["ready"] else "degraded",
+            "service": "Manosay API",
+            "db_connected": bool(db_check.get("ok")),
+            "checks": state["checks"]}
 
 
-# Run local server (for `python main.py`)
+# Run local server (for `python main.py`); production uses `python serve.py`
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # logging goes through utils/log_setup.py; AccessLogMiddleware logs requests
+    uvicorn.run(app, host="0.0.0.0", port=8000, log_config=None, access_log=False)
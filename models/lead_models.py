@@ -0,0 +1,15 @@
+# models/lead_models.py
+from pydantic import BaseModel, Field
+from typing import List
+
+# Lifecycle of a lead in the admin console
+LEAD_STATUSES = ("new", "contacted", "qualified", "won", "lost")
+
+
+class LeadStatusChange(BaseModel):
+    id: str
+    status: str
+
+
+class LeadStatusBulkIn(BaseModel):
+    updates: List[LeadStatusChange] = Field(..., min_length=1, max_length=500)
@@ -0,0 +1,174 @@
+# repositories/index_registry.py
+"""
+Declarative index registry.
+
+Each repository / service declares the indexes it needs right next to the
+queries they serve:
+
+    register_index("posts", [("slug", 1)], unique=True)
+    register_query("posts", "post by slug", {"slug": "x", "status": "published"})
+
+db.ensure_indexes() builds everything registered here, `index_drift()`
+reports differences between declared and actual indexes, and
+`verify_query_plans()` explains every registered query shape and flags
+collection scans or in-memory sorts (run via `python check_indexes.py`).
+"""
+import importlib
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Modules that register indexes / queries; imported before building so the
+# registry is complete no matter which routers happen to be loaded.
+REGISTRY_MODULES = (
+    "repositories.user_repository",
+    "repositories.post_repository",
+    "repositories.post_views_repository",
+    "repositories.lead_repository",
+    "services.idempotency",
+    "services.lead_retention",
+)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        # same naming scheme the server uses by default
+        return "_".join(f"{k}_{d}" for k, d in self.keys)
+
+    def options(self) -> Dict[str, Any]:
+        opts: Dict[str, Any] = {"name": self.name}
+        if self.unique:
+            opts["unique"] = True
+        if self.expire_after_seconds is not None:
+            opts["expireAfterSeconds"] = self.expire_after_seconds
+        return opts
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    collection: str
+    description: str
+    filter: Dict[str, Any]
+    sort: Tuple[Tuple[str, int], ...] = ()
+
+
+_INDEXES: Dict[Tuple[str, str], IndexSpec] = {}
+_QUERIES: List[QueryShape] = []
+
+
+def register_index(collection: str, keys: Sequence[Tuple[str, int]], *,
+                   unique: bool = False, expire_after_seconds: Optional[int] = None) -> IndexSpec:
+    spec = IndexSpec(collection, tuple((k, d) for k, d in keys), unique, expire_after_seconds)
+    _INDEXES[(collection, spec.name)] = spec
+    return spec
+
+
+def register_query(collection: str, description: str, filter: Dict[str, Any],
+                   sort: Sequence[Tuple[str, int]] = ()) -> QueryShape:
+    """Declare a hot query shape; the example values are only used for explain()."""
+    shape = QueryShape(collection, description, filter, tuple(sort))
+    _QUERIES.append(shape)
+    return shape
+
+
+def _load_registry() -> None:
+    for module in REGISTRY_MODULES:
+        importlib.import_module(module)
+
+
+def registered_indexes() -> List[IndexSpec]:
+    _load_registry()
+    return list(_INDEXES.values())
+
+
+def registered_queries() -> List[QueryShape]:
+    _load_registry()
+    return list(_QUERIES)
+
+
+async def build_indexes(db) -> Dict[str, List[str]]:
+    """
+    Create every registered index. Each index is attempted on its own so one
+    failure (e.g. duplicates blocking a unique index) doesn't stop the rest.
+    """
+    report: Dict[str, List[str]] = {"ok": [], "failed": []}
+    for spec in registered_indexes():
+        label = f"{spec.collection}.{spec.name}"
+        try:
+            await db[spec.collection].create_index(list(spec.keys), **spec.options())
+            report["ok"].append(label)
+        except PyMongoError as exc:
+            logger.error("Failed to build index %s: %s", label, exc)
+            report["failed"].append(label)
+    logger.info("Ensured %d indexes (%d failed)", len(report["ok"]), len(report["failed"]))
+    return report
+
+
+async def index_drift(db) -> Dict[str, List[str]]:
+    """Compare declared indexes with what exists on the server."""
+    declared: Dict[str, Dict[str, IndexSpec]] = {}
+    for spec in registered_indexes():
+        declared.setdefault(spec.collection, {})[spec.name] = spec
+
+    drift: Dict[str, List[str]] = {"missing": [], "extra": [], "mismatched": []}
+    for collection, specs in declared.items():
+        actual = await db[collection].index_information()
+        for name, spec in specs.items():
+            info = actual.get(name)
+            if info is None:
+                drift["missing"].append(f"{collection}.{name}")
+                continue
+            if (tuple((k, int(d)) for k, d in info["key"]) != spec.keys
+                    or bool(info.get("unique")) != spec.unique
+                    or info.get("expireAfterSeconds") != spec.expire_after_seconds):
+                drift["mismatched"].append(f"{collection}.{name}")
+        for name in actual:
+            if name != "_id_" and name not in specs:
+                drift["extra"].append(f"{collection}.{name}")
+    return drift
+
+
+def _plan_stages(stage: Optional[Dict[str, Any]]) -> List[str]:
+    if not stage:
+        return []
+    stage = stage.get("queryPlan", stage)
+    names = [stage.get("stage", "?")]
+    names += _plan_stages(stage.get("inputStage"))
+    for child in stage.get("inputStages") or []:
+        names += _plan_stages(child)
+    return names
+
+
+async def verify_query_plans(db) -> List[str]:
+    """
+    Explain every registered query shape; return a problem description for
+    each one whose winning plan contains a COLLSCAN or an in-memory SORT.
+    A missing collection explains as EOF, which proves nothing, so that is
+    reported too: build the indexes (which creates the collections) first.
+    """
+    problems = []
+    for shape in registered_queries():
+        command: Dict[str, Any] = {"find": shape.collection, "filter": shape.filter}
+        if shape.sort:
+            command["sort"] = dict(shape.sort)
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = _plan_stages((explain.get("queryPlanner") or {}).get("winningPlan"))
+        if not stages or stages == ["EOF"]:
+            problems.append(f"{shape.collection}: {shape.description} -> "
+                            f"{' <- '.join(stages) or 'no plan'} (collection missing?)")
+            continue
+        bad = [s for s in stages if s in ("COLLSCAN", "SORT")]
+        if bad:
+            problems.append(f"{shape.collection}: {shape.description} -> {' <- '.join(stages)}")
+    return problems
@@ -0,0 +1,140 @@
+# repositories/lead_repository.py
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+from bson import ObjectId
+from datetime import datetime, timezone
+from pymongo import ReturnDocument, UpdateOne
+from db import get_database
+from repositories.lead_stats_repository import record_status_changes
+from repositories.index_registry import register_index, register_query
+
+# Fields returned to the admin console / CSV export (ip and user agent stay out)
+LEAD_FIELDS = ("name", "email", "company", "platform", "budget",
+               "timeline", "message", "status", "created_at")
+_PROJECTION = {f: 1 for f in LEAD_FIELDS}
+
+# Newest first; _id breaks ties between leads created in the same millisecond
+_SORT = [("created_at", -1), ("_id", -1)]
+
+# Admin console pages / CSV export (optionally filtered), and the retention
+# job's "older than" scan, all walk (created_at, _id)
+register_index("leads", _SORT)
+register_query("leads", "leads, newest first", {}, sort=_SORT)
+register_query("leads", "leads older than cutoff",
+               {"created_at": {"$lt": datetime(2000, 1, 1)}},
+               sort=[("created_at", 1), ("_id", 1)])
+for _field in ("status", "platform", "budget"):
+    register_index("leads", [(_field, 1), *_SORT])
+    register_query("leads", f"leads by {_field}, newest first",
+                   {_field: "example"}, sort=_SORT)
+
+
+def build_lead_filter(status: Optional[str] = None, platform: Optional[str] = None,
+                      budget: Optional[str] = None) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if status:
+        query["status"] = status
+    if platform:
+        query["platform"] = platform
+    if budget:
+        query["budget"] = budget
+    return query
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Opaque keyset cursor: '<created_at epoch ms>.<_id hex>'."""
+    created = doc["created_at"]
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return f"{int(created.timestamp() * 1000)}.{doc['_id']}"
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, ObjectId]]:
+    try:
+        ms, oid = cursor.split(".", 1)
+        created = datetime.fromtimestamp(int(ms) / 1000, tz=timezone.utc)
+        return created.replace(tzinfo=None), ObjectId(oid)
+    except Exception:
+        return None
+
+
+async def find_leads_page(query: Dict[str, Any], limit: int,
+                          after: Optional[Tuple[datetime, ObjectId]] = None
+                          ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Return one page of leads (newest first) and the cursor for the next page,
+    or None when there are no more. Uses (created_at, _id) keyset pagination,
+    so deep pages cost the same as the first one.
+    """
+    db = get_database()
+    page_query = dict(query)
+    if after is not None:
+        created, oid = after
+        page_query["$or"] = [
+            {"created_at": {"$lt": created}},
+            {"created_at": created, "_id": {"$lt": oid}},
+        ]
+    cursor = db["leads"].find(page_query, _PROJECTION).sort(_SORT).limit(limit + 1)
+    docs = await cursor.to_list(length=limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+async def iter_leads(query: Dict[str, Any], batch_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+    """Stream matching leads straight from the cursor (newest first)."""
+    db = get_database()
+    cursor = db["leads"].find(query, _PROJECTION).sort(_SORT).batch_size(batch_size)
+    async for doc in cursor:
+        yield doc
+
+
+async def bulk_update_status(changes: List[Tuple[ObjectId, str]]) -> int:
+    """
+    Apply many status changes in one unordered bulk_write and move the
+    matching counts in the daily rollups; returns the number of leads updated.
+
+    Each update only applies if the lead still has the status read for it,
+    so a concurrent change can't move the rollups twice; leads that changed
+    in between are redone one by one with find_one_and_update, which returns
+    the status it actually replaced. A repeated _id keeps its last status.
+    """
+    wanted = dict(changes)
+    if not wanted:
+        return 0
+    db = get_database()
+    # previous status + creation day, needed to keep the rollups in step
+    before = {}
+    async for doc in db["leads"].find({"_id": {"$in": list(wanted)}},
+                                      {"status": 1, "created_at": 1}):
+        before[doc["_id"]] = doc
+    if not before:
+        return 0
+
+    # BSON dates are millisecond precision; truncate so the value read back
+    # below compares equal
+    now = datetime.utcnow()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    ops = [
+        UpdateOne({"_id": oid, "status": doc.get("status")},
+                  {"$set": {"status": wanted[oid], "status_updated_at": now}})
+        for oid, doc in before.items()
+    ]
+    res = await db["leads"].bulk_write(ops, ordered=False)
+    applied = set(before)
+    if res.matched_count < len(ops):
+        applied = set()
+        async for doc in db["leads"].find({"_id": {"$in": list(before)},
+                                           "status_updated_at": now}, {"status": 1}):
+            if doc.get("status") == wanted[doc["_id"]]:
+                applied.add(doc["_id"])
+
+    moved = [(before[oid].get("created_at"), before[oid].get("status"), wanted[oid])
+             for oid in applied]
+    for oid in before.keys() - applied:
+        prior = await db["leads"].find_one_and_update(
+            {"_id": oid}, {"$set": {"status": wanted[oid], "status_updated_at": now}},
+            projection={"status": 1, "created_at": 1},
+            return_document=ReturnDocument.BEFORE)
+        if prior is not None:
+            moved.append((prior.get("created_at"), prior.get("status"), wanted[oid]))
+    await record_status_changes(moved)
+    return len(moved)
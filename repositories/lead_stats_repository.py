@@ -0,0 +1,120 @@
+# repositories/lead_stats_repository.py
+"""
+Daily lead rollups in `lead_stats_daily`, one document per UTC day:
+
+    {"_id": "2025-01-31", "date": <datetime>, "total": 12,
+     "platform": {"Web": 7, "iOS": 5}, "budget": {...},
+     "timeline": {...}, "status": {"new": 10, "won": 2}}
+
+Counters are maintained with $inc upserts as leads come in and change
+status, so dashboards read a handful of small documents instead of
+aggregating the whole `leads` collection.
+"""
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+from datetime import datetime
+from pymongo import UpdateOne, ReplaceOne
+from db import get_database
+
+STATS_COLLECTION = "lead_stats_daily"
+DIMENSIONS = ("platform", "budget", "timeline", "status")
+
+
+def day_key(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%d")
+
+
+def _value_key(value: Any) -> str:
+    """Make a lead field value safe to use as a Mongo field name."""
+    key = str(value or "").strip().replace(".", "_")
+    if key.startswith("$"):
+        key = "_" + key[1:]
+    return key[:64] or "unknown"
+
+
+def _day_start(day: str) -> datetime:
+    return datetime.strptime(day, "%Y-%m-%d")
+
+
+async def record_lead(lead_doc: Dict[str, Any]) -> None:
+    """Count a newly inserted lead in its day's rollup."""
+    day = day_key(lead_doc["created_at"])
+    inc = {"total": 1}
+    for dim in DIMENSIONS:
+        inc[f"{dim}.{_value_key(lead_doc.get(dim))}"] = 1
+    db = get_database()
+    await db[STATS_COLLECTION].update_one(
+        {"_id": day},
+        {"$inc": inc, "$setOnInsert": {"date": _day_start(day)}},
+        upsert=True,
+    )
+
+
+async def record_status_changes(changes: Iterable[Tuple[datetime, Optional[str], str]]) -> None:
+    """
+    Move counts between statuses for leads whose status changed.
+    `changes` holds (lead created_at, old status, new status).
+    """
+    per_day: Dict[str, Dict[str, int]] = {}
+    for created_at, old, new in changes:
+        if old == new or created_at is None:
+            continue
+        inc = per_day.setdefault(day_key(created_at), {})
+        old_field = f"status.{_value_key(old)}"
+        new_field = f"status.{_value_key(new)}"
+        inc[old_field] = inc.get(old_field, 0) - 1
+        inc[new_field] = inc.get(new_field, 0) + 1
+    if not per_day:
+        return
+    db = get_database()
+    ops = [
+        UpdateOne({"_id": day}, {"$inc": inc, "$setOnInsert": {"date": _day_start(day)}}, upsert=True)
+        for day, inc in per_day.items()
+    ]
+    await db[STATS_COLLECTION].bulk_write(ops, ordered=False)
+
+
+async def find_daily_stats(from_day: str, to_day: str) -> List[Dict[str, Any]]:
+    """Return rollup documents for the inclusive day range, oldest first."""
+    db = get_database()
+    cursor = db[STATS_COLLECTION].find(
+        {"_id": {"$gte": from_day, "$lte": to_day}}).sort("_id", 1)
+    return await cursor.to_list(length=None)
+
+
+async def rebuild_from_leads() -> int:
+    """
+    Recompute every rollup document from the `leads` collection (backfill).
+    Grouping runs server-side, one $group per dimension; returns the
+    number of day documents written.
+    """
+    db = get_database()
+    day_expr = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+    days: Dict[str, Dict[str, Any]] = {}
+
+    totals = db["leads"].aggregate([
+        {"$match": {"created_at": {"$type": "date"}}},
+        {"$group": {"_id": day_expr, "n": {"$sum": 1}}},
+    ])
+    async for row in totals:
+        days[row["_id"]] = {"_id": row["_id"], "date": _day_start(row["_id"]),
+                            "total": row["n"], **{dim: {} for dim in DIMENSIONS}}
+
+    for dim in DIMENSIONS:
+        grouped = db["leads"].aggregate([
+            {"$match": {"created_at": {"$type": "date"}}},
+            {"$group": {"_id": {"day": day_expr, "v": {"$ifNull": [f"${dim}", ""]}},
+                        "n": {"$sum": 1}}},
+        ])
+        async for row in grouped:
+            doc = days.get(row["_id"]["day"])
+            if doc is None:
+                continue
+            key = _value_key(row["_id"]["v"])
+            doc[dim][key] = doc[dim].get(key, 0) + row["n"]
+
+    if days:
+        await db[STATS_COLLECTION].bulk_write(
+            [ReplaceOne({"_id": day}, doc, upsert=True) for day, doc in days.items()],
+            ordered=False,
+        )
+    return len(days)
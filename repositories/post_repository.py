@@ -0,0 +1,179 @@
+# repositories/post_repository.py
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from config.settings import settings
+from db import get_database
+from repositories.index_registry import register_index, register_query
+from utils.memory import register_cache
+from utils.single_flight import SWRCache
+
+# Newest first for blog listings and the admin dashboard
+PUBLISHED_SORT = [("published_date", -1)]
+
+# Slugs are unique so two posts can't share a URL
+# (building this fails if duplicate slugs already exist in the collection)
+register_index("posts", [("slug", 1)], unique=True)
+register_query("posts", "published post by slug",
+               {"slug": "example-post", "status": "published"})
+
+# Blog list: published posts, newest first
+register_index("posts", [("status", 1), ("published_date", -1)])
+register_query("posts", "published posts, newest first",
+               {"status": "published"}, sort=PUBLISHED_SORT)
+
+# Popular posts block: published posts by all-time views
+register_index("posts", [("status", 1), ("views", -1)])
+register_query("posts", "published posts, most viewed first",
+               {"status": "published"}, sort=[("views", -1)])
+
+# Admin dashboard: posts by author, newest first
+register_index("posts", [("author_id", 1), ("published_date", -1)])
+register_query("posts", "posts by author, newest first",
+               {"author_id": ObjectId()}, sort=PUBLISHED_SORT)
+
+
+# ------------------------------------------------------------------------
+# Template-ready post reads
+# ------------------------------------------------------------------------
+# Mongo does the normalization the routes used to do in Python: _id as a
+# string, published_date formatted, missing fields defaulted, and fields the
+# templates never render dropped on the server.
+@dataclass
+class PostSummary:
+    __slots__ = ("id", "title", "slug", "excerpt", "author", "image",
+                 "tags", "published_date")
+    id: str
+    title: str
+    slug: str
+    excerpt: str
+    author: str
+    image: str
+    tags: List[str]
+    published_date: str
+
+
+@dataclass
+class PostDetail(PostSummary):
+    __slots__ = ("content",)
+    content: str
+
+
+_DATE_FORMAT = "%Y-%m-%d"
+
+_SUMMARY_PROJECTION: Dict[str, Any] = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "title": {"$ifNull": ["$title", ""]},
+    "slug": {"$ifNull": ["$slug", ""]},
+    "excerpt": {"$ifNull": ["$excerpt", ""]},
+    "author": {"$ifNull": ["$author", ""]},
+    "image": {"$ifNull": ["$image", ""]},
+    "tags": {"$ifNull": ["$tags", []]},
+    # older documents may hold a string date; pass those through unchanged
+    "published_date": {"$cond": [
+        {"$eq": [{"$type": "$published_date"}, "date"]},
+        {"$dateToString": {"format": _DATE_FORMAT, "date": "$published_date"}},
+        {"$ifNull": ["$published_date", ""]},
+    ]},
+}
+_DETAIL_PROJECTION: Dict[str, Any] = {
+    **_SUMMARY_PROJECTION, "content": {"$ifNull": ["$content", ""]}}
+
+# Decoded documents only ever feed the dataclass constructors below
+_CODEC_OPTIONS = CodecOptions(document_class=dict, tz_aware=False)
+
+
+class PostRepository:
+    """
+    Public reads use the "public" (secondary-preferred) handle and go through
+    a stale-while-revalidate cache with request coalescing, so a viral post
+    costs one query per refresh instead of one per request; call
+    `invalidate_published()` after writing a post. Unknown slugs are kept
+    out of that cache (a scanner would evict the real posts) and remembered
+    in a small short-lived one instead. The admin dashboard reads
+    through the "admin" handle, uncached, inside a causal session so a
+    freshly created post is always visible.
+    """
+
+    def __init__(self):
+        self._published = SWRCache(
+            "published_posts",
+            ttl=settings.POST_CACHE_TTL_SECONDS,
+            stale_ttl=settings.POST_CACHE_STALE_SECONDS,
+            max_entries=settings.POST_CACHE_MAX_ENTRIES,
+            cacheable=lambda value: value is not None,
+        )
+        # slug -> monotonic deadline
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        register_cache("published_posts_missing", lambda: len(self._missing))
+
+    def _posts(self, role: str):
+        return get_database(role).get_collection("posts", codec_options=_CODEC_OPTIONS)
+
+    async def _aggregate(self, pipeline: List[Dict[str, Any]], cls,
+                         role: str = "public", session=None):
+        cursor = self._posts(role).aggregate(pipeline, session=session)
+        return [cls(**doc) async for doc in cursor]
+
+    async def list_published(self, limit: Optional[int] = None) -> List[PostSummary]:
+        return await self._published.get(
+            ("list", limit), lambda: self._load_published_list(limit))
+
+    async def get_published(self, slug: str) -> Optional[PostDetail]:
+        deadline = self._missing.get(slug)
+        if deadline is not None:
+            if time.monotonic() < deadline:
+                return None
+            del self._missing[slug]
+        post = await self._published.get(
+            ("post", slug), lambda: self._load_published_post(slug))
+        if post is None:
+            self._missing[slug] = time.monotonic() + settings.POST_MISS_CACHE_SECONDS
+            while len(self._missing) > settings.POST_MISS_CACHE_MAX_ENTRIES:
+                self._missing.popitem(last=False)
+        return post
+
+    def invalidate_published(self) -> None:
+        self._published.invalidate()
+        self._missing.clear()
+
+    async def _load_published_list(self, limit: Optional[int]) -> List[PostSummary]:
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": {"status": "published"}},
+            {"$sort": dict(PUBLISHED_SORT)},
+        ]
+        if limit:
+            pipeline.append({"$limit": limit})
+        pipeline.append({"$project": _SUMMARY_PROJECTION})
+        return await self._aggregate(pipeline, PostSummary)
+
+    async def _load_published_post(self, slug: str) -> Optional[PostDetail]:
+        posts = await self._aggregate([
+            {"$match": {"slug": slug, "status": "published"}},
+            {"$limit": 1},
+            {"$project": _DETAIL_PROJECTION},
+        ], PostDetail)
+        return posts[0] if posts else None
+
+    async def list_popular(self, limit: int) -> List[PostSummary]:
+        """Most viewed published posts; read by services/view_counter.py."""
+        return await self._aggregate([
+            {"$match": {"status": "published", "views": {"$gt": 0}}},
+            {"$sort": {"views": -1}},
+            {"$limit": limit},
+            {"$project": _SUMMARY_PROJECTION},
+        ], PostSummary)
+
+    async def list_by_author(self, author_id: ObjectId, session=None) -> List[PostSummary]:
+        return await self._aggregate([
+            {"$match": {"author_id": author_id}},
+            {"$sort": dict(PUBLISHED_SORT)},
+            {"$project": _SUMMARY_PROJECTION},
+        ], PostSummary, role="admin", session=session)
+
+
+post_repository = PostRepository()
@@ -0,0 +1,39 @@
+# repositories/post_views_repository.py
+"""
+Blog post view counts, written in batches by services/view_counter.py:
+
+  * posts.views:        all-time count, drives the popular-posts list
+  * post_views_daily:   one document per (day, slug) for trends
+
+    {"day": "2025-01-31", "slug": "my-post", "date": <datetime>, "views": 42}
+"""
+from datetime import datetime
+from typing import Dict
+
+from pymongo import UpdateOne
+
+from db import get_database
+from repositories.index_registry import register_index
+
+DAILY_COLLECTION = "post_views_daily"
+
+# upsert target of every flush; also serves "views per post for a day range"
+register_index(DAILY_COLLECTION, [("day", 1), ("slug", 1)], unique=True)
+# one post's trend, newest day first
+register_index(DAILY_COLLECTION, [("slug", 1), ("day", -1)])
+
+
+async def add_views(counts: Dict[str, int], day: str) -> None:
+    """Apply {slug: views} to posts.views and the day's counters (unordered)."""
+    db = get_database()
+    await db["posts"].bulk_write(
+        [UpdateOne({"slug": slug}, {"$inc": {"views": n}}) for slug, n in counts.items()],
+        ordered=False,
+    )
+    date = datetime.strptime(day, "%Y-%m-%d")
+    await db[DAILY_COLLECTION].bulk_write(
+        [UpdateOne({"day": day, "slug": slug},
+                   {"$inc": {"views": n}, "$setOnInsert": {"date": date}}, upsert=True)
+         for slug, n in counts.items()],
+        ordered=False,
+    )
@@ -3,6 +3,11 @@ from typing import Optional, Dict, Any
 from bson import ObjectId
 from datetime import datetime
 from db import get_database
+from repositories.index_registry import register_index, register_query
+
+# Login / registration look users up by email
+register_index("users", [("email", 1)], unique=True)
+register_query("users", "user by email", {"email": "admin@example.com"})
 
 # Async repository functions using Motor (awaitable)
 
@@ -1,19 +1,45 @@
 # routes/admin.py
-from fastapi import APIRouter, HTTPException, Request, Depends
-from fastapi.responses import JSONResponse, HTMLResponse
+import asyncio
+import csv
+import io
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
 from models.user_models import RegisterIn
-from services.auth_service import find_user_by_email, create_user, get_current_user
+from models.lead_models import LEAD_STATUSES, LeadStatusBulkIn
+from services.auth_service import find_user_by_email, create_user, get_current_user, get_current_admin
+from repositories.lead_repository import (
+    LEAD_FIELDS,
+    build_lead_filter,
+    decode_cursor,
+    find_leads_page,
+    iter_leads,
+    bulk_update_status,
+)
+from repositories.lead_stats_repository import DIMENSIONS, find_daily_stats
+from services.lead_retention import iter_archived_leads
+from bson import json_util
 from db import get_database
+from utils.json_response import MongoJSONResponse
+from utils import memory
+from utils.profiler import list_profiles, profile_path
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+# Flush the CSV buffer to the client once it grows past this many characters
+_CSV_CHUNK_CHARS = 64 * 1024
+
 
 @router.post("/create-admin")
 async def create_admin_account(payload: RegisterIn):
     # Check if admin already exists
     existing_admin = await find_user_by_email(payload.email)
     if existing_admin:
-        return JSONResponse(
+        return MongoJSONResponse(
             status_code=400,
             content={"success": False,
                      "message": "Admin account already exists"}
@@ -22,7 +48,7 @@ async def create_admin_account(payload: RegisterIn):
     try:
         # Create admin account
         admin_id = await create_user(payload.name, payload.email, payload.password)
-        return JSONResponse(
+        return MongoJSONResponse(
             status_code=201,
             content={
                 "success": True,
@@ -33,3 +59,306 @@ async def create_admin_account(payload: RegisterIn):
     except Exception as e:
         raise HTTPException(
             status_code=500, detail="Failed to create admin account")
+
+
+def _serialize_lead(doc):
+    """Lead as CSV-ready strings."""
+    lead = {f: doc.get(f) for f in LEAD_FIELDS}
+    lead["id"] = str(doc["_id"])
+    if lead["created_at"] is not None:
+        lead["created_at"] = lead["created_at"].isoformat()
+    return lead
+
+
+def _lead_json(doc):
+    """Lead for JSON responses; MongoJSONResponse encodes _id / created_at."""
+    return {**{f: doc.get(f) for f in LEAD_FIELDS}, "id": doc["_id"]}
+
+
+@router.get("/leads")
+async def list_leads(
+    status: Optional[str] = None,
+    platform: Optional[str] = None,
+    budget: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    admin=Depends(get_current_admin),
+):
+    """
+    Page through leads newest-first. Pass the returned `next_cursor` back as
+    `cursor` to fetch the following page.
+    """
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    query = build_lead_filter(status, platform, budget)
+    docs, next_cursor = await find_leads_page(query, limit, after)
+    return MongoJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "leads": [_lead_json(d) for d in docs],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@router.get("/leads.csv")
+async def export_leads_csv(
+    status: Optional[str] = None,
+    platform: Optional[str] = None,
+    budget: Optional[str] = None,
+    admin=Depends(get_current_admin),
+):
+    """
+    Stream matching leads as CSV straight from the Mongo cursor, so memory
+    use stays constant regardless of how many leads are exported.
+    """
+    query = build_lead_filter(status, platform, budget)
+
+    async def rows():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(["id", *LEAD_FIELDS])
+        async for doc in iter_leads(query):
+            lead = _serialize_lead(doc)
+            writer.writerow([lead["id"], *(lead[f] or "" for f in LEAD_FIELDS)])
+            if buf.tell() >= _CSV_CHUNK_CHARS:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    return StreamingResponse(
+        rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="leads.csv"'},
+    )
+
+
+@router.post("/leads/status")
+async def update_leads_status(payload: LeadStatusBulkIn, admin=Depends(get_current_admin)):
+    """Change the status of many leads at once (single bulk_write)."""
+    changes = []
+    for item in payload.updates:
+        if item.status not in LEAD_STATUSES:
+            raise HTTPException(
+                status_code=400, detail=f"Invalid status: {item.status}")
+        try:
+            changes.append((ObjectId(item.id), item.status))
+        except Exception:
+            raise HTTPException(
+                status_code=400, detail=f"Invalid lead id: {item.id}")
+
+    modified = await bulk_update_status(changes)
+    return MongoJSONResponse(
+        status_code=200,
+        content={"success": True, "modified": modified}
+    )
+
+
+@router.get("/lead-stats")
+async def lead_stats(
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+    admin=Depends(get_current_admin),
+):
+    """
+    Daily lead counts by platform / budget / timeline / status for an
+    inclusive YYYY-MM-DD range (default: last 30 days), read from the
+    lead_stats_daily rollups.
+    """
+    try:
+        to_day = datetime.strptime(to, "%Y-%m-%d") if to else datetime.utcnow()
+        from_day = datetime.strptime(
+            from_, "%Y-%m-%d") if from_ else to_day - timedelta(days=29)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="Dates must be YYYY-MM-DD")
+    if from_day > to_day:
+        raise HTTPException(status_code=400, detail="`from` is after `to`")
+
+    days = await find_daily_stats(from_day.strftime("%Y-%m-%d"), to_day.strftime("%Y-%m-%d"))
+
+    totals = {"total": 0, **{dim: {} for dim in DIMENSIONS}}
+    daily = []
+    for doc in days:
+        totals["total"] += doc.get("total", 0)
+        for dim in DIMENSIONS:
+            for key, n in (doc.get(dim) or {}).items():
+                totals[dim][key] = totals[dim].get(key, 0) + n
+        daily.append({"day": doc["_id"], "total": doc.get("total", 0),
+                      **{dim: doc.get(dim) or {} for dim in DIMENSIONS}})
+
+    won = totals["status"].get("won", 0)
+    totals["conversion_rate"] = round(
+        won / totals["total"], 4) if totals["total"] else 0.0
+
+    return MongoJSONResponse(
+        status_code=200,
+        content={"success": True, "from": from_day.strftime("%Y-%m-%d"),
+                 "to": to_day.strftime("%Y-%m-%d"), "totals": totals, "daily": daily}
+    )
+
+
+@router.get("/leads/archive")
+async def export_archived_leads(
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+    admin=Depends(get_current_admin),
+):
+    """
+    Stream archived (cold) leads as NDJSON for audits, optionally limited to
+    created_at in [from, to] (YYYY-MM-DD, inclusive).
+    """
+    try:
+        start = datetime.strptime(from_, "%Y-%m-%d") if from_ else None
+        end = datetime.strptime(
+            to, "%Y-%m-%d") + timedelta(days=1) if to else None
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="Dates must be YYYY-MM-DD")
+
+    def lines():
+        for doc in iter_archived_leads(start, end):
+            yield json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/profiles")
+async def list_request_profiles(admin=Depends(get_current_admin)):
+    """Request profiles on disk (newest first); see utils/profiler.py."""
+    return MongoJSONResponse(
+        status_code=200,
+        content={"success": True, "profiles": list_profiles()}
+    )
+
+
+@router.get("/profiles/{name}")
+async def download_request_profile(name: str, admin=Depends(get_current_admin)):
+    """One profile as collapsed stacks (flamegraph.pl / speedscope input)."""
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+
+# ------------------------------------------------------------------------
+# Memory introspection (utils/memory.py)
+#
+# tracemalloc state and snapshots live in one process. Under serve.py each
+# request may reach a different worker, so every response carries the
+# worker's `pid`: keep one keep-alive connection for a whole session (a
+# connection stays on its worker) and pass `?pid=` to have a request that
+# lands elsewhere refused with 409 instead of answered by the wrong worker.
+# Snapshots, diffs and object counts run in the default executor so they
+# don't hold up the event loop (GIL-bound parts can still stall it briefly).
+# ------------------------------------------------------------------------
+def _memory_worker(pid: Optional[int] = Query(None, description="only answer on this worker"),
+                   admin=Depends(get_current_admin)) -> int:
+    # depends on the admin check so the pid is never revealed before auth
+    worker = os.getpid()
+    if pid is not None and pid != worker:
+        raise HTTPException(status_code=409,
+                            detail=f"Reached worker {worker}, not {pid}; retry on another connection")
+    return worker
+
+
+async def _off_loop(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+@router.get("/memory")
+async def memory_summary(worker: int = Depends(_memory_worker),
+                         admin=Depends(get_current_admin)):
+    """RSS / PSS, tracemalloc state, snapshots and registered cache sizes."""
+    summary = await _off_loop(memory.summary)
+    return MongoJSONResponse(
+        status_code=200,
+        content={"success": True, "pid": worker, **summary}
+    )
+
+
+@router.post("/memory/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(1, ge=1, le=25),
+                            worker: int = Depends(_memory_worker),
+                            admin=Depends(get_current_admin)):
+    """Start (or restart) tracemalloc, keeping `frames` frames per allocation."""
+    memory.start_tracing(frames)
+    return MongoJSONResponse(status_code=200,
+                             content={"success": True, "pid": worker, "frames": frames})
+
+
+@router.post("/memory/tracemalloc/stop")
+async def stop_tracemalloc(worker: int = Depends(_memory_worker),
+                           admin=Depends(get_current_admin)):
+    memory.stop_tracing()
+    return MongoJSONResponse(status_code=200, content={"success": True, "pid": worker})
+
+
+@router.post("/memory/snapshots/{name}")
+async def take_memory_snapshot(name: str, worker: int = Depends(_memory_worker),
+                               admin=Depends(get_current_admin)):
+    try:
+        snapshot = await _off_loop(memory.take_snapshot, name)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=f"{e} (pid {worker})")
+    return MongoJSONResponse(status_code=201,
+                             content={"success": True, "pid": worker, **snapshot})
+
+
+@router.get("/memory/snapshots/{name}")
+async def memory_snapshot_top(
+    name: str,
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(25, ge=1, le=500),
+    worker: int = Depends(_memory_worker),
+    admin=Depends(get_current_admin),
+):
+    """Largest allocation sites in one snapshot."""
+    try:
+        stats = await _off_loop(memory.top, name, group_by, limit)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No snapshot named {name} (pid {worker})")
+    return MongoJSONResponse(status_code=200,
+                             content={"success": True, "pid": worker, "stats": stats})
+
+
+@router.get("/memory/diff")
+async def memory_diff(
+    base: str,
+    against: Optional[str] = None,
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(25, ge=1, le=500),
+    worker: int = Depends(_memory_worker),
+    admin=Depends(get_current_admin),
+):
+    """
+    Top allocation changes from snapshot `base` to snapshot `against`
+    (default: now), grouped by file:line, file or traceback.
+    """
+    try:
+        stats = await _off_loop(memory.diff, base, against, group_by, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404,
+                            detail=f"No snapshot named {e.args[0]} (pid {worker})")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=f"{e} (pid {worker})")
+    return MongoJSONResponse(status_code=200,
+                             content={"success": True, "pid": worker, "stats": stats})
+
+
+@router.get("/memory/types")
+async def memory_type_counts(limit: int = Query(30, ge=1, le=500),
+                             worker: int = Depends(_memory_worker),
+                             admin=Depends(get_current_admin)):
+    """Live gc-tracked objects per type, most common first."""
+    types = await _off_loop(memory.type_counts, limit)
+    return MongoJSONResponse(
+        status_code=200,
+        content={"success": True, "pid": worker, "types": types}
+    )
@@ -15,11 +15,16 @@ from uuid import uuid4
 from pathlib import Path
 
 
-from db import get_database
+from db import get_database, causal_session, format_optime
+from repositories.post_repository import post_repository
 
 logger = logging.getLogger(__name__)
 router = APIRouter()  # routes: /admin/login, /admin/logout, /admin/create-post
 
+# operationTime of the admin's last write; the dashboard resumes a causal
+# session from it so the new post shows up even when read from a secondary
+ADMIN_OPTIME_COOKIE = "admin_optime"
+
 
 def get_templates(request: Request) -> Jinja2Templates:
     """
@@ -65,6 +70,7 @@ def admin_logout():
     """
     resp = RedirectResponse(url="/")
     resp.delete_cookie("admin_user_id", path="/")
+    resp.delete_cookie(ADMIN_OPTIME_COOKIE, path="/admin")
     return resp
 
 
@@ -245,11 +251,19 @@ async def admin_create_post(
 
     while True:
         try:
-            result = await posts.insert_one(post_doc)
+            async with causal_session() as session:
+                result = await posts.insert_one(post_doc, session=session)
+                optime = format_optime(session.operation_time)
             inserted_id = str(result.inserted_id)
             logger.info("Admin %s created post %s (%s)",
                         admin_user.get("email"), title, inserted_id)
-            return RedirectResponse(url="/admin/dashboard", status_code=302)
+            # the blog list (and a previously missing slug) must show it now
+            post_repository.invalidate_published()
+            resp = RedirectResponse(url="/admin/dashboard", status_code=302)
+            if optime:
+                resp.set_cookie(ADMIN_OPTIME_COOKIE, optime, httponly=True,
+                                samesite="lax", path="/admin")
+            return resp
         except DuplicateKeyError as dke:
             # If duplicate slug, make a new candidate slug
             attempt += 1
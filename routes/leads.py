@@ -1,22 +1,28 @@
 # routes/leads.py
-from fastapi import APIRouter, Request, BackgroundTasks
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import APIRouter, Request, BackgroundTasks, Header
+from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from db import get_database
+from db import get_collection
 import os
-import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import logging
+from config.settings import settings
+from services.lead_digest import LeadDigest
+from services.lead_ingest import InsertBuffer, IngestBufferFull
+from repositories.lead_stats_repository import record_lead
+from services.idempotency import begin_submission
+from utils.json_response import MongoJSONResponse, PrecomputedJSON
+from utils.memory import register_cache
+from utils.metrics import smtp_send_failures, smtp_send_seconds, timed
+from utils.templating import instrument_templates
 
 router = APIRouter(prefix="/api", tags=["leads"])
 logger = logging.getLogger(__name__)
 
-templates = Jinja2Templates(directory="templates")
+templates = instrument_templates(Jinja2Templates(directory="templates"), "leads")
 
 # Pydantic model for incoming lead
 
@@ -44,6 +50,11 @@ async def _send_lead_email(lead: dict):
         logger.info("SMTP not configured; skipping lead email send")
         return
 
+    # imported on first send, not at startup
+    import aiosmtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
     try:
         msg = MIMEMultipart()
         msg["From"] = SMTP_USERNAME
@@ -63,20 +74,46 @@ async def _send_lead_email(lead: dict):
         )
         msg.attach(MIMEText(body, "plain"))
 
-        await aiosmtplib.send(
-            msg,
-            hostname=SMTP_SERVER,
-            port=SMTP_PORT,
-            username=SMTP_USERNAME,
-            password=SMTP_PASSWORD,
-            start_tls=(SMTP_PORT == 587),
-            timeout=30,
-        )
+        with timed(smtp_send_seconds.labels("lead"), smtp_send_failures.labels("lead")):
+            await aiosmtplib.send(
+                msg,
+                hostname=SMTP_SERVER,
+                port=SMTP_PORT,
+                username=SMTP_USERNAME,
+                password=SMTP_PASSWORD,
+                start_tls=(SMTP_PORT == 587),
+                timeout=30,
+            )
         logger.info("Lead email sent to %s", RECIPIENT_EMAIL)
     except Exception as e:
         logger.exception("Failed to send lead email: %s", e)
 
 
+async def _record_lead_stats(lead_doc: dict):
+    try:
+        await record_lead(lead_doc)
+    except Exception as e:
+        logger.exception("Failed to update lead stats: %s", e)
+
+
+async def _record_request_meta(meta: dict):
+    try:
+        await get_collection("lead_request_meta").insert_one(meta)
+    except Exception as e:
+        logger.exception("Failed to store lead request metadata: %s", e)
+
+
+# Coalesces bursts of leads into one summary email (see LEAD_DIGEST_* settings)
+lead_digest = LeadDigest(send_single=_send_lead_email)
+
+# Collects concurrent lead inserts into one insert_many (see LEAD_INGEST_* settings)
+lead_ingest = InsertBuffer(lambda: get_collection("leads"))
+register_cache("lead_ingest_pending", lambda: lead_ingest.pending_count)
+
+_INGEST_BUSY = PrecomputedJSON(
+    {"success": False, "message": "Too many requests, please retry shortly"})
+
+
 @router.get("/request-quote", response_class=HTMLResponse)
 async def get_request_quote(request: Request):
     return templates.TemplateResponse("request_quote.html", {"request": request})
@@ -85,9 +122,18 @@ async def get_request_quote(request: Request):
 
 
 @router.post("/request-quote")
-async def request_quote(payload: LeadIn, background_tasks: BackgroundTasks, request: Request):
-    db = get_database()
-    leads = db["leads"]
+async def request_quote(payload: LeadIn, background_tasks: BackgroundTasks, request: Request,
+                        idempotency_key: Optional[str] = Header(None)):
+    # Retries (same Idempotency-Key) and double submits (same email, name,
+    # company and message) get the original response back instead of a
+    # second lead and email
+    submission = await begin_submission(
+        "lead", idempotency_key, payload.email, payload.message or "",
+        (payload.name, payload.company or ""))
+    if submission.replay:
+        return MongoJSONResponse(status_code=submission.replay["status_code"],
+                                 content=submission.replay["body"],
+                                 headers={"Idempotent-Replayed": "true"})
 
     lead_doc = {
         "name": payload.name.strip(),
@@ -97,17 +143,42 @@ async def request_quote(payload: LeadIn, background_tasks: BackgroundTasks, requ
         "budget": payload.budget or "",
         "timeline": payload.timeline or "",
         "message": (payload.message or "").strip(),
-        "ip": request.client.host if request.client else None,
-        "user_agent": request.headers.get("user-agent"),
         "created_at": datetime.utcnow(),
         "status": "new"
     }
+    # ip / user agent live in a TTL-indexed side collection, not the hot leads docs
+    request_meta = {
+        "ip": request.client.host if request.client else None,
+        "user_agent": request.headers.get("user-agent"),
+        "created_at": lead_doc["created_at"],
+    }
 
-    # insert to MongoDB (Motor async)
-    res = await leads.insert_one(lead_doc)
-    lead_id = str(res.inserted_id)
-
-    # schedule email notification (non-blocking)
-    background_tasks.add_task(_send_lead_email, {**lead_doc, "id": lead_id})
-
-    return JSONResponse(status_code=201, content={"success": True, "message": "Lead received", "lead_id": lead_id})
+    # insert to MongoDB (Motor async); batching mode shares one insert_many
+    # between concurrent submitters
+    try:
+        if settings.LEAD_INGEST_BATCHING:
+            lead_id = str(await lead_ingest.insert(lead_doc))
+        else:
+            res = await get_collection("leads").insert_one(lead_doc)
+            lead_id = str(res.inserted_id)
+    except IngestBufferFull:
+        await submission.abort()
+        logger.warning("Lead ingest buffer full; rejecting lead")
+        return _INGEST_BUSY.response(503, headers={"Retry-After": "2"})
+    except Exception:
+        await submission.abort()
+        raise
+
+    background_tasks.add_task(_record_request_meta, {**request_meta, "lead_id": lead_doc["_id"]})
+
+    # keep the daily rollups (lead_stats_daily) current, off the response path
+    background_tasks.add_task(_record_lead_stats, lead_doc)
+
+    # schedule email notification (non-blocking); digest mode batches
+    # non-urgent leads into a single summary email
+    notify = lead_digest.submit if settings.LEAD_DIGEST_ENABLED else _send_lead_email
+    background_tasks.add_task(notify, {**lead_doc, "id": lead_id})
+
+    body = {"success": True, "message": "Lead received", "lead_id": lead_id}
+    await submission.complete(201, body)
+    return MongoJSONResponse(status_code=201, content=body)
@@ -0,0 +1,313 @@
+# serve.py
+"""
+Production launcher: one warmed parent, N forked uvicorn workers.
+
+The parent imports `main` once, compiles every template, builds the OpenAPI
+schema, then runs gc.freeze() so the collector never touches (and thereby
+copies) those objects in the children. Workers are forked from that state and
+share its memory copy-on-write. Each worker binds its own SO_REUSEPORT socket
+(kernel load-balances accepts), or all share one listening socket where
+SO_REUSEPORT is unavailable. MongoDB is connected per worker in its startup
+event; db.py drops any inherited client after fork.
+
+Worker recycling:
+  * SERVE_MAX_REQUESTS (+ random SERVE_MAX_REQUESTS_JITTER) requests
+  * RSS above SERVE_MAX_RSS_MB
+A recycled worker finishes in-flight requests and the parent forks a
+replacement from the same warm image.
+
+Signals (to the parent):
+  TERM / INT   graceful shutdown of all workers
+  HUP          rolling restart: start a replacement, wait until it is
+               serving, then stop the old worker - one worker at a time.
+               Code is not re-imported; restart the launcher to deploy.
+  USR1         log per-worker memory now (also every SERVE_RSS_REPORT_SECONDS)
+
+POSIX only; without os.fork it falls back to a single uvicorn process.
+Run: python serve.py [--host 0.0.0.0] [--port 8000] [--workers N]
+"""
+import argparse
+import gc
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from config.settings import settings
+from utils.log_setup import setup_logging, stop_logging
+from utils.metrics import set_constant_labels
+from utils.procstats import memory_info, rss_bytes
+
+logger = logging.getLogger("serve")
+
+_REUSE_PORT = hasattr(socket, "SO_REUSEPORT")
+_RSS_CHECK_SECONDS = 5.0
+
+
+def _preload():
+    """Import and warm the app in the parent; returns (app, templates compiled)."""
+    gc.disable()  # nothing to collect yet; avoids promoting half-built objects
+    import main
+
+    env = main.templates.env
+    names = env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        env.get_template(name)
+    main.app.openapi()
+
+    gc.collect()
+    gc.freeze()
+    return main.app, len(names)
+
+
+def _bind(host: str, port: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _watch_worker(server, started_fd: int, max_rss: int) -> None:
+    """Worker thread: report 'serving' to the parent, enforce the RSS cap."""
+    while not server.started and not server.should_exit:
+        time.sleep(0.05)
+    try:
+        os.write(started_fd, b"1")
+        os.close(started_fd)
+    except OSError:
+        pass
+    while max_rss and not server.should_exit:
+        time.sleep(_RSS_CHECK_SECONDS)
+        rss = rss_bytes()
+        if rss > max_rss:
+            logger.warning("Worker %d RSS %.0f MB over %.0f MB; recycling",
+                           os.getpid(), rss / 2**20, max_rss / 2**20)
+            server.should_exit = True
+
+
+def _run_worker(app, args, shared_sock: Optional[socket.socket], started_fd: int) -> None:
+    import uvicorn
+
+    for sig in (signal.SIGHUP, signal.SIGUSR1, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    gc.enable()
+    random.seed()
+
+    sock = shared_sock or _bind(args.host, args.port, reuse_port=True)
+    max_requests = settings.SERVE_MAX_REQUESTS
+    if max_requests:
+        max_requests += random.randint(0, max(0, settings.SERVE_MAX_REQUESTS_JITTER))
+    config = uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        lifespan="on",
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=settings.SERVE_GRACEFUL_TIMEOUT_SECONDS,
+        proxy_headers=True,
+        # logging is set up by utils/log_setup.py; requests are logged by
+        # AccessLogMiddleware
+        log_config=None,
+        access_log=False,
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(
+        target=_watch_worker,
+        args=(server, started_fd, settings.SERVE_MAX_RSS_MB * 2**20),
+        daemon=True,
+    ).start()
+    server.run(sockets=[sock])
+
+
+class Arbiter:
+    def __init__(self, app, args):
+        self.app = app
+        self.args = args
+        self.shared_sock = None if _REUSE_PORT else _bind(args.host, args.port, reuse_port=False)
+        self.workers: Dict[int, int] = {}  # pid -> worker number
+        self.started_at: Dict[int, float] = {}
+        self.retiring: Set[int] = set()
+        self.stopping = False
+        self._restart_requested = False
+        self._report_requested = False
+
+    # -- workers -----------------------------------------------------------
+    def spawn(self, number: int) -> Tuple[int, int]:
+        """Fork a worker; returns (pid, fd readable once it is serving)."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            # each worker has its own counters; tell their series apart
+            set_constant_labels(worker=str(number))
+            code = 0
+            try:
+                _run_worker(self.app, self.args, self.shared_sock, write_fd)
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                stop_logging()
+                logging.shutdown()
+                os._exit(code)
+        os.close(write_fd)
+        self.workers[pid] = number
+        self.started_at[pid] = time.monotonic()
+        logger.info("Started worker %d (pid %d)", number, pid)
+        return pid, read_fd
+
+    def spawn_detached(self, number: int) -> int:
+        pid, fd = self.spawn(number)
+        os.close(fd)
+        return pid
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            number = self.workers.pop(pid, None)
+            started = self.started_at.pop(pid, time.monotonic())
+            code = os.waitstatus_to_exitcode(status)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            if number is None or self.stopping:
+                continue
+            logger.info("Worker %d (pid %d) exited with %d; replacing", number, pid, code)
+            if code != 0 and time.monotonic() - started < 2:
+                time.sleep(1)  # crash loop: don't fork as fast as we can
+            self.spawn_detached(number)
+
+    def rolling_restart(self) -> None:
+        logger.info("Rolling restart of %d workers", len(self.workers))
+        for old_pid, number in list(self.workers.items()):
+            if self.stopping:
+                return
+            new_pid, fd = self.spawn(number)
+            ready, _, _ = select.select([fd], [], [], settings.SERVE_GRACEFUL_TIMEOUT_SECONDS)
+            os.close(fd)
+            if not ready:
+                logger.warning("Replacement worker %d (pid %d) not serving; keeping pid %d",
+                               number, new_pid, old_pid)
+                self.retiring.add(new_pid)
+                self.workers.pop(new_pid, None)
+                self._signal(new_pid, signal.SIGTERM)
+                continue
+            self.retiring.add(old_pid)
+            self.workers.pop(old_pid, None)
+            self._signal(old_pid, signal.SIGTERM)
+        logger.info("Rolling restart complete")
+
+    def report(self) -> None:
+        total_pss = 0
+        own = memory_info()
+        lines = [f"parent pid {os.getpid()}: rss {own.get('rss', 0) / 2**20:.1f} MB"]
+        for pid, number in sorted(self.workers.items(), key=lambda kv: kv[1]):
+            info = memory_info(pid)
+            total_pss += info.get("pss", 0)
+            lines.append(
+                f"worker {number} pid {pid}: rss {info.get('rss', 0) / 2**20:.1f} MB"
+                f" pss {info.get('pss', 0) / 2**20:.1f} MB"
+                f" private {info.get('private_dirty', 0) / 2**20:.1f} MB"
+                f" shared {info.get('shared', 0) / 2**20:.1f} MB")
+        if total_pss:
+            lines.append(f"total pss (parent + workers) {(total_pss + own.get('pss', 0)) / 2**20:.1f} MB")
+        logger.info("Memory:\n  %s", "\n  ".join(lines))
+
+    # -- lifecycle ---------------------------------------------------------
+    @staticmethod
+    def _signal(pid: int, sig) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _on_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def _on_hup(self, signum, frame) -> None:
+        self._restart_requested = True
+
+    def _on_usr1(self, signum, frame) -> None:
+        self._report_requested = True
+
+    def run(self, count: int) -> int:
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+        signal.signal(signal.SIGUSR1, self._on_usr1)
+
+        for number in range(count):
+            self.spawn_detached(number)
+
+        interval = settings.SERVE_RSS_REPORT_SECONDS
+        next_report = time.monotonic() + interval if interval else None
+        while not self.stopping:
+            self.reap()
+            if self._restart_requested:
+                self._restart_requested = False
+                self.rolling_restart()
+            if self._report_requested or (next_report and time.monotonic() >= next_report):
+                self._report_requested = False
+                self.report()
+                if interval:
+                    next_report = time.monotonic() + interval
+            time.sleep(0.5)
+
+        return self.shutdown()
+
+    def shutdown(self) -> int:
+        logger.info("Stopping %d workers", len(self.workers))
+        for pid in list(self.workers) + list(self.retiring):
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + settings.SERVE_GRACEFUL_TIMEOUT_SECONDS + 5
+        while (self.workers or self.retiring) and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers) + list(self.retiring):
+            logger.warning("Worker pid %d did not stop in time; killing", pid)
+            self._signal(pid, signal.SIGKILL)
+        return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the app with prefork workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int,
+                        default=settings.WEB_CONCURRENCY or os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    setup_logging()
+
+    if not hasattr(os, "fork"):
+        import uvicorn
+        logger.warning("os.fork unavailable; running a single worker")
+        uvicorn.run("main:app", host=args.host, port=args.port,
+                    log_config=None, access_log=False)
+        return 0
+
+    start = time.perf_counter()
+    app, templates = _preload()
+    logger.info("Preloaded app in %.0f ms (%d templates compiled, %d objects frozen)",
+                (time.perf_counter() - start) * 1000, templates, gc.get_freeze_count())
+    return Arbiter(app, args).run(max(1, args.workers))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
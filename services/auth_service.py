@@ -1,24 +1,21 @@
 # services/auth_service.py
-import os
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
-import bcrypt
 import jwt
-from dotenv import load_dotenv
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 # async repository functions (Motor)
-from repositories.user_repository import find_by_email, insert_user
-
-load_dotenv()
+from repositories.user_repository import find_by_email, insert_user, find_user_by_id
+from config.settings import settings
+from utils.metrics import bcrypt_seconds, timed
 
 # JWT config
-JWT_SECRET = os.getenv("JWT_SECRET", "change_this_in_prod")
+JWT_SECRET = settings.JWT_SECRET
 JWT_ALGORITHM = "HS256"
-JWT_EXP_HOURS = int(os.getenv("JWT_EXP_HOURS", "24"))
+JWT_EXP_HOURS = settings.JWT_EXP_HOURS
 
 security = HTTPBearer()
 
@@ -28,14 +25,18 @@ security = HTTPBearer()
 # -------------------------
 def _hash_password_sync(password: str) -> bytes:
     """Return bcrypt hash bytes (sync)."""
+    import bcrypt  # lazy: only needed at login / user creation
     salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode("utf-8"), salt)
+    with timed(bcrypt_seconds.labels("hash")):
+        return bcrypt.hashpw(password.encode("utf-8"), salt)
 
 
 def _verify_password_sync(plain: str, hashed: str) -> bool:
     """Verify plaintext against stored bcrypt hash (stored as UTF-8 string)."""
+    import bcrypt
     try:
-        return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+        with timed(bcrypt_seconds.labels("verify")):
+            return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
     except Exception:
         # fallback if stored is bytes-like
         try:
@@ -132,3 +133,22 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
+
+
+# -------------------------
+# Dependency for cookie-authenticated admin APIs (same cookie as /admin pages)
+# -------------------------
+async def get_current_admin(request: Request) -> Dict[str, Any]:
+    admin_user_id = request.cookies.get("admin_user_id")
+    if not admin_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+        )
+    user = await find_user_by_id(admin_user_id)
+    if not user or (user.get("role") or "").lower() != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized",
+        )
+    return user
@@ -0,0 +1,175 @@
+# services/health.py
+"""
+Background health prober.
+
+Probes run on their own schedule and cache the result, so health endpoints
+never touch a dependency themselves:
+
+  * db:        `ping` against MongoDB every HEALTH_PROBE_INTERVAL_SECONDS
+  * smtp:      TCP connect + banner from the SMTP server (informational; a
+               mail outage doesn't take the instance out of rotation)
+  * loop_lag:  how late a short asyncio.sleep() wakes up; a blocked event
+               loop shows up here before requests start timing out
+
+`/livez` needs none of this; `/readyz` and `/api/health` serve `snapshot()`.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+from db import get_client, is_ready
+from utils.log_throttle import LogThrottle
+
+logger = logging.getLogger(__name__)
+
+_LAG_SAMPLE_SECONDS = 0.5
+
+# one failure log per check per interval while a dependency is down
+_failures = LogThrottle(settings.HEALTH_FAILURE_LOG_INTERVAL_SECONDS)
+
+
+class HealthProber:
+    def __init__(self):
+        self._checks: Dict[str, Dict[str, Any]] = {}
+        self._max_lag_ms = 0.0
+        self._tasks = []
+
+    # -- recording ---------------------------------------------------------
+    def _record(self, name: str, ok: bool, latency_ms: Optional[float] = None,
+                error: Optional[str] = None, **extra: Any) -> None:
+        self._checks[name] = {
+            "ok": ok,
+            "checked_at": datetime.utcnow().isoformat() + "Z",
+            "checked_mono": time.monotonic(),
+            "latency_ms": round(latency_ms, 1) if latency_ms is not None else None,
+            "error": error,
+            **extra,
+        }
+        if ok:
+            if _failures.reset(name):
+                logger.info("Health check %s recovered", name)
+            return
+        allowed, suppressed = _failures.allow(name)
+        if allowed:
+            logger.warning("Health check %s failing: %s%s", name, error,
+                           f" ({suppressed} similar suppressed)" if suppressed else "")
+
+    # -- probes ------------------------------------------------------------
+    async def probe_db(self) -> None:
+        if not is_ready():
+            self._record("db", False, error="connecting")
+            return
+        start = time.perf_counter()
+        ok, error = True, None
+        try:
+            await asyncio.wait_for(get_client().admin.command("ping"),
+                                   settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            ok, error = False, "timeout"
+        except Exception as exc:
+            ok, error = False, f"{type(exc).__name__}: {exc}"
+        self._record("db", ok, (time.perf_counter() - start) * 1000, error)
+
+    async def probe_smtp(self) -> None:
+        if not settings.SMTP_USERNAME:
+            self._record("smtp", True, configured=False)
+            return
+        start = time.perf_counter()
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(settings.SMTP_SERVER, settings.SMTP_PORT,
+                                        ssl=(settings.SMTP_PORT == 465)),
+                settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+            banner = await asyncio.wait_for(reader.readline(), settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+            ok = banner.startswith(b"220")
+            error = None if ok else f"unexpected banner {banner[:40]!r}"
+        except (OSError, asyncio.TimeoutError) as exc:
+            ok, error = False, f"{type(exc).__name__}: {exc}"
+        finally:
+            if writer is not None:
+                writer.close()
+        self._record("smtp", ok, (time.perf_counter() - start) * 1000, error, configured=True)
+
+    def _record_loop_lag(self) -> None:
+        lag = self._max_lag_ms
+        self._max_lag_ms = 0.0
+        threshold = settings.HEALTH_LOOP_LAG_THRESHOLD_MS
+        self._record("loop_lag", lag <= threshold, lag,
+                     None if lag <= threshold else f"{lag:.0f}ms > {threshold:.0f}ms")
+
+    # -- loops -------------------------------------------------------------
+    async def _lag_loop(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(_LAG_SAMPLE_SECONDS)
+            lag = (time.perf_counter() - start - _LAG_SAMPLE_SECONDS) * 1000
+            self._max_lag_ms = max(self._max_lag_ms, lag)
+
+    async def _probe_loop(self, probe, interval: float) -> None:
+        while True:
+            try:
+                await probe()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Health probe %s crashed", getattr(probe, "__name__", probe))
+            await asyncio.sleep(interval)
+
+    async def _lag_report_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.HEALTH_PROBE_INTERVAL_SECONDS)
+            self._record_loop_lag()
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        interval = settings.HEALTH_PROBE_INTERVAL_SECONDS
+        self._record_loop_lag()
+        self._tasks = [
+            asyncio.create_task(self._lag_loop()),
+            asyncio.create_task(self._lag_report_loop()),
+            asyncio.create_task(self._probe_loop(self.probe_db, interval)),
+            asyncio.create_task(self._probe_loop(
+                self.probe_smtp, settings.HEALTH_SMTP_PROBE_INTERVAL_SECONDS)),
+        ]
+
+    def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    # -- reading -----------------------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Cached composite state. Ready means: the db check passed and is not
+        stale, and the event loop isn't lagging. SMTP only marks "degraded".
+        """
+        now = time.monotonic()
+        stale_after = settings.HEALTH_STALE_SECONDS
+        checks: Dict[str, Dict[str, Any]] = {}
+        for name, check in self._checks.items():
+            check = dict(check)
+            age = now - check.pop("checked_mono")
+            check["age_seconds"] = round(age, 1)
+            check["stale"] = age > stale_after
+            checks[name] = check
+
+        def passing(name: str) -> bool:
+            check = checks.get(name)
+            return bool(check and check["ok"] and not check["stale"])
+
+        ready = passing("db") and checks.get("loop_lag", {}).get("ok", True)
+        if not ready:
+            status = "unavailable"
+        elif not passing("smtp") and "smtp" in checks:
+            status = "degraded"
+        else:
+            status = "healthy"
+        return {"ready": ready, "status": status, "checks": checks}
+
+
+health_prober = HealthProber()
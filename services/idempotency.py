@@ -0,0 +1,200 @@
+# services/idempotency.py
+"""
+Duplicate suppression for public form submissions (leads, contact).
+
+Two layers:
+  * Idempotency-Key header: the first response for a key is stored in
+    `idempotency_keys` (TTL-indexed) and replayed for retries of that key.
+  * Content fingerprint (email + message + the caller's identifying fields,
+    e.g. name and subject): checked against an in-memory
+    rotating Bloom filter first; only a possible hit costs a lookup in
+    `submission_fingerprints` (TTL-indexed). Fingerprints are claimed with
+    an insert on the unique _id, so concurrent double-clicks across workers
+    resolve to a single submission.
+
+Dedupe is best effort: if MongoDB is down or still connecting the
+submission goes ahead unchecked, so the contact form keeps working on
+SMTP alone.
+"""
+import hashlib
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from config.settings import settings
+from db import DatabaseNotReady, get_database
+from repositories.index_registry import register_index
+from utils.bloom import RotatingBloomFilter
+from utils.memory import register_cache
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_COLLECTION = "idempotency_keys"
+FINGERPRINT_COLLECTION = "submission_fingerprints"
+
+_WS_RE = re.compile(r"\s+")
+
+# Both collections clean themselves up (TTL)
+register_index(IDEMPOTENCY_COLLECTION, [("created_at", 1)],
+               expire_after_seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+register_index(FINGERPRINT_COLLECTION, [("created_at", 1)],
+               expire_after_seconds=settings.DUPLICATE_WINDOW_SECONDS)
+
+recent_fingerprints = RotatingBloomFilter(
+    capacity=settings.DUPLICATE_BLOOM_CAPACITY,
+    error_rate=settings.DUPLICATE_BLOOM_ERROR_RATE,
+    window_seconds=settings.DUPLICATE_WINDOW_SECONDS,
+)
+register_cache("recent_fingerprints", lambda: recent_fingerprints.count)
+
+
+def fingerprint(email: str, message: str, fields: Sequence[str] = ()) -> str:
+    """Content hash of a submission, insensitive to case and whitespace."""
+    normalized = "\n".join(_WS_RE.sub(" ", (part or "").strip().lower())
+                           for part in (email, message, *fields))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class Submission:
+    """
+    Result of `begin_submission`. If `replay` is set the caller must return
+    it instead of processing; otherwise process, then call `complete` (or
+    `abort` on failure so the client may retry).
+    """
+
+    def __init__(self, scope: str, key: Optional[str], fp: str,
+                 replay: Optional[Dict[str, Any]] = None, claimed: bool = True):
+        self.scope = scope
+        self.key = key
+        self.fp = fp
+        self.replay = replay
+        # False when the database was unavailable: nothing to store or release
+        self.claimed = claimed
+
+    async def complete(self, status_code: int, body: Dict[str, Any]) -> None:
+        if not self.claimed:
+            return
+        db = get_database()
+        response = {"status_code": status_code, "body": body}
+        try:
+            await db[FINGERPRINT_COLLECTION].update_one(
+                {"_id": f"{self.scope}:{self.fp}"}, {"$set": {"response": response}})
+            if self.key:
+                await db[IDEMPOTENCY_COLLECTION].update_one(
+                    {"_id": f"{self.scope}:{self.key}"}, {"$set": {"response": response}})
+        except Exception:
+            logger.exception("Failed to store idempotent response")
+
+    async def abort(self) -> None:
+        if not self.claimed:
+            return
+        db = get_database()
+        try:
+            await db[FINGERPRINT_COLLECTION].delete_one({"_id": f"{self.scope}:{self.fp}"})
+            if self.key:
+                await db[IDEMPOTENCY_COLLECTION].delete_one({"_id": f"{self.scope}:{self.key}"})
+        except Exception:
+            logger.exception("Failed to release idempotency claim")
+
+
+def _replay_of(doc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    response = (doc or {}).get("response")
+    if response:
+        return response
+    # first attempt still in flight (or its response was not stored)
+    return {"status_code": 202, "body": {"success": True, "message": "Request already received", "duplicate": True}}
+
+
+async def _duplicate(scope: str, key: Optional[str], fp: str,
+                     doc: Optional[Dict[str, Any]]) -> Submission:
+    replay = _replay_of(doc)
+    if key:
+        # the new key now answers with the original submission's response
+        await get_database()[IDEMPOTENCY_COLLECTION].update_one(
+            {"_id": f"{scope}:{key}"}, {"$set": {"response": replay}})
+    return Submission(scope, None, fp, replay=replay)
+
+
+async def begin_submission(scope: str, idempotency_key: Optional[str],
+                           email: str, message: str,
+                           fields: Sequence[str] = ()) -> Submission:
+    """
+    Check and claim a submission. `fields` (e.g. name, subject) go into the
+    content fingerprint next to email and message, so different requests
+    from one address with an empty or stock message aren't merged.
+    """
+    fp = fingerprint(email, message, fields)
+    try:
+        return await _begin_submission(scope, idempotency_key, fp)
+    except (DatabaseNotReady, PyMongoError) as exc:
+        logger.warning("Duplicate check for %s skipped, database unavailable: %r", scope, exc)
+        return Submission(scope, None, fp, claimed=False)
+
+
+async def _begin_submission(scope: str, idempotency_key: Optional[str], fp: str) -> Submission:
+    db = get_database()
+    fp_id = f"{scope}:{fp}"
+    key = (idempotency_key or "").strip()[:128] or None
+    key_id = f"{scope}:{key}" if key else None
+    now = datetime.utcnow()
+
+    # 1) retry of a known Idempotency-Key: replay its response
+    if key_id:
+        doc = await db[IDEMPOTENCY_COLLECTION].find_one({"_id": key_id})
+        if doc is not None:
+            return Submission(scope, None, fp, replay=_replay_of(doc))
+
+    # 2) same content seen recently: the Bloom filter rules out most new
+    #    submissions without touching the database
+    if recent_fingerprints.might_contain(fp_id):
+        doc = await db[FINGERPRINT_COLLECTION].find_one({"_id": fp_id})
+        if doc is not None:
+            return await _duplicate(scope, None, fp, doc)
+        # Bloom false positive (or the record expired): treat as new
+
+    # 3) claim key and fingerprint; unique _id makes concurrent claims race-safe
+    if key_id:
+        try:
+            await db[IDEMPOTENCY_COLLECTION].insert_one(
+                {"_id": key_id, "fingerprint": fp, "created_at": now})
+        except DuplicateKeyError:
+            doc = await db[IDEMPOTENCY_COLLECTION].find_one({"_id": key_id})
+            return Submission(scope, None, fp, replay=_replay_of(doc))
+
+    recent_fingerprints.add(fp_id)
+    try:
+        try:
+            await db[FINGERPRINT_COLLECTION].insert_one({"_id": fp_id, "created_at": now})
+        except DuplicateKeyError:
+            # another request/worker claimed the same content first
+            doc = await db[FINGERPRINT_COLLECTION].find_one({"_id": fp_id})
+            return await _duplicate(scope, key, fp, doc)
+    except PyMongoError:
+        # a key claim without a response would answer every retry of the
+        # key with "already received", though nothing was saved
+        if key_id:
+            await _release_key(key_id)
+        raise
+
+    return Submission(scope, key, fp)
+
+
+async def _release_key(key_id: str) -> None:
+    try:
+        await get_database()[IDEMPOTENCY_COLLECTION].delete_one({"_id": key_id})
+    except PyMongoError:
+        # left to the TTL index
+        logger.exception("Failed to release Idempotency-Key claim %s", key_id)
+
+
+async def warm_fingerprints() -> int:
+    """Load unexpired fingerprints into the Bloom filter (e.g. after a restart)."""
+    db = get_database()
+    n = 0
+    async for doc in db[FINGERPRINT_COLLECTION].find({}, {"_id": 1}):
+        recent_fingerprints.add(doc["_id"])
+        n += 1
+    return n
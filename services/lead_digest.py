@@ -0,0 +1,187 @@
+# services/lead_digest.py
+"""
+Lead notification digest.
+
+Coalesces leads arriving within a short window (or until a size cap is hit)
+into a single summary email instead of one email per lead. Leads matching the
+urgency rules (budget / timeline) bypass batching and are sent right away.
+"""
+import asyncio
+import html
+import logging
+import re
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config.settings import settings
+from utils.metrics import smtp_send_failures, smtp_send_seconds, timed
+
+logger = logging.getLogger(__name__)
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+# "2-3 months" -> the unit after the range; a bare number means weeks (the
+# form asks for weeks)
+_UNIT_RE = re.compile(r"\b(days?|d|weeks?|wks?|w|months?|mos?|years?|yrs?|y)\b")
+_WEEKS_PER_UNIT = {"d": 1 / 7, "w": 1, "m": 52 / 12, "y": 52}
+
+# Columns shown in the digest table: (lead key, header)
+_DIGEST_COLUMNS = [
+    ("name", "Name"),
+    ("email", "Email"),
+    ("company", "Company"),
+    ("platform", "Platform"),
+    ("budget", "Budget"),
+    ("timeline", "Timeline"),
+    ("message", "Message"),
+    ("created_at", "Received at"),
+]
+
+
+def is_urgent_lead(lead: dict) -> bool:
+    """
+    Return True if a lead should skip the digest.
+    Matches configured budgets exactly, a timeline of at most
+    LEAD_URGENT_MAX_WEEKS weeks, or an urgency keyword in the timeline.
+    """
+    budget = (lead.get("budget") or "").strip()
+    if budget and budget in settings.LEAD_URGENT_BUDGETS:
+        return True
+
+    timeline = (lead.get("timeline") or "").strip().lower()
+    if not timeline:
+        return False
+    if any(k.lower() in timeline for k in settings.LEAD_URGENT_KEYWORDS):
+        return True
+    weeks = _timeline_weeks(timeline)
+    return weeks is not None and weeks <= settings.LEAD_URGENT_MAX_WEEKS
+
+
+def _timeline_weeks(timeline: str) -> Optional[float]:
+    """First number in a (lowercased) timeline, converted to weeks."""
+    number = _NUMBER_RE.search(timeline)
+    if number is None:
+        return None
+    unit = _UNIT_RE.search(timeline, number.end())
+    return float(number.group()) * _WEEKS_PER_UNIT[unit.group(1)[0] if unit else "w"]
+
+
+class LeadDigest:
+    """
+    Buffers non-urgent leads and sends them as one summary email when either
+    `window_seconds` have passed since the first buffered lead or `max_leads`
+    leads are pending.
+    """
+
+    def __init__(
+        self,
+        send_single: Callable[[dict], Awaitable[None]],
+        *,
+        window_seconds: float = settings.LEAD_DIGEST_WINDOW_SECONDS,
+        max_leads: int = settings.LEAD_DIGEST_MAX_LEADS,
+    ):
+        self.send_single = send_single
+        self.window_seconds = window_seconds
+        self.max_leads = max_leads
+        self._pending: List[dict] = []
+        self._timer: Optional[asyncio.Task] = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, lead: dict) -> None:
+        """Queue a lead for the next digest, or send it now if urgent."""
+        if is_urgent_lead(lead):
+            await self.send_single(lead)
+            return
+
+        self._pending.append(lead)
+        if len(self._pending) >= self.max_leads:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.window_seconds)
+        except asyncio.CancelledError:
+            return
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Send everything pending as one digest (no-op if empty)."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        if len(batch) == 1:
+            # a digest of one is just a regular notification
+            await self.send_single(batch[0])
+            return
+        await _send_digest_email(batch)
+
+
+def _build_digest_bodies(leads: List[dict]) -> Dict[str, str]:
+    lines = [f"{len(leads)} new leads received from ManoSay website:\n"]
+    for i, lead in enumerate(leads, 1):
+        lines.append(
+            f"{i}. {lead.get('name')} <{lead.get('email')}> | "
+            f"Company: {lead.get('company')} | Platform: {lead.get('platform')} | "
+            f"Budget: {lead.get('budget')} | Timeline: {lead.get('timeline')}\n"
+            f"   Message: {lead.get('message')}\n"
+            f"   Received at: {lead.get('created_at')}"
+        )
+    plain = "\n".join(lines) + "\n"
+
+    header = "".join(
+        f"<th align=\"left\">{html.escape(title)}</th>" for _, title in _DIGEST_COLUMNS)
+    rows = []
+    for lead in leads:
+        cells = "".join(
+            f"<td>{html.escape(str(lead.get(key) or ''))}</td>" for key, _ in _DIGEST_COLUMNS)
+        rows.append(f"<tr>{cells}</tr>")
+    html_body = (
+        f"<p>{len(leads)} new leads received from ManoSay website:</p>"
+        f"<table border=\"1\" cellpadding=\"4\" cellspacing=\"0\">"
+        f"<thead><tr>{header}</tr></thead><tbody>{''.join(rows)}</tbody></table>"
+    )
+    return {"plain": plain, "html": html_body}
+
+
+async def _send_digest_email(leads: List[dict]) -> None:
+    recipient = settings.RECIPIENT_EMAIL or settings.SMTP_USERNAME
+    if not settings.SMTP_USERNAME or not settings.SMTP_PASSWORD or not recipient:
+        logger.info("SMTP not configured; skipping lead digest send")
+        return
+
+    # imported on first send, not at startup
+    import aiosmtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    try:
+        bodies = _build_digest_bodies(leads)
+        msg = MIMEMultipart("alternative")
+        msg["From"] = settings.SMTP_USERNAME
+        msg["To"] = recipient
+        msg["Subject"] = f"{len(leads)} New Quote Requests"
+        msg.attach(MIMEText(bodies["plain"], "plain"))
+        msg.attach(MIMEText(bodies["html"], "html"))
+
+        with timed(smtp_send_seconds.labels("lead_digest"), smtp_send_failures.labels("lead_digest")):
+            await aiosmtplib.send(
+                msg,
+                hostname=settings.SMTP_SERVER,
+                port=settings.SMTP_PORT,
+                username=settings.SMTP_USERNAME,
+                password=settings.SMTP_PASSWORD,
+                start_tls=(settings.SMTP_PORT == 587),
+                use_tls=(settings.SMTP_PORT == 465),
+                timeout=30,
+            )
+        logger.info("Lead digest (%d leads) sent to %s", len(leads), recipient)
+    except Exception as e:
+        logger.exception("Failed to send lead digest email: %s", e)
@@ -0,0 +1,147 @@
+# services/lead_ingest.py
+"""
+Micro-batched document ingestion.
+
+Requests hand their document to an InsertBuffer and await a future. A single
+worker task collects whatever arrives within `max_delay_ms` (or up to
+`max_batch` documents) and writes the batch with one unordered insert_many,
+then resolves each waiter with its own inserted _id (or its own error).
+"""
+import asyncio
+import logging
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class IngestBufferFull(Exception):
+    """Raised when the buffer stays full for longer than the enqueue timeout."""
+
+
+class InsertBuffer:
+    def __init__(
+        self,
+        get_collection: Callable[[], Any],
+        *,
+        max_batch: int = settings.LEAD_INGEST_MAX_BATCH,
+        max_delay_ms: float = settings.LEAD_INGEST_MAX_DELAY_MS,
+        max_pending: int = settings.LEAD_INGEST_MAX_PENDING,
+        enqueue_timeout: float = settings.LEAD_INGEST_ENQUEUE_TIMEOUT_SECONDS,
+        max_inflight: int = settings.LEAD_INGEST_MAX_INFLIGHT,
+    ):
+        self.get_collection = get_collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self.max_inflight = max_inflight
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # strong refs: the loop only keeps weak ones to running tasks
+        self._writes: Set[asyncio.Task] = set()
+
+    @property
+    def pending_count(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_worker(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._inflight = asyncio.Semaphore(self.max_inflight)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def insert(self, doc: dict) -> ObjectId:
+        """
+        Queue `doc` for the next batch and return its inserted _id.
+        Waits (backpressure) while the buffer is full and raises
+        IngestBufferFull if no slot frees up within `enqueue_timeout`.
+        """
+        self._ensure_worker()
+        # assign the id client-side so every waiter knows its own id
+        doc.setdefault("_id", ObjectId())
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._queue.put((doc, fut)), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise IngestBufferFull(
+                f"ingest buffer full ({self.max_pending} pending)")
+        return await fut
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            self._drain_into(batch)
+            if len(batch) < self.max_batch and self.max_delay > 0:
+                # give concurrent submitters a moment to join the batch
+                await asyncio.sleep(self.max_delay)
+                self._drain_into(batch)
+            # keep up to max_inflight batches on the wire at once
+            await self._inflight.acquire()
+            task = asyncio.create_task(self._write_and_release(batch))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _write_and_release(self, batch: List[Tuple[dict, asyncio.Future]]) -> None:
+        try:
+            await self._write(batch)
+        finally:
+            self._inflight.release()
+            for _ in batch:
+                self._queue.task_done()
+
+    def _drain_into(self, batch: List[Tuple[dict, asyncio.Future]]) -> None:
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    async def _write(self, batch: List[Tuple[dict, asyncio.Future]]) -> None:
+        docs = [doc for doc, _ in batch]
+        failed = {}
+        try:
+            await self.get_collection().insert_many(docs, ordered=False)
+        except BulkWriteError as bwe:
+            for err in bwe.details.get("writeErrors", []):
+                exc_cls = DuplicateKeyError if err.get(
+                    "code") == 11000 else WriteError
+                failed[err["index"]] = exc_cls(
+                    err.get("errmsg", "write error"), err.get("code"), err)
+            # a write concern error leaves the inserts applied; just log it
+            if bwe.details.get("writeConcernErrors"):
+                logger.warning("insert_many write concern errors: %s",
+                               bwe.details["writeConcernErrors"])
+        except Exception as exc:
+            logger.exception("insert_many of %d documents failed", len(docs))
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+
+        for i, (doc, fut) in enumerate(batch):
+            if fut.done():
+                # waiter went away (client disconnected); document still written
+                continue
+            if i in failed:
+                fut.set_exception(failed[i])
+            else:
+                fut.set_result(doc["_id"])
+
+    async def close(self) -> None:
+        """Wait for queued documents to be written, then stop the worker."""
+        if self._queue is not None and self._worker is not None and not self._worker.done():
+            await self._queue.join()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
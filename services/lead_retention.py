@@ -0,0 +1,191 @@
+# services/lead_retention.py
+"""
+Lead retention: keeps the hot `leads` collection small.
+
+* archive_old_leads(): moves leads older than LEAD_RETENTION_DAYS into
+  gzip-compressed NDJSON files under LEAD_ARCHIVE_DIR, deleting them from
+  Mongo only after the file is safely on disk.
+* scrub_request_meta(): drops ip / user_agent from leads older than
+  LEAD_META_TTL_DAYS (new leads keep them in the TTL-indexed
+  `lead_request_meta` collection instead).
+* iter_archived_leads(): streams archived leads back for audits.
+
+File names carry the created_at range they cover
+(leads_<first>_<last>_<run>.ndjson.gz) so readers can skip files that fall
+outside a requested range without opening them.
+"""
+import asyncio
+import gzip
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from bson import json_util
+from pymongo.errors import DuplicateKeyError
+
+from config.settings import settings
+from db import get_database
+from repositories.index_registry import register_index
+
+logger = logging.getLogger(__name__)
+
+_JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS
+_LOCK_ID = "lead_retention"
+
+# ip / user agent of new leads expire on their own
+register_index("lead_request_meta", [("created_at", 1)],
+               expire_after_seconds=settings.LEAD_META_TTL_DAYS * 86400)
+
+
+def _archive_dir() -> Path:
+    return Path(settings.LEAD_ARCHIVE_DIR)
+
+
+def _write_archive(docs: List[Dict[str, Any]], run_stamp: str, part: int) -> Path:
+    """Write one batch as .ndjson.gz (blocking; run in an executor)."""
+    archive_dir = _archive_dir()
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    first = docs[0]["created_at"].strftime("%Y%m%d")
+    last = docs[-1]["created_at"].strftime("%Y%m%d")
+    final_path = archive_dir / f"leads_{first}_{last}_{run_stamp}-{part:04d}.ndjson.gz"
+    tmp_path = final_path.with_suffix(".tmp")
+
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as gz:
+            for doc in docs:
+                gz.write(json_util.dumps(doc, json_options=_JSON_OPTIONS).encode("utf-8"))
+                gz.write(b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, final_path)
+    return final_path
+
+
+async def _acquire_lock(ttl_seconds: int) -> bool:
+    """Lease lock so only one worker/process runs the job at a time."""
+    db = get_database()
+    now = datetime.utcnow()
+    try:
+        await db["job_locks"].update_one(
+            {"_id": _LOCK_ID, "locked_until": {"$lt": now}},
+            {"$set": {"locked_until": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def _release_lock() -> None:
+    db = get_database()
+    await db["job_locks"].update_one(
+        {"_id": _LOCK_ID}, {"$set": {"locked_until": datetime.utcnow()}})
+
+
+async def archive_old_leads(older_than_days: Optional[int] = None,
+                            batch_size: Optional[int] = None) -> int:
+    """Move leads older than the cutoff into archive files; returns count moved."""
+    days = older_than_days if older_than_days is not None else settings.LEAD_RETENTION_DAYS
+    batch_size = batch_size or settings.LEAD_RETENTION_BATCH
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    run_stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    loop = asyncio.get_running_loop()
+    db = get_database()
+
+    moved = 0
+    part = 0
+    while True:
+        docs = await db["leads"].find({"created_at": {"$lt": cutoff}}) \
+            .sort([("created_at", 1), ("_id", 1)]).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+        part += 1
+        path = await loop.run_in_executor(None, _write_archive, docs, run_stamp, part)
+        # delete only what made it into the archive file
+        res = await db["leads"].delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        moved += res.deleted_count
+        logger.info("Archived %d leads to %s", len(docs), path)
+        if len(docs) < batch_size:
+            break
+    return moved
+
+
+async def scrub_request_meta(older_than_days: Optional[int] = None) -> int:
+    """Remove ip / user_agent from hot leads past the metadata TTL."""
+    days = older_than_days if older_than_days is not None else settings.LEAD_META_TTL_DAYS
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    db = get_database()
+    res = await db["leads"].update_many(
+        {"created_at": {"$lt": cutoff},
+         "$or": [{"ip": {"$exists": True}}, {"user_agent": {"$exists": True}}]},
+        {"$unset": {"ip": "", "user_agent": ""}},
+    )
+    return res.modified_count
+
+
+async def run_retention_once() -> Dict[str, int]:
+    if not await _acquire_lock(ttl_seconds=3600):
+        logger.info("Lead retention already running elsewhere; skipping")
+        return {"archived": 0, "scrubbed": 0}
+    try:
+        scrubbed = await scrub_request_meta()
+        archived = await archive_old_leads()
+        logger.info("Lead retention: archived=%d scrubbed=%d", archived, scrubbed)
+        return {"archived": archived, "scrubbed": scrubbed}
+    finally:
+        await _release_lock()
+
+
+async def run_retention_forever() -> None:
+    """Background loop started from startup when LEAD_RETENTION_ENABLED."""
+    interval = settings.LEAD_RETENTION_INTERVAL_HOURS * 3600
+    while True:
+        try:
+            await run_retention_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Lead retention run failed")
+        await asyncio.sleep(interval)
+
+
+def _file_range(path: Path):
+    try:
+        _, first, last, _ = path.name.split("_", 3)
+        return datetime.strptime(first, "%Y%m%d"), datetime.strptime(last, "%Y%m%d")
+    except ValueError:
+        return None
+
+
+def iter_archived_leads(start: Optional[datetime] = None,
+                        end: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield archived leads with start <= created_at < end, oldest file first.
+    Blocking generator: iterate it in a thread (StreamingResponse does).
+    """
+    archive_dir = _archive_dir()
+    if not archive_dir.is_dir():
+        return
+    for path in sorted(archive_dir.glob("leads_*.ndjson.gz")):
+        rng = _file_range(path)
+        if rng is not None:
+            first, last = rng
+            if end is not None and first >= end:
+                continue
+            if start is not None and last + timedelta(days=1) <= start:
+                continue
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                doc = json_util.loads(line, json_options=_JSON_OPTIONS)
+                created = doc.get("created_at")
+                if isinstance(created, datetime) and created.tzinfo is not None:
+                    created = created.replace(tzinfo=None)
+                if start is not None and (created is None or created < start):
+                    continue
+                if end is not None and (created is None or created >= end):
+                    continue
+                yield doc
@@ -0,0 +1,86 @@
+# services/view_counter.py
+"""
+Buffered blog post view counting.
+
+`record()` only bumps an in-memory per-slug counter, so the hottest route
+never waits on a write. Every POST_VIEWS_FLUSH_SECONDS the counters are
+swapped out and written as unordered $inc bulk writes
+(repositories/post_views_repository.py), and the top POPULAR_POSTS_COUNT
+list is re-read for the templates. The last flush runs on shutdown.
+
+A failed or cancelled flush puts its counts back for the next one; if only
+one of the two bulk writes failed (or the cancel landed after a write was
+sent), those views may be counted twice. View counts are
+approximate by design.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.settings import settings
+from db import is_ready
+from repositories.post_repository import PostSummary, post_repository
+from repositories.post_views_repository import add_views
+from utils.memory import register_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    def __init__(self, interval: float = settings.POST_VIEWS_FLUSH_SECONDS,
+                 top_n: int = settings.POPULAR_POSTS_COUNT):
+        self.interval = interval
+        self.top_n = top_n
+        self._counts: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        # read by the blog templates; replaced (never mutated) on each flush
+        self.popular: List[PostSummary] = []
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._counts)
+
+    def record(self, slug: str) -> None:
+        self._counts[slug] = self._counts.get(slug, 0) + 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing post views failed")
+            await asyncio.sleep(self.interval)
+
+    async def flush(self) -> None:
+        """Write buffered views, then refresh the popular list."""
+        if not is_ready():
+            return
+        counts, self._counts = self._counts, {}
+        if counts:
+            try:
+                await add_views(counts, datetime.utcnow().strftime("%Y-%m-%d"))
+            except BaseException:  # cancelled too (shutdown): keep them for close()
+                for slug, n in counts.items():
+                    self._counts[slug] = self._counts.get(slug, 0) + n
+                raise
+        self.popular = await post_repository.list_popular(self.top_n)
+
+    async def close(self) -> None:
+        """Stop the periodic flush (waiting for it to unwind), then flush once more."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+view_counter = ViewCounter()
+register_cache("post_views_pending", lambda: view_counter.pending_count)
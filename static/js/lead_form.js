@@ -6,11 +6,19 @@ document.addEventListener("DOMContentLoaded", function () {
 
   if (!form) return;
 
+  // One key per filled-in form: retries and double-clicks reuse it so the
+  // server can replay the first response instead of creating a duplicate lead
+  let idempotencyKey = null;
+  const newIdempotencyKey = () =>
+    (window.crypto && crypto.randomUUID) ? crypto.randomUUID()
+      : Date.now().toString(36) + Math.random().toString(36).slice(2);
+
   form.addEventListener("submit", async function (e) {
     e.preventDefault();
     statusDiv.style.display = "none";
     submitBtn.disabled = true;
     submitBtn.textContent = "Sending...";
+    if (!idempotencyKey) idempotencyKey = newIdempotencyKey();
 
     const payload = {
       name: document.getElementById("lead-name").value.trim(),
@@ -26,7 +34,8 @@ document.addEventListener("DOMContentLoaded", function () {
       const resp = await fetch("/api/request-quote", {
         method: "POST",
         headers: {
-          "Content-Type": "application/json"
+          "Content-Type": "application/json",
+          "Idempotency-Key": idempotencyKey
         },
         body: JSON.stringify(payload),
         credentials: "same-origin"
@@ -43,6 +52,7 @@ document.addEventListener("DOMContentLoaded", function () {
         statusDiv.style.color = "#1a7f37";
         statusDiv.textContent = "Thanks! Your request was received. We'll contact you soon.";
         form.reset();
+        idempotencyKey = null;
       }
     } catch (err) {
       statusDiv.style.display = "block";
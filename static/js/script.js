@@ -115,6 +115,13 @@ if (contactForm) {
         const originalText = submitBtn.textContent;
         submitBtn.textContent = 'Sending...';
         submitBtn.disabled = true;
+
+        // Reused by retries of the same message so the server can de-duplicate
+        if (!contactForm.dataset.idempotencyKey) {
+            contactForm.dataset.idempotencyKey = (window.crypto && crypto.randomUUID)
+                ? crypto.randomUUID()
+                : Date.now().toString(36) + Math.random().toString(36).slice(2);
+        }
         
         try {
             // Send data to your FastAPI backend
@@ -122,6 +129,7 @@ if (contactForm) {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    'Idempotency-Key': contactForm.dataset.idempotencyKey,
                 },
                 body: JSON.stringify(formData)
             });
@@ -134,6 +142,7 @@ if (contactForm) {
             const result = await response.json();
             alert(result.message);
             contactForm.reset();
+            delete contactForm.dataset.idempotencyKey;
             
         } catch (error) {
             alert(`Error: ${error.message}`);
@@ -0,0 +1,131 @@
+# tests/conftest.py
+"""
+Test fixtures: the app runs against an in-memory mongomock-motor database,
+so the suite needs no MongoDB server (pip install pytest mongomock-motor;
+run with `pytest`).
+
+mongomock never fires pymongo command events, so the `mongo` fixture charges
+each collection call to `current_db_stats` itself, the way
+CommandMetricsListener does for a real server. That keeps X-DB-Calls (and
+assert_query_budget) meaningful under test. It also teaches mongomock the
+`$type` aggregation operator, so the repositories' real projections run.
+"""
+import asyncio
+import datetime
+import functools
+import os
+import time
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost")
+os.environ.setdefault("MONGO_DB", "test")
+os.environ["SMTP_USERNAME"] = ""
+os.environ["PROFILE_TOKEN"] = ""
+os.environ["LEAD_RETENTION_ENABLED"] = "False"
+
+import mongomock.aggregate  # noqa: E402
+import mongomock.collection  # noqa: E402
+import mongomock_motor  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import db  # noqa: E402
+from utils.mongo_monitoring import current_db_stats  # noqa: E402
+
+# Collection calls that are one round trip each on a real server
+_COMMANDS = ("find", "aggregate", "find_one", "count_documents", "distinct",
+             "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+             "delete_one", "delete_many", "bulk_write", "find_one_and_update")
+
+
+def _charged(method):
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            _charge()
+            return await method(self, *args, **kwargs)
+    else:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            _charge()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _charge() -> None:
+    stats = current_db_stats.get()
+    if stats is not None:
+        stats.calls += 1
+
+
+def _ignore_sort(method):
+    # pymongo 4.14 passes sort= to bulk update ops; mongomock 4.3 predates it
+    @functools.wraps(method)
+    def wrapper(self, *args, sort=None, **kwargs):
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _bson_type(value) -> str:
+    # bool before int: bool is an int subclass
+    for python_type, name in ((bool, "bool"), (int, "int"), (float, "double"),
+                              (str, "string"), (datetime.datetime, "date"),
+                              (list, "array"), (dict, "object")):
+        if isinstance(value, python_type):
+            return name
+    return "null" if value is None else type(value).__name__
+
+
+def _with_type_operator(method):
+    # mongomock 4.3 has no $type expression
+    @functools.wraps(method)
+    def wrapper(self, operator, values):
+        if operator != "$type":
+            return method(self, operator, values)
+        try:
+            return _bson_type(self.parse(values))
+        except KeyError:
+            return "missing"
+    return wrapper
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """A fresh in-memory database installed as db's client."""
+    collection_cls = mongomock_motor.AsyncMongoMockCollection
+    for name in _COMMANDS:
+        monkeypatch.setattr(collection_cls, name, _charged(getattr(collection_cls, name)))
+    builder = mongomock.collection.BulkOperationBuilder
+    monkeypatch.setattr(builder, "add_update", _ignore_sort(builder.add_update))
+    monkeypatch.setattr(builder, "add_replace", _ignore_sort(builder.add_replace))
+    monkeypatch.setattr(mongomock.aggregate, "type_operators",
+                        [*mongomock.aggregate.type_operators, "$type"])
+    parser = mongomock.aggregate._Parser
+    monkeypatch.setattr(parser, "_handle_type_operator",
+                        _with_type_operator(parser._handle_type_operator))
+
+    client = mongomock_motor.AsyncMongoMockClient()
+
+    async def connect_to_mongo(**kwargs):
+        db._client = client
+        db._database = client[db.MONGO_DB]
+        db._ready = True
+
+    import main
+    monkeypatch.setattr(db, "connect_to_mongo", connect_to_mongo)
+    monkeypatch.setattr(main, "connect_to_mongo", connect_to_mongo)
+    yield client[db.MONGO_DB]
+    db._client = None
+    db._database = None
+    db._ready = False
+
+
+@pytest.fixture
+def client(mongo):
+    """TestClient for main.app, returned once the database is connected."""
+    import main
+    with TestClient(main.app) as test_client:
+        deadline = time.monotonic() + 5
+        while not db._ready:
+            assert time.monotonic() < deadline, "database never became ready"
+            time.sleep(0.01)
+        yield test_client
@@ -0,0 +1,32 @@
+# tests/test_admin_memory.py
+"""/api/admin/memory*: auth comes before the worker (pid) check."""
+import asyncio
+import os
+
+import pytest
+
+
+@pytest.fixture
+def admin_client(client, mongo):
+    result = asyncio.run(mongo["users"].insert_one({"email": "admin@example.com", "role": "admin"}))
+    client.cookies.set("admin_user_id", str(result.inserted_id))
+    yield client
+    client.cookies.clear()
+
+
+def test_pid_check_needs_auth(client):
+    response = client.get("/api/admin/memory", params={"pid": 1})
+    assert response.status_code == 401
+    assert str(os.getpid()) not in response.text
+
+
+def test_wrong_pid_is_refused(admin_client):
+    response = admin_client.get("/api/admin/memory", params={"pid": 1})
+    assert response.status_code == 409
+    assert f"Reached worker {os.getpid()}" in response.json()["detail"]
+
+
+def test_matching_pid_is_answered(admin_client):
+    response = admin_client.get("/api/admin/memory", params={"pid": os.getpid()})
+    assert response.status_code == 200
+    assert response.json()["pid"] == os.getpid()
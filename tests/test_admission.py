@@ -0,0 +1,33 @@
+# tests/test_admission.py
+"""Load shedding: preflights are never shed, and shed 503s stay readable cross-origin."""
+import pytest
+
+from config.settings import settings
+from utils.loop_watchdog import loop_watchdog
+
+_ORIGIN = {"Origin": "https://manosay.com"}
+
+
+@pytest.fixture
+def lagging(client, monkeypatch):
+    assert settings.ADMISSION_ENABLED
+    # keep the heartbeat from resetting the lag while the test runs
+    monkeypatch.setattr(type(loop_watchdog), "lag_ms", property(
+        lambda self: settings.ADMISSION_SHED_LAG_MS + 1000, lambda self, value: None),
+        raising=False)
+    return client
+
+
+def test_preflight_is_not_shed(lagging):
+    response = lagging.options("/api/contact", headers={
+        **_ORIGIN, "Access-Control-Request-Method": "POST"})
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == _ORIGIN["Origin"]
+
+
+def test_shed_response_has_cors_headers(lagging):
+    response = lagging.post("/api/contact", headers=_ORIGIN, data={})
+    assert response.status_code == 503
+    assert response.headers["access-control-allow-origin"] == _ORIGIN["Origin"]
+    assert "retry-after" in response.headers["access-control-expose-headers"].lower()
+    assert response.headers["retry-after"] == str(settings.ADMISSION_RETRY_AFTER_SECONDS)
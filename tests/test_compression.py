@@ -0,0 +1,98 @@
+# tests/test_compression.py
+"""CompressionMiddleware: whole bodies, streamed bodies and the ETag memo."""
+import asyncio
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from fastapi.testclient import TestClient
+
+from utils.compression import CompressionMiddleware, compressed_variants
+
+_ROW = b"lead@example.com,Some Company,new\n"
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+    (tmp_path / "site.css").write_bytes(b"body { margin: 0; }\n" * 200)
+    app.mount("/static", StaticFiles(directory=tmp_path), name="static")
+
+    @app.get("/page")
+    async def page():
+        return PlainTextResponse("hello " * 500)
+
+    @app.get("/export")
+    async def export():
+        async def rows():
+            for _ in range(5):
+                yield _ROW * 100
+                await asyncio.sleep(0)
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    return app
+
+
+def _chunks(app, path):
+    """Raw (undecoded) body chunks the middleware sends for `path`."""
+    sent = []
+
+    async def run():
+        scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(),
+                 "query_string": b"", "root_path": "", "scheme": "http",
+                 "server": ("test", 80), "client": ("test", 1), "http_version": "1.1",
+                 "headers": [(b"accept-encoding", b"gzip")]}
+
+        requested = asyncio.Event()
+
+        async def receive():
+            if requested.is_set():  # no disconnect until the response is done
+                await asyncio.Event().wait()
+            requested.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await CompressionMiddleware(app.router)(scope, receive, send)
+
+    asyncio.run(run())
+    return sent[0], [m for m in sent[1:] if m["type"] == "http.response.body"]
+
+
+def test_whole_body_gets_content_length(app):
+    response = TestClient(app).get("/page", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < 3000
+    assert response.text == "hello " * 500
+
+
+def test_stream_is_compressed_chunk_by_chunk(app):
+    start, bodies = _chunks(app, "/export")
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # one compressed chunk per row batch, not one burst at the end
+    assert len([m for m in bodies if m["body"]]) >= 5
+    decoder = zlib.decompressobj(31)
+    for message in bodies[:-1]:
+        assert message["more_body"]
+        # each chunk is flushed, so it decodes on arrival
+        assert decoder.decompress(message["body"]) == _ROW * 100
+    decoder.decompress(bodies[-1]["body"])
+    assert decoder.eof
+
+
+def test_static_variant_is_memoized(app):
+    compressed_variants._entries.clear()
+    compressed_variants.size = 0
+    client = TestClient(app)
+    first = client.get("/static/site.css", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"].startswith("W/")
+    assert len(compressed_variants) == 1
+    second = client.get("/static/site.css", headers={"Accept-Encoding": "gzip"})
+    assert second.content == first.content == b"body { margin: 0; }\n" * 200
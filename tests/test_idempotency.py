@@ -0,0 +1,44 @@
+# tests/test_idempotency.py
+"""begin_submission(): a failed claim must not leave an orphaned Idempotency-Key."""
+import asyncio
+import uuid
+
+import mongomock_motor
+import pytest
+from pymongo.errors import OperationFailure
+
+import db
+from services.idempotency import FINGERPRINT_COLLECTION, IDEMPOTENCY_COLLECTION, begin_submission
+
+
+@pytest.fixture
+def database(mongo):
+    asyncio.run(db.connect_to_mongo())
+    return mongo
+
+
+@pytest.fixture
+def message():
+    # fresh content per test, so the shared Bloom filter never has it
+    return f"hello {uuid.uuid4().hex}"
+
+
+def test_key_is_released_when_fingerprint_claim_fails(database, message, monkeypatch):
+    insert_one = mongomock_motor.AsyncMongoMockCollection.insert_one
+    failing = True
+
+    async def flaky_insert(self, document, *args, **kwargs):
+        if failing and self.name == FINGERPRINT_COLLECTION:
+            raise OperationFailure("not primary")
+        return await insert_one(self, document, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock_motor.AsyncMongoMockCollection, "insert_one", flaky_insert)
+
+    submission = asyncio.run(begin_submission("leads", "key-1", "a@example.com", message))
+    assert not submission.claimed and submission.replay is None
+    assert asyncio.run(database[IDEMPOTENCY_COLLECTION].find_one({"_id": "leads:key-1"})) is None
+
+    failing = False
+    retry = asyncio.run(begin_submission("leads", "key-1", "a@example.com", message))
+    assert retry.claimed and retry.replay is None and retry.key == "key-1"
+
@@ -0,0 +1,51 @@
+# tests/test_loop_watchdog.py
+"""Strict mode: a route that blocks the event loop fails the test that hits it."""
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.settings import settings
+from utils.loop_watchdog import LoopBlockedError, LoopWatchdogMiddleware, loop_watchdog
+
+
+@pytest.fixture
+def watched(monkeypatch):
+    monkeypatch.setattr(settings, "LOOP_WATCHDOG_STRICT", True)
+    monkeypatch.setattr(settings, "LOOP_WATCHDOG_THRESHOLD_MS", 100)
+    monkeypatch.setattr(settings, "LOOP_WATCHDOG_INTERVAL_MS", 10)
+
+    app = FastAPI()
+    app.add_middleware(LoopWatchdogMiddleware)
+
+    @app.on_event("startup")
+    async def start():
+        loop_watchdog.start()
+
+    @app.on_event("shutdown")
+    async def stop():
+        loop_watchdog.stop()
+
+    @app.get("/blocking")
+    async def blocking():
+        time.sleep(0.4)  # sync call on the event loop
+        return {"ok": True}
+
+    @app.get("/awaiting")
+    async def awaiting():
+        await asyncio.sleep(0.4)
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_blocking_route_raises(watched):
+    with pytest.raises(LoopBlockedError, match="GET /blocking blocked the event loop"):
+        watched.get("/blocking")
+
+
+def test_awaiting_route_passes(watched):
+    assert watched.get("/awaiting").json() == {"ok": True}
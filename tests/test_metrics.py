@@ -0,0 +1,44 @@
+# tests/test_metrics.py
+"""GET /metrics access control and per-worker labels."""
+import pytest
+
+from config.settings import settings
+from utils import metrics
+
+
+@pytest.fixture
+def metrics_on(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+    return client
+
+
+def test_metrics_off_by_default(client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_need_the_token(metrics_on):
+    assert metrics_on.get("/metrics").status_code == 401
+    bad = metrics_on.get("/metrics", headers={"Authorization": "Bearer nope"})
+    assert bad.status_code == 401
+
+
+def test_metrics_with_token(metrics_on):
+    response = metrics_on.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+
+
+def test_enabled_without_token_stays_off(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    assert client.get("/metrics").status_code == 404
+
+
+def test_constant_labels_on_every_sample():
+    metrics.set_constant_labels(worker="3")
+    try:
+        samples = [line for line in metrics.render_prometheus().splitlines()
+                   if line and not line.startswith("#")]
+        assert samples and all('worker="3"' in line for line in samples)
+    finally:
+        metrics.set_constant_labels()
@@ -0,0 +1,60 @@
+# tests/test_post_cache.py
+"""Published-post cache: unknown slugs must not crowd out real posts."""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import db
+from config.settings import settings
+from repositories.post_repository import PostRepository
+from utils.mongo_monitoring import track_db_calls
+
+
+@pytest.fixture
+def repo(mongo, monkeypatch):
+    monkeypatch.setattr(settings, "POST_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(settings, "POST_MISS_CACHE_MAX_ENTRIES", 3)
+    asyncio.run(db.connect_to_mongo())
+    asyncio.run(mongo["posts"].insert_one(
+        {"title": "Real", "slug": "real", "status": "published",
+         "content": "", "published_date": datetime(2026, 1, 1, 9, 30)}))
+    return PostRepository()
+
+
+def test_unknown_slugs_do_not_evict_posts(repo):
+    async def run():
+        await repo.get_published("real")
+        for i in range(10):
+            assert await repo.get_published(f"scan-{i}") is None
+        with track_db_calls() as stats:
+            post = await repo.get_published("real")
+        return post, stats.calls
+
+    post, calls = asyncio.run(run())
+    assert (post.title, post.published_date) == ("Real", "2026-01-01")
+    assert calls == 0
+
+
+def test_misses_are_remembered_briefly(repo, monkeypatch):
+    async def run():
+        await repo.get_published("nope")
+        with track_db_calls() as cached:
+            await repo.get_published("nope")
+        monkeypatch.setattr(settings, "POST_MISS_CACHE_SECONDS", 0)
+        await repo.get_published("gone")
+        with track_db_calls() as expired:
+            await repo.get_published("gone")
+        return cached.calls, expired.calls, len(repo._missing)
+
+    cached, expired, remembered = asyncio.run(run())
+    assert (cached, expired) == (0, 1)
+    assert remembered <= settings.POST_MISS_CACHE_MAX_ENTRIES
+
+
+def test_string_dates_pass_through(repo, mongo):
+    # older posts stored the date as a string
+    asyncio.run(mongo["posts"].insert_one(
+        {"title": "Old", "slug": "old", "status": "published", "published_date": "2019-05-04"}))
+    post = asyncio.run(repo.get_published("old"))
+    assert (post.published_date, post.content) == ("2019-05-04", "")
@@ -0,0 +1,45 @@
+# tests/test_query_budget.py
+"""DB round-trip budgets for the public blog pages (X-DB-Calls)."""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from config.settings import settings
+from repositories.post_repository import post_repository
+from utils.mongo_monitoring import assert_query_budget
+
+
+@pytest.fixture
+def blog(client, mongo, monkeypatch):
+    monkeypatch.setattr(settings, "DB_STATS_HEADERS", True)
+    posts = [{"title": f"Post {i}", "slug": f"post-{i}", "status": "published",
+              "content": "<p>body</p>", "published_date": datetime(2026, 1, i)}
+             for i in range(1, 4)]
+    asyncio.run(mongo["posts"].insert_many(posts))
+    post_repository.invalidate_published()
+    yield client
+    post_repository.invalidate_published()
+
+
+def test_blog_post_budget(blog):
+    response = blog.get("/blog/post-1")
+    assert response.status_code == 200
+    assert_query_budget(response, 1)
+
+
+def test_blog_list_budget(blog):
+    response = blog.get("/blog")
+    assert response.status_code == 200
+    assert_query_budget(response, 1)
+
+
+def test_cached_blog_post_needs_no_query(blog):
+    blog.get("/blog/post-2")
+    assert_query_budget(blog.get("/blog/post-2"), 0)
+
+
+def test_budget_is_enforced(blog):
+    response = blog.get("/blog/post-3")
+    with pytest.raises(AssertionError, match="budget 0"):
+        assert_query_budget(response, 0)
@@ -0,0 +1,95 @@
+# tests/test_query_plans.py
+"""
+verify_query_plans(): registered query shapes must use an index.
+
+The explain-driven cases run against canned planner output. The last test
+needs a real server (mongomock has no query planner): set MONGO_TEST_URI
+to run it; it works in a scratch database that is dropped afterwards.
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from repositories import index_registry
+from repositories.index_registry import QueryShape, build_indexes, verify_query_plans
+
+
+def _plan(*stages):
+    """Winning plan whose stages nest outermost first: _plan("FETCH", "IXSCAN")."""
+    plan = None
+    for stage in reversed(stages):
+        plan = {"stage": stage, **({"inputStage": plan} if plan else {})}
+    return {"queryPlanner": {"winningPlan": plan}}
+
+
+class _ExplainDb:
+    def __init__(self, plans):
+        self.plans = plans
+
+    async def command(self, command):
+        return self.plans[command["explain"]["find"]]
+
+
+def _verify(monkeypatch, plans):
+    shapes = [QueryShape(name, f"{name} query", {"x": 1}) for name in plans]
+    monkeypatch.setattr(index_registry, "registered_queries", lambda: shapes)
+    return asyncio.run(verify_query_plans(_ExplainDb(plans)))
+
+
+def test_index_scan_passes(monkeypatch):
+    assert _verify(monkeypatch, {"posts": _plan("LIMIT", "FETCH", "IXSCAN")}) == []
+
+
+def test_collection_scan_fails(monkeypatch):
+    problems = _verify(monkeypatch, {"leads": _plan("COLLSCAN")})
+    assert problems == ["leads: leads query -> COLLSCAN"]
+
+
+def test_in_memory_sort_fails(monkeypatch):
+    problems = _verify(monkeypatch, {"leads": _plan("SORT", "FETCH", "IXSCAN")})
+    assert problems == ["leads: leads query -> SORT <- FETCH <- IXSCAN"]
+
+
+def test_sbe_plan_is_unwrapped(monkeypatch):
+    classic = _plan("COLLSCAN")["queryPlanner"]["winningPlan"]
+    plan = {"queryPlanner": {"winningPlan": {"queryPlan": classic}}}
+    assert _verify(monkeypatch, {"posts": plan}) == ["posts: posts query -> COLLSCAN"]
+
+
+def test_missing_collection_is_not_a_pass(monkeypatch):
+    problems = _verify(monkeypatch, {"posts": _plan("EOF")})
+    assert len(problems) == 1 and "collection missing" in problems[0]
+
+
+@pytest.mark.skipif(not os.getenv("MONGO_TEST_URI"), reason="needs MONGO_TEST_URI (a real MongoDB)")
+def test_registered_queries_use_indexes():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(os.environ["MONGO_TEST_URI"])
+        db = client[f"plans_{uuid.uuid4().hex[:12]}"]
+        try:
+            await build_indexes(db)
+            # one document per collection, so no plan can be an empty EOF
+            for collection in {shape.collection for shape in index_registry.registered_queries()}:
+                await db[collection].insert_one({"_seed": True})
+            problems = await verify_query_plans(db)
+            # and the check itself does catch an unindexed shape
+            await db["unindexed"].insert_one({"_seed": True})
+            shapes = [QueryShape("unindexed", "unindexed scan", {"x": 1}, (("y", 1),))]
+            real = index_registry.registered_queries
+            index_registry.registered_queries = lambda: shapes
+            try:
+                unindexed = await verify_query_plans(db)
+            finally:
+                index_registry.registered_queries = real
+            return problems, unindexed
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    problems, unindexed = asyncio.run(run())
+    assert problems == []
+    assert unindexed and "COLLSCAN" in unindexed[0]
@@ -0,0 +1,42 @@
+# tests/test_view_counter.py
+"""Buffered view counts survive a shutdown that interrupts a flush."""
+import asyncio
+
+import db
+from services import view_counter as view_counter_module
+from services.view_counter import ViewCounter
+
+
+def test_close_keeps_views_from_a_cancelled_flush(mongo, monkeypatch):
+    written = []
+
+    async def run():
+        in_flight = asyncio.Event()
+        calls = 0
+
+        async def add_views(counts, day):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                in_flight.set()
+                await asyncio.sleep(3600)  # cancelled mid-write by close()
+            written.append(dict(counts))
+
+        async def list_popular(limit):
+            return []
+
+        monkeypatch.setattr(view_counter_module, "add_views", add_views)
+        monkeypatch.setattr(view_counter_module.post_repository, "list_popular", list_popular)
+        await db.connect_to_mongo()
+
+        counter = ViewCounter(interval=3600)
+        counter.record("a")
+        counter.record("a")
+        counter.record("b")
+        counter.start()
+        await in_flight.wait()
+        await counter.close()
+        return counter.pending_count
+
+    assert asyncio.run(run()) == 0
+    assert written == [{"a": 2, "b": 1}]
@@ -0,0 +1,75 @@
+# utils/access_log.py
+"""
+Access log + request-id middleware.
+
+Every request gets an id: the client's X-Request-ID when it looks sane,
+else a fresh one. It is set in `request_id_var` (so every log record made
+while handling the request carries it, see utils/log_setup.py) and echoed
+in the X-Request-ID response header. One "access" record per request is
+logged after the response is sent, with the fields under `http`.
+Outermost middleware, so shed and failed requests are logged too.
+"""
+import logging
+import re
+import secrets
+import time
+
+from config.settings import settings
+from utils.log_setup import request_id_var
+
+access_logger = logging.getLogger("access")
+
+_REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(rb"^[\w.:-]{1,64}$")
+
+
+class AccessLogMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._skip = frozenset(settings.ACCESS_LOG_SKIP_PATHS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == _REQUEST_ID_HEADER and _VALID_REQUEST_ID.match(value):
+                request_id = value.decode("ascii")
+                break
+        if request_id is None:
+            request_id = secrets.token_hex(8)
+        token = request_id_var.set(request_id)
+
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()),
+                                      (b"x-request-id", request_id.encode("ascii"))]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if settings.ACCESS_LOG_ENABLED and scope["path"] not in self._skip:
+                route = scope.get("route")
+                client = scope.get("client")
+                access_logger.info(
+                    "%s %s %d", scope["method"], scope["path"], status,
+                    extra={"http": {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": route.path if route is not None else None,
+                        "status": status,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                        "bytes": size,
+                        "client": client[0] if client else None,
+                    }})
+            request_id_var.reset(token)
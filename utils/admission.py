@@ -0,0 +1,112 @@
+# utils/admission.py
+"""
+Admission control / load shedding.
+
+Every request is put in a route class by method + path (before routing, so
+a rejected request costs almost nothing):
+
+  critical   /livez /readyz /metrics /api/health,  never limited or shed
+             CORS preflights (OPTIONS)
+  static     /static/...                           limited, never shed
+  pages      landing, blog, privacy, quote form    limited, never shed
+  expensive  logins, registration, uploads,        limited, shed on lag
+             post creation, lead exports
+  default    everything else                       limited, shed on lag
+
+A class over its ADMISSION_LIMIT_<CLASS> in-flight requests (0 = no limit)
+gets a fast 503 + Retry-After, and so does a sheddable class while the
+event loop lags more than ADMISSION_SHED_LAG_MS (the loop watchdog's
+smoothed heartbeat latency, so shedding needs LOOP_WATCHDOG_ENABLED).
+
+Exported as http_admission_in_flight{class} and
+http_requests_shed_total{class,reason}.
+"""
+from typing import Dict, Optional
+
+from config.settings import settings
+from utils.json_response import PrecomputedJSON
+from utils.loop_watchdog import loop_watchdog
+from utils.metrics import counter, gauge
+
+admission_in_flight = gauge(
+    "http_admission_in_flight", "Requests in flight per admission class", ("class",))
+requests_shed = counter(
+    "http_requests_shed_total", "Requests rejected by admission control", ("class", "reason"))
+
+_BUSY = PrecomputedJSON({"detail": "Server is busy, please retry shortly"})
+
+_CRITICAL_PATHS = frozenset({"/livez", "/readyz", "/metrics", "/api/health"})
+_PAGE_PATHS = frozenset({"/", "/blog", "/blog/", "/privacy-policy", "/api/request-quote"})
+_EXPENSIVE = frozenset({
+    ("POST", "/admin/login"),
+    ("POST", "/api/login"),
+    ("POST", "/api/register"),
+    ("POST", "/api/admin/create-admin"),
+    ("POST", "/admin/upload-image"),
+    ("POST", "/admin/create-post"),
+    ("GET", "/api/admin/leads.csv"),
+    ("GET", "/api/admin/leads/archive"),
+})
+
+
+class AdmissionClass:
+    __slots__ = ("name", "limit", "sheddable", "in_flight")
+
+    def __init__(self, name: str, limit: int, sheddable: bool):
+        self.name = name
+        self.limit = limit
+        self.sheddable = sheddable
+        self.in_flight = admission_in_flight.labels(name)
+
+
+def _build_classes() -> Dict[str, AdmissionClass]:
+    return {
+        "critical": AdmissionClass("critical", 0, False),
+        "static": AdmissionClass("static", settings.ADMISSION_LIMIT_STATIC, False),
+        "pages": AdmissionClass("pages", settings.ADMISSION_LIMIT_PAGES, False),
+        "expensive": AdmissionClass("expensive", settings.ADMISSION_LIMIT_EXPENSIVE, True),
+        "default": AdmissionClass("default", settings.ADMISSION_LIMIT_DEFAULT, True),
+    }
+
+
+def classify(method: str, path: str) -> str:
+    if method == "OPTIONS" or path in _CRITICAL_PATHS:
+        return "critical"
+    if path.startswith("/static/"):
+        return "static"
+    if (method, path) in _EXPENSIVE:
+        return "expensive"
+    if method in ("GET", "HEAD") and (path in _PAGE_PATHS or path.startswith("/blog/")):
+        return "pages"
+    return "default"
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.classes = _build_classes()
+        self._retry_after = {"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)}
+
+    def _reject_reason(self, cls: AdmissionClass) -> Optional[str]:
+        if cls.sheddable and loop_watchdog.lag_ms > settings.ADMISSION_SHED_LAG_MS:
+            return "lag"
+        if cls.limit and cls.in_flight.value >= cls.limit:
+            return "concurrency"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        cls = self.classes[classify(scope["method"], scope["path"])]
+        reason = self._reject_reason(cls)
+        if reason is not None:
+            requests_shed.labels(cls.name, reason).inc()
+            response = _BUSY.response(status_code=503, headers=self._retry_after)
+            return await response(scope, receive, send)
+
+        cls.in_flight.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            cls.in_flight.dec()
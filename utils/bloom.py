@@ -0,0 +1,77 @@
+# utils/bloom.py
+import hashlib
+import math
+import time
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over str keys. `might_contain` never returns a
+    false negative; false positives happen at roughly `error_rate` once
+    `capacity` keys have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # double hashing: h1 + i*h2 from one 128-bit digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+
+class RotatingBloomFilter:
+    """
+    Two generations of BloomFilter, swapped every `window_seconds`, so keys
+    are forgotten after one to two windows instead of filling the filter.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, window_seconds: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.window_seconds = window_seconds
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = BloomFilter(capacity, error_rate)
+        self._rotated_at = time.monotonic()
+
+    def _maybe_rotate(self) -> None:
+        now = time.monotonic()
+        if now - self._rotated_at >= self.window_seconds:
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate)
+            self._rotated_at = now
+
+    def add(self, key: str) -> None:
+        self._maybe_rotate()
+        self._current.add(key)
+
+    def might_contain(self, key: str) -> bool:
+        self._maybe_rotate()
+        return self._current.might_contain(key) or self._previous.might_contain(key)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._current.size_bytes + self._previous.size_bytes
+
+    @property
+    def count(self) -> int:
+        return self._current.count + self._previous.count
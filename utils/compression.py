@@ -0,0 +1,305 @@
+# utils/compression.py
+"""
+Response compression (brotli / gzip).
+
+The encoding is negotiated from Accept-Encoding: br when the `brotli`
+package is installed and the client takes it, else gzip. A response is
+left alone when it is smaller than COMPRESSION_MIN_BYTES, isn't a text-like
+type (images, fonts, archives are already compressed), already has a
+Content-Encoding, is a HEAD / 204 / 206 / 304, or says `no-transform`.
+
+Responses with an ETag (static files) are the same bytes every time, so
+their compressed variants are memoized by (path, ETag, encoding) in a
+byte-bounded LRU (COMPRESSION_CACHE_MAX_BYTES) and the ETag is sent weak,
+which still matches If-None-Match. Rendered pages have no ETag and are compressed per
+request. Bodies of COMPRESSION_THREAD_MIN_BYTES or more are compressed in
+the default executor instead of on the event loop.
+
+A body sent in one message is compressed whole and gets a Content-Length.
+Streaming bodies (more_body) are never buffered: each chunk is compressed
+and flushed as it arrives (gzip Z_SYNC_FLUSH / brotli flush), and the
+response goes out chunked, so exports like /api/admin/leads.csv keep their
+constant memory and first-byte latency.
+
+Exported as http_compression_cpu_seconds_total{encoding},
+http_compression_ratio{encoding} and cache_lookups_total{cache="compressed"}.
+"""
+import asyncio
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from config.settings import settings
+from utils.memory import register_cache
+from utils.metrics import counter, histogram
+from utils.single_flight import cache_lookups
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+compression_cpu = counter(
+    "http_compression_cpu_seconds_total", "CPU time spent compressing responses",
+    ("encoding",))
+compression_ratio = histogram(
+    "http_compression_ratio", "Compressed / original size of compressed responses",
+    ("encoding",), buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0))
+
+_COMPRESSIBLE_TYPES = re.compile(
+    rb"^(text/|application/(json|javascript|xml|xhtml\+xml|manifest\+json|ld\+json)"
+    rb"|image/svg\+xml|[\w.-]+/[\w.-]+\+(json|xml))")
+_SKIP_STATUSES = frozenset({204, 206, 304})
+_ACCEPT_ENCODING = b"accept-encoding"
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts ("br" / "gzip"), or None."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Encoder:
+    """Incremental compressor for one response; tracks CPU time and sizes."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits 31: gzip container
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+        self.cpu = 0.0
+        self.size_in = 0
+        self.size_out = 0
+
+    def _run(self, chunk: bytes, final: bool) -> bytes:
+        start = time.thread_time()
+        if self.encoding == "br":
+            data = self._compressor.process(chunk)
+            data += self._compressor.finish() if final else self._compressor.flush()
+        else:
+            data = self._compressor.compress(chunk)
+            data += self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        self.cpu += time.thread_time() - start
+        return data
+
+    async def feed(self, chunk: bytes, final: bool) -> bytes:
+        """Compress `chunk` and flush, so everything fed so far can be decoded."""
+        if not chunk and not final:
+            return b""
+        self.size_in += len(chunk)
+        if len(chunk) >= settings.COMPRESSION_THREAD_MIN_BYTES:
+            data = await asyncio.get_running_loop().run_in_executor(None, self._run, chunk, final)
+        else:
+            data = self._run(chunk, final)
+        self.size_out += len(data)
+        if final:
+            compression_cpu.labels(self.encoding).inc(self.cpu)
+            if self.size_in:
+                compression_ratio.labels(self.encoding).observe(self.size_out / self.size_in)
+        return data
+
+
+class CompressedVariants:
+    """LRU of compressed bodies keyed by (path, ETag, encoding), bounded in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._hits = cache_lookups.labels("compressed", "hit")
+        self._misses = cache_lookups.labels("compressed", "miss")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        data = self._entries.get(key)
+        if data is None:
+            self._misses.inc()
+            return None
+        self._entries.move_to_end(key)
+        self._hits.inc()
+        return data
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+compressed_variants = CompressedVariants(settings.COMPRESSION_CACHE_MAX_BYTES)
+register_cache("compressed_variants", lambda: len(compressed_variants))
+
+
+async def compress(encoding: str, body: bytes) -> bytes:
+    return await _Encoder(encoding).feed(body, final=True)
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _compressible(status: int, headers: List[Tuple[bytes, bytes]]) -> bool:
+    if status < 200 or status in _SKIP_STATUSES:
+        return False
+    if _header(headers, b"content-encoding") is not None:
+        return False
+    content_type = _header(headers, b"content-type")
+    if content_type is None or not _COMPRESSIBLE_TYPES.match(content_type.lower()):
+        return False
+    cache_control = _header(headers, b"cache-control")
+    if cache_control is not None and b"no-transform" in cache_control.lower():
+        return False
+    length = _header(headers, b"content-length")
+    return length is None or int(length) >= settings.COMPRESSION_MIN_BYTES
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    out = []
+    vary = None
+    for key, value in headers:
+        if key.lower() == b"vary":
+            vary = value
+        else:
+            out.append((key, value))
+    if vary is None:
+        vary = b"Accept-Encoding"
+    elif b"accept-encoding" not in vary.lower() and vary.strip() != b"*":
+        vary += b", Accept-Encoding"
+    out.append((b"vary", vary))
+    return out
+
+
+def _compressed_headers(headers: List[Tuple[bytes, bytes]], encoding: str,
+                        length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+    """Headers for the encoded body; no Content-Length (chunked) if `length` is None."""
+    out = []
+    for key, value in _add_vary(headers):
+        lower = key.lower()
+        if lower == b"content-length":
+            continue
+        if lower == b"etag" and not value.startswith(b"W/"):
+            value = b"W/" + value
+        out.append((key, value))
+    out.append((b"content-encoding", encoding.encode("ascii")))
+    if length is not None:
+        out.append((b"content-length", str(length).encode("ascii")))
+    return out
+
+
+def _varies(headers: List[Tuple[bytes, bytes]]) -> bool:
+    """Could this response have been sent compressed to another client?"""
+    content_type = _header(headers, b"content-type")
+    return (content_type is not None and _COMPRESSIBLE_TYPES.match(content_type.lower())
+            and _header(headers, b"content-encoding") is None)
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        accept = _header(scope["headers"], _ACCEPT_ENCODING)
+        encoding = negotiate(accept.decode("latin-1")) if accept else None
+
+        start_message = None
+        encoder: Optional[_Encoder] = None  # set once a streaming body starts
+        streamed: Optional[List[bytes]] = []  # compressed chunks kept for the memo
+        passthrough = False
+        done = False  # served from the memo; the app's body is discarded
+        memo_key = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, streamed, passthrough, done, memo_key
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                if encoding is not None and _compressible(message["status"], headers):
+                    etag = _header(headers, b"etag")
+                    if etag is not None:
+                        memo_key = (scope["path"], etag.removeprefix(b"W/"), encoding)
+                        data = compressed_variants.get(memo_key)
+                        if data is not None:
+                            done = True
+                            message["headers"] = _compressed_headers(headers, encoding, len(data))
+                            await send(message)
+                            await send({"type": "http.response.body", "body": data})
+                            return
+                    start_message = message
+                    return
+                passthrough = True
+                if _varies(headers):
+                    message["headers"] = _add_vary(headers)
+                await send(message)
+                return
+            if done:
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = list(start_message["headers"])
+
+            if encoder is None and not more_body:
+                # the whole body in one message
+                if len(body) < settings.COMPRESSION_MIN_BYTES:
+                    start_message["headers"] = _add_vary(headers)
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                data = await compress(encoding, body)
+                if memo_key is not None:
+                    compressed_variants.put(memo_key, data)
+                start_message["headers"] = _compressed_headers(headers, encoding, len(data))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": data})
+                return
+
+            if encoder is None:
+                encoder = _Encoder(encoding)
+                start_message["headers"] = _compressed_headers(headers, encoding, None)
+                await send(start_message)
+            data = await encoder.feed(body, final=not more_body)
+            if memo_key is not None and streamed is not None:
+                streamed.append(data)
+                if encoder.size_out > compressed_variants.max_bytes:
+                    streamed = None
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+            if not more_body and memo_key is not None and streamed is not None:
+                compressed_variants.put(memo_key, b"".join(streamed))
+
+        await self.app(scope, receive, send_wrapper)
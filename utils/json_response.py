@@ -0,0 +1,90 @@
+# utils/json_response.py
+"""
+JSON responses straight from MongoDB documents.
+
+MongoJSONResponse (the app's default response class) encodes ObjectId,
+datetime, Decimal128, Binary etc. in one pass with orjson - no
+jsonable_encoder walk, no str()/isoformat() pre-pass in the routes. Falls
+back to the stdlib encoder (same output format) when orjson isn't installed.
+
+PrecomputedJSON holds the encoded bytes of a payload that never changes
+(e.g. the contact form's success message) so it is serialized once at import.
+"""
+import base64
+import json
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Mapping, Optional
+
+from bson import Binary, Decimal128, ObjectId, Timestamp
+from fastapi.responses import JSONResponse, Response
+
+from utils.request_timing import record_phase
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Mongo / stdlib types the encoder doesn't handle natively."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (Binary, bytes, bytearray, memoryview)):
+        if isinstance(obj, Binary) and obj.subtype in (3, 4):
+            return str(obj.as_uuid(obj.subtype))
+        return base64.b64encode(bytes(obj)).decode("ascii")
+    if isinstance(obj, Timestamp):
+        return obj.as_datetime().isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    # stdlib fallback only; orjson handles these itself
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(content: Any) -> bytes:
+        return json.dumps(content, default=_default, ensure_ascii=False,
+                          allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class MongoJSONResponse(JSONResponse):
+    """Drop-in for JSONResponse that accepts raw Mongo documents."""
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = dumps(content)
+        record_phase("ser", time.perf_counter() - start)
+        return body
+
+
+class PrecomputedJSON:
+    """A constant JSON payload, encoded once; `response()` reuses the bytes."""
+
+    __slots__ = ("content", "body")
+
+    def __init__(self, content: Any):
+        self.content = content
+        self.body = dumps(content)
+
+    def response(self, status_code: int = 200,
+                 headers: Optional[Mapping[str, str]] = None) -> Response:
+        return Response(content=self.body, status_code=status_code,
+                        headers=dict(headers) if headers else None,
+                        media_type="application/json")
@@ -0,0 +1,189 @@
+# utils/log_setup.py
+"""
+Non-blocking logging.
+
+`setup_logging()` puts one QueueHandler on the root logger. Records are
+handed to a background QueueListener that formats them (JSON by default,
+LOG_FORMAT=text for local runs) and writes to stdout, so a slow stdout or
+an error storm never stalls the event loop:
+
+  * the queue is bounded (LOG_QUEUE_SIZE); when it is full records are
+    dropped and counted instead of blocking the caller
+  * identical WARNING+ records (same logger, message template and
+    exception type) are let through once per LOG_DEDUP_SECONDS; the next
+    one carries "suppressed": <n>
+  * every record carries the current request id (`request_id_var`, set by
+    utils/access_log.py)
+
+Tracebacks are formatted on the listener thread, not the caller's.
+uvicorn's own loggers are routed through the same queue. serve.py workers
+call `stop_logging()` before exiting so the queue is drained.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+from utils.json_response import dumps
+from utils.log_throttle import LogThrottle
+from utils.metrics import counter
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+log_records_dropped = counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full").labels()
+log_records_suppressed = counter(
+    "log_records_suppressed_total", "Repeated log records collapsed by deduplication").labels()
+
+# attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+
+def _extras(record: logging.LogRecord) -> Dict[str, Any]:
+    return {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_extras(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        try:
+            return dumps(entry).decode("utf-8")
+        except TypeError:  # an `extra=` value the encoder doesn't know
+            return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Classic one-line format, with request id and extras appended."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = _extras(record)
+        if extras:
+            first, sep, rest = line.partition("\n")
+            line = f"{first} {json.dumps(extras, default=str)}{sep}{rest}"
+        return line
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the caller's request id (runs in the caller's context)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = request_id_var.get()
+        if request_id is not None and not hasattr(record, "request_id"):
+            record.request_id = request_id
+        return True
+
+
+class DedupFilter(logging.Filter):
+    """Collapse identical WARNING+ records to one per `interval` seconds."""
+
+    def __init__(self, interval: float):
+        super().__init__()
+        self._throttle = LogThrottle(interval)
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else ""
+        key = f"{record.name}\0{record.msg}\0{exc_type}"
+        with self._lock:
+            allowed, suppressed = self._throttle.allow(key)
+        if not allowed:
+            log_records_suppressed.inc()
+            return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may be mutated after we return) but leave
+        # exc_info for the listener thread to format
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _formatter() -> logging.Formatter:
+    return TextFormatter() if settings.LOG_FORMAT == "text" else JsonFormatter()
+
+
+def _start_listener() -> None:
+    global _listener
+    _queue_handler.queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(_formatter())
+    _listener = QueueListener(_queue_handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def setup_logging() -> None:
+    """Install the queue handler on the root logger (idempotent)."""
+    global _queue_handler
+    if _queue_handler is not None:
+        return
+    _queue_handler = DroppingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(ContextFilter())
+    _queue_handler.addFilter(DedupFilter(settings.LOG_DEDUP_SECONDS))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.LOG_LEVEL)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uv_logger = logging.getLogger(name)
+        uv_logger.handlers.clear()
+        uv_logger.propagate = True
+
+    _start_listener()
+    atexit.register(stop_logging)
+    # the listener thread doesn't survive fork(); serve.py workers get a new one
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_start_listener)
+
+
+def stop_logging() -> None:
+    """Write out everything still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:  # no room for the sentinel; the thread is a daemon
+            pass
+        _listener = None
@@ -0,0 +1,30 @@
+# utils/log_throttle.py
+import time
+from typing import Dict, Tuple
+
+
+class LogThrottle:
+    """
+    Lets one message per key through every `interval_seconds` and counts
+    what it held back, so a failing dependency logs once per interval
+    ("... (12 similar suppressed)") instead of on every probe.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        # key -> (last logged at, suppressed since)
+        self._state: Dict[str, Tuple[float, int]] = {}
+
+    def allow(self, key: str) -> Tuple[bool, int]:
+        """Return (should log, number of messages suppressed since the last one)."""
+        now = time.monotonic()
+        last, suppressed = self._state.get(key, (None, 0))
+        if last is None or now - last >= self.interval_seconds:
+            self._state[key] = (now, 0)
+            return True, suppressed
+        self._state[key] = (last, suppressed + 1)
+        return False, suppressed + 1
+
+    def reset(self, key: str) -> bool:
+        """Forget `key` (e.g. once the dependency recovers); True if it was tracked."""
+        return self._state.pop(key, None) is not None
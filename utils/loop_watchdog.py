@@ -0,0 +1,212 @@
+# utils/loop_watchdog.py
+"""
+Event-loop blocking watchdog.
+
+A daemon thread posts a heartbeat callback to the loop every
+LOOP_WATCHDOG_INTERVAL_MS. If the callback hasn't run after
+LOOP_WATCHDOG_THRESHOLD_MS, something is holding the loop (sync bcrypt,
+MIME building, blocking I/O ...): the thread grabs the loop thread's stack
+from sys._current_frames() and records the block: its duration (a lower
+bound, final once the heartbeat lands), the innermost frame in our own code
+("site") and, when the stack belongs to a request, its route.
+
+LoopWatchdogMiddleware registers each request's frame so a captured stack
+can be tied to the route that was running. It must sit inside any
+@app.middleware("http") middleware so it runs in the endpoint's task. With
+LOOP_WATCHDOG_STRICT (test mode) a request that blocked the loop raises
+LoopBlockedError once its response has been sent, failing the test that
+made it.
+
+Exposed as event_loop_block_seconds{route} / event_loop_blocks_total{route,site}.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from config.settings import settings
+from utils.log_throttle import LogThrottle
+from utils.memory import register_cache
+from utils.metrics import counter, gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+UNATTRIBUTED = "<none>"
+_THIS_FILE = os.path.abspath(__file__)
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(_THIS_FILE))
+_STACK_LIMIT = 40
+_LAG_SMOOTHING = 0.2  # EWMA weight of the newest heartbeat
+
+loop_block_seconds = histogram(
+    "event_loop_block_seconds", "Event loop stalls over the watchdog threshold",
+    ("route",), buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+loop_blocks = counter(
+    "event_loop_blocks_total", "Event loop stalls by route and blocking code site",
+    ("route", "site"))
+loop_lag_seconds = gauge(
+    "event_loop_lag_seconds", "Smoothed heartbeat latency of the event loop").labels()
+
+
+class LoopBlockedError(RuntimeError):
+    """Raised in strict mode when a request blocked the event loop."""
+
+
+def _is_own_code(filename: str) -> bool:
+    return (filename.startswith(_PROJECT_ROOT) and filename != _THIS_FILE
+            and "site-packages" not in filename)
+
+
+def _site(stack: traceback.StackSummary) -> str:
+    """Innermost frame in this project (else the innermost frame at all)."""
+    for entry in reversed(stack):
+        if _is_own_code(entry.filename):
+            break
+    else:
+        entry = stack[-1]
+    return f"{os.path.relpath(entry.filename, _PROJECT_ROOT)}:{entry.lineno} {entry.name}"
+
+
+class LoopWatchdog:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # request frame -> (scope, blocks recorded against it)
+        self._requests: Dict[Any, tuple] = {}
+        self._warnings = LogThrottle(settings.HEALTH_FAILURE_LOG_INTERVAL_SECONDS)
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=50)
+        # smoothed heartbeat latency; what admission control sheds on
+        self.lag_ms = 0.0
+
+    # -- loop side -------------------------------------------------------
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=1)
+        self._thread = None
+        self.lag_ms = 0.0
+
+    def track(self, frame, scope) -> List[Dict[str, Any]]:
+        blocks: List[Dict[str, Any]] = []
+        self._requests[frame] = (scope, blocks)
+        return blocks
+
+    def untrack(self, frame) -> None:
+        self._requests.pop(frame, None)
+
+    # -- watchdog thread -------------------------------------------------
+    def _attribute(self, frame):
+        while frame is not None:
+            tracked = self._requests.get(frame)
+            if tracked is not None:
+                return tracked
+            frame = frame.f_back
+        return None
+
+    def _capture(self):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None, None
+        tracked = self._attribute(frame)
+        stack = traceback.StackSummary.extract(
+            traceback.walk_stack(frame), limit=_STACK_LIMIT, lookup_lines=False)
+        stack.reverse()
+        return stack, tracked
+
+    def _open_block(self, elapsed: float, stack, tracked) -> Dict[str, Any]:
+        """
+        Record the block as soon as it is seen, so a strict-mode request
+        finds it even if it finishes before the heartbeat lands.
+        """
+        route = UNATTRIBUTED
+        if tracked is not None:
+            scope = tracked[0]
+            route = scope["route"].path if scope.get("route") is not None else scope.get("path")
+        block = {"at": time.time(), "duration_ms": round(elapsed * 1000, 1),
+                 "route": route, "site": _site(stack) if stack else UNATTRIBUTED}
+        self.recent.append(block)
+        if tracked is not None:
+            tracked[1].append(block)
+        return block
+
+    def _observe_lag(self, seconds: float) -> None:
+        self.lag_ms += _LAG_SMOOTHING * (seconds * 1000 - self.lag_ms)
+        loop_lag_seconds.set(self.lag_ms / 1000)
+
+    def _close_block(self, block: Dict[str, Any], duration: float, stack) -> None:
+        block["duration_ms"] = round(duration * 1000, 1)
+        loop_block_seconds.labels(block["route"]).observe(duration)
+        loop_blocks.labels(block["route"], block["site"]).inc()
+
+        allowed, suppressed = self._warnings.allow(block["site"])
+        if allowed:
+            logger.warning(
+                "Event loop blocked for %.0f ms (route %s) at %s%s\n%s",
+                duration * 1000, block["route"], block["site"],
+                f" ({suppressed} similar suppressed)" if suppressed else "",
+                "".join(stack.format()) if stack else "")
+
+    def _run(self) -> None:
+        threshold = settings.LOOP_WATCHDOG_THRESHOLD_MS / 1000
+        interval = settings.LOOP_WATCHDOG_INTERVAL_MS / 1000
+        beat = threading.Event()
+        while not self._stop.wait(interval):
+            beat.clear()
+            sent = time.monotonic()
+            try:
+                self._loop.call_soon_threadsafe(beat.set)
+            except RuntimeError:  # loop closed
+                return
+            if beat.wait(threshold):
+                self._observe_lag(time.monotonic() - sent)
+                continue
+            stack, tracked = self._capture()
+            block = self._open_block(time.monotonic() - sent, stack, tracked)
+            while not beat.wait(interval):
+                if self._stop.is_set() or self._loop.is_closed():
+                    return
+            duration = time.monotonic() - sent
+            self.lag_ms = duration * 1000  # a stall counts in full, then decays
+            loop_lag_seconds.set(duration)
+            self._close_block(block, duration, stack)
+
+
+loop_watchdog = LoopWatchdog()
+register_cache("loop_watchdog_recent", lambda: len(loop_watchdog.recent))
+
+
+class LoopWatchdogMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        frame = sys._getframe()
+        blocks = loop_watchdog.track(frame, scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            loop_watchdog.untrack(frame)
+        if blocks and settings.LOOP_WATCHDOG_STRICT:
+            worst = max(blocks, key=lambda b: b["duration_ms"])
+            raise LoopBlockedError(
+                f"{scope['method']} {worst['route']} blocked the event loop for "
+                f"{worst['duration_ms']:.0f} ms at {worst['site']}")
@@ -0,0 +1,139 @@
+# utils/memory.py
+"""
+Memory introspection for the admin API (/api/admin/memory/...).
+
+* tracemalloc can be started / stopped at runtime; named snapshots are
+  kept in memory (at most MEMORY_MAX_SNAPSHOTS, oldest dropped) and diffed
+  by file or by file:line.
+* Modules register their in-process caches with `register_cache(name,
+  size_fn)` so their current sizes can be listed alongside RSS.
+* `type_counts()` counts live gc-tracked objects per type, which is how
+  lingering UploadFile / SpooledTemporaryFile buffers show up.
+
+The slow calls (snapshots, diffs, object counts) are run in the default
+executor by routes/admin.py, so `_snapshots` is guarded by a lock. State
+is per process: under serve.py each worker has its own tracemalloc and
+snapshots. Meant for occasional admin use, not for polling.
+"""
+import gc
+import os
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import settings
+from utils.procstats import memory_info
+
+_CACHES: Dict[str, Callable[[], int]] = {}
+_snapshots: "OrderedDict[str, tuple]" = OrderedDict()  # name -> (taken_at, Snapshot)
+_snapshots_lock = threading.Lock()
+
+# tracemalloc's own bookkeeping and the import machinery are noise in diffs
+_NOISE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def register_cache(name: str, size: Callable[[], int]) -> None:
+    """Report `size()` (entries) under `name` in the memory summary."""
+    _CACHES[name] = size
+
+
+def cache_sizes() -> Dict[str, Optional[int]]:
+    sizes: Dict[str, Optional[int]] = {}
+    for name, size in _CACHES.items():
+        try:
+            sizes[name] = size()
+        except Exception:
+            sizes[name] = None
+    return sizes
+
+
+def summary() -> Dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "process": memory_info(os.getpid()),
+        "tracemalloc": {"tracing": tracing,
+                        "frames": tracemalloc.get_traceback_limit() if tracing else None,
+                        "traced_bytes": current, "peak_bytes": peak},
+        "snapshots": [{"name": name, "taken_at": taken_at}
+                      for name, (taken_at, _) in list(_snapshots.items())],
+        "caches": cache_sizes(),
+        "gc": {"counts": gc.get_count(), "frozen": gc.get_freeze_count()},
+    }
+
+
+def start_tracing(frames: int = 1) -> None:
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    tracemalloc.start(frames)
+
+
+def stop_tracing() -> None:
+    """Stop tracing and drop the snapshots (they pin a lot of memory)."""
+    tracemalloc.stop()
+    with _snapshots_lock:
+        _snapshots.clear()
+
+
+def take_snapshot(name: str) -> Dict[str, Any]:
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_NOISE)
+    with _snapshots_lock:
+        _snapshots.pop(name, None)
+        _snapshots[name] = (datetime.utcnow().isoformat(), snapshot)
+        while len(_snapshots) > settings.MEMORY_MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return {"name": name, "traces": len(snapshot.traces)}
+
+
+def _snapshot(name: str):
+    with _snapshots_lock:
+        if name not in _snapshots:
+            raise KeyError(name)
+        return _snapshots[name][1]
+
+
+def _stat_json(stat) -> Dict[str, Any]:
+    frames = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    entry = {"where": frames[0] if len(frames) == 1 else frames,
+             "size_bytes": stat.size, "count": stat.count}
+    if hasattr(stat, "size_diff"):
+        entry["size_diff_bytes"] = stat.size_diff
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+
+def diff(base: str, against: Optional[str] = None, group_by: str = "lineno",
+         limit: int = 25) -> List[Dict[str, Any]]:
+    """
+    Top `limit` allocation changes from snapshot `base` to snapshot
+    `against` (default: a fresh snapshot), biggest growth first.
+    """
+    old = _snapshot(base)
+    if against is None:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        new = tracemalloc.take_snapshot().filter_traces(_NOISE)
+    else:
+        new = _snapshot(against)
+    stats = new.compare_to(old, group_by)
+    return [_stat_json(stat) for stat in stats[:limit]]
+
+
+def top(name: str, group_by: str = "lineno", limit: int = 25) -> List[Dict[str, Any]]:
+    stats = _snapshot(name).statistics(group_by)
+    return [_stat_json(stat) for stat in stats[:limit]]
+
+
+def type_counts(limit: int = 30) -> List[Dict[str, Any]]:
+    counts = Counter(type(obj) for obj in gc.get_objects())
+    return [{"type": f"{cls.__module__}.{cls.__qualname__}", "count": n}
+            for cls, n in counts.most_common(limit)]
@@ -0,0 +1,208 @@
+# utils/metrics.py
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds (1ms .. 10s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. `observe` is a bisect plus a few integer adds;
+    under the GIL a lost update from a racing thread only skews one sample.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)  # last = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+        }
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+# ------------------------------------------------------------------------
+# Labelled families + Prometheus text exposition (served by GET /metrics)
+# ------------------------------------------------------------------------
+_REGISTRY: List["MetricFamily"] = []
+# callables yielding exposition lines for metrics kept elsewhere
+# (e.g. the pymongo listeners in utils/mongo_monitoring.py)
+_COLLECTORS: List[Callable[[], Iterable[str]]] = []
+_CONSTANT_LABELS: Dict[str, Any] = {}
+
+
+class MetricFamily:
+    """
+    A metric plus its label sets. `labels(...)` is one dict lookup once a
+    label set has been seen; the returned child is then updated without
+    locks or allocation (same GIL caveat as Histogram).
+    """
+
+    __slots__ = ("kind", "name", "help", "labelnames", "_factory", "_children")
+
+    def __init__(self, kind: str, name: str, help: str,
+                 labelnames: Sequence[str] = (), factory: Callable[[], Any] = Counter):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        _REGISTRY.append(self)
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._factory())
+        return child
+
+    def expose(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            if self.kind == "histogram":
+                yield from histogram_lines(self.name, labels, child)
+            else:
+                yield f"{self.name}{format_labels(labels)} {_format_value(child.value)}"
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+    return MetricFamily("counter", name, help, labelnames, Counter)
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+    return MetricFamily("gauge", name, help, labelnames, Gauge)
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+    return MetricFamily("histogram", name, help, labelnames, lambda: Histogram(buckets))
+
+
+def register_collector(collect: Callable[[], Iterable[str]]) -> None:
+    _COLLECTORS.append(collect)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def set_constant_labels(**labels: Any) -> None:
+    """
+    Labels added to every exposed sample, e.g. worker="2" in a serve.py
+    worker: each worker keeps its own counters and a scrape reaches one of
+    them at random, so without it the series would jump between scrapes.
+    """
+    _CONSTANT_LABELS.clear()
+    _CONSTANT_LABELS.update(labels)
+
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    if _CONSTANT_LABELS:
+        labels = {**_CONSTANT_LABELS, **labels}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        return repr(value) if value == value and abs(value) != float("inf") else str(value)
+    return str(value)
+
+
+def histogram_lines(name: str, labels: Dict[str, Any], hist: Histogram) -> Iterator[str]:
+    """Exposition lines for one Histogram (cumulative buckets, _sum, _count)."""
+    cumulative = 0
+    for bound, n in zip(hist.buckets, hist.counts):
+        cumulative += n
+        yield f"{name}_bucket{format_labels({**labels, 'le': repr(float(bound))})} {cumulative}"
+    yield f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {hist.count}"
+    yield f"{name}_sum{format_labels(labels)} {_format_value(float(hist.sum))}"
+    yield f"{name}_count{format_labels(labels)} {hist.count}"
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for family in list(_REGISTRY):
+        lines.extend(family.expose())
+    for collect in list(_COLLECTORS):
+        lines.extend(collect())
+    lines.append("")
+    return "\n".join(lines)
+
+
+@contextmanager
+def timed(hist: Histogram, failures: Optional[Counter] = None):
+    """Observe the block's wall time; count it in `failures` if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if failures is not None:
+            failures.inc()
+        raise
+    finally:
+        hist.observe(time.perf_counter() - start)
+
+
+# App-level metrics; recorded where the work happens
+http_request_seconds = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"))
+http_requests_in_flight = gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ("method",))
+template_render_seconds = histogram(
+    "template_render_seconds", "Jinja2 render time per template", ("template",))
+smtp_send_seconds = histogram(
+    "smtp_send_duration_seconds", "SMTP send time", ("kind",))
+smtp_send_failures = counter(
+    "smtp_send_failures_total", "SMTP sends that raised", ("kind",))
+bcrypt_seconds = histogram(
+    "bcrypt_duration_seconds", "bcrypt hash / verify time", ("op",))
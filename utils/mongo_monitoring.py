@@ -0,0 +1,340 @@
+# utils/mongo_monitoring.py
+"""
+pymongo event listeners registered by db.connect_to_mongo.
+
+PoolMetricsListener tracks, per server address: open / checked-out
+connections, connection churn (created / closed by reason) and how long
+operations waited to check out a connection.
+
+CommandMetricsListener keeps a latency histogram per (command, collection),
+logs slow commands with a redacted filter shape (plus the winning plan,
+via a throttled background explain) and charges every command to the
+RequestDbStats of the request that issued it. Motor copies contextvars into
+its executor threads, so `current_db_stats` set by the HTTP middleware is
+visible from the listener callbacks.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+from config.settings import settings
+from utils.metrics import Histogram, format_labels, histogram_lines, register_collector
+
+logger = logging.getLogger(__name__)
+
+
+class _PoolStats:
+    __slots__ = ("open", "checked_out", "created", "closed", "closed_reasons",
+                 "checkout_failed", "cleared", "checkout_wait")
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.created = 0
+        self.closed = 0
+        self.closed_reasons: Dict[str, int] = defaultdict(int)
+        self.checkout_failed = 0
+        self.cleared = 0
+        self.checkout_wait = Histogram()
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.pools: Dict[str, _PoolStats] = defaultdict(_PoolStats)
+
+    def _stats(self, event) -> _PoolStats:
+        host, port = event.address
+        return self.pools[f"{host}:{port}"]
+
+    # pool lifecycle
+    def pool_created(self, event):
+        self._stats(event)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._stats(event).cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    # connection lifecycle
+    def connection_created(self, event):
+        stats = self._stats(event)
+        stats.created += 1
+        stats.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        stats = self._stats(event)
+        stats.closed += 1
+        stats.open -= 1
+        stats.closed_reasons[str(event.reason)] += 1
+
+    # checkout
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        stats = self._stats(event)
+        stats.checkout_failed += 1
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            stats.checkout_wait.observe(duration)
+
+    def connection_checked_out(self, event):
+        stats = self._stats(event)
+        stats.checked_out += 1
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            stats.checkout_wait.observe(duration)
+
+    def connection_checked_in(self, event):
+        self._stats(event).checked_out -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            address: {
+                "open": s.open,
+                "checked_out": s.checked_out,
+                "created": s.created,
+                "closed": s.closed,
+                "closed_reasons": dict(s.closed_reasons),
+                "checkout_failed": s.checkout_failed,
+                "cleared": s.cleared,
+                "checkout_wait_seconds": s.checkout_wait.snapshot(),
+            }
+            for address, s in list(self.pools.items())
+        }
+
+
+pool_metrics = PoolMetricsListener()
+
+
+# ------------------------------------------------------------------------
+# Command monitoring
+# ------------------------------------------------------------------------
+class RequestDbStats:
+    """DB round trips and total DB time charged to one request."""
+
+    __slots__ = ("calls", "time")
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+
+
+current_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar(
+    "current_db_stats", default=None)
+
+# Commands whose plan can be explained for the slow-query log
+_EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Parts of a command that describe the query shape
+_SHAPE_KEYS = ("filter", "query", "q", "sort", "projection", "pipeline", "key")
+# Session / cluster bookkeeping that must not be sent inside an explain
+_NON_EXPLAIN_KEYS = {"lsid", "txnNumber", "$clusterTime", "$db", "$readPreference",
+                     "readConcern", "writeConcern", "startTransaction", "autocommit"}
+
+
+# Shape parts whose 1 / -1 values are directions, not user data
+_DIRECTION_KEYS = {"sort", "projection", "key"}
+
+
+def redact_shape(value: Any, keep_directions: bool = False) -> Any:
+    """Replace literal values with '?' while keeping field names and operators."""
+    if isinstance(value, dict):
+        return {k: redact_shape(v, keep_directions) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(v, dict) for v in value):
+            return [redact_shape(v, keep_directions) for v in value]
+        return "?"
+    if keep_directions and value in (1, -1) and not isinstance(value, bool):
+        return value
+    return "?"
+
+
+def summarize_plan(explain: Dict[str, Any]) -> str:
+    """Compact winning-plan summary, e.g. 'LIMIT <- FETCH <- IXSCAN{slug_1}'."""
+    planner = explain.get("queryPlanner") or {}
+    if not planner and explain.get("stages"):
+        # aggregate explain: first stage holds the $cursor plan
+        first = explain["stages"][0]
+        planner = (first.get("$cursor") or {}).get("queryPlanner") or {}
+    stage = planner.get("winningPlan") or {}
+    stage = stage.get("queryPlan", stage)  # SBE plans nest the classic tree
+    parts = []
+    while stage:
+        name = stage.get("stage", "?")
+        if stage.get("indexName"):
+            name += "{" + stage["indexName"] + "}"
+        parts.append(name)
+        stage = stage.get("inputStage") or (stage.get("inputStages") or [None])[0]
+    return " <- ".join(parts) or "unknown"
+
+
+def _collection_of(event) -> str:
+    value = event.command.get(event.command_name)
+    return value if isinstance(value, str) else ""
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    def __init__(self, slow_ms: float = 100.0, explain_slow: bool = True,
+                 explain_interval: float = 300.0):
+        self.slow_seconds = slow_ms / 1000.0
+        self.explain_slow = explain_slow
+        self.explain_interval = explain_interval
+        self.latency: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.failures: Dict[Tuple[str, str], int] = defaultdict(int)
+        # request_id -> (command, collection, db name, command doc, stats)
+        self._inflight: Dict[int, tuple] = {}
+        self._last_explained: Dict[str, float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._explain: Optional[Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop,
+               explain: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> None:
+        """Give the listener a loop + coroutine to run explains of slow queries on."""
+        self._loop = loop
+        self._explain = explain
+
+    def started(self, event):
+        if event.command_name == "explain":
+            return
+        self._inflight[event.request_id] = (
+            event.command_name,
+            _collection_of(event),
+            event.database_name,
+            event.command if event.command_name in _EXPLAINABLE else None,
+            current_db_stats.get(),
+        )
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool) -> None:
+        info = self._inflight.pop(event.request_id, None)
+        if info is None:
+            return
+        name, coll, db_name, command, stats = info
+        seconds = event.duration_micros / 1_000_000
+        self.latency[(name, coll)].observe(seconds)
+        if failed:
+            self.failures[(name, coll)] += 1
+        if stats is not None:
+            stats.calls += 1
+            stats.time += seconds
+        if seconds >= self.slow_seconds:
+            self._log_slow(name, coll, db_name, command, seconds)
+
+    def _log_slow(self, name, coll, db_name, command, seconds) -> None:
+        shape = {k: redact_shape(command[k], k in _DIRECTION_KEYS)
+                 for k in _SHAPE_KEYS if command and k in command}
+        logger.warning("Slow MongoDB %s on %s: %.1f ms shape=%s",
+                       name, coll, seconds * 1000, shape)
+        if not (self.explain_slow and command and self._loop and self._explain):
+            return
+        key = f"{name}:{coll}:{shape}"
+        now = time.monotonic()
+        if now - self._last_explained.get(key, -self.explain_interval) < self.explain_interval:
+            return
+        self._last_explained[key] = now
+        explain_cmd = {k: v for k, v in command.items() if k not in _NON_EXPLAIN_KEYS}
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self._log_plan(db_name, name, coll, explain_cmd), self._loop)
+        except RuntimeError:
+            pass  # loop closed
+
+    async def _log_plan(self, db_name, name, coll, explain_cmd) -> None:
+        try:
+            result = await self._explain(db_name, explain_cmd)
+            logger.warning("Slow MongoDB %s on %s plan: %s",
+                           name, coll, summarize_plan(result))
+        except Exception as exc:
+            logger.info("Could not explain slow %s on %s: %s", name, coll, exc)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            f"{name}:{coll}": {**h.snapshot(), "failures": self.failures.get((name, coll), 0)}
+            for (name, coll), h in list(self.latency.items())
+        }
+
+
+command_metrics = CommandMetricsListener(
+    slow_ms=settings.MONGO_SLOW_QUERY_MS,
+    explain_slow=settings.MONGO_EXPLAIN_SLOW_QUERIES,
+)
+
+
+def _collect_prometheus():
+    """Listener state as Prometheus lines (registered with utils.metrics)."""
+    yield "# HELP mongodb_command_duration_seconds MongoDB command time by collection"
+    yield "# TYPE mongodb_command_duration_seconds histogram"
+    for (name, coll), hist in list(command_metrics.latency.items()):
+        yield from histogram_lines("mongodb_command_duration_seconds",
+                                   {"command": name, "collection": coll}, hist)
+    yield "# HELP mongodb_command_failures_total MongoDB commands that failed"
+    yield "# TYPE mongodb_command_failures_total counter"
+    for (name, coll), n in list(command_metrics.failures.items()):
+        yield f"mongodb_command_failures_total{format_labels({'command': name, 'collection': coll})} {n}"
+
+    pools = list(pool_metrics.pools.items())
+    for metric, attr, kind, help in (
+        ("mongodb_pool_connections_open", "open", "gauge", "Open pool connections"),
+        ("mongodb_pool_connections_checked_out", "checked_out", "gauge", "Connections in use"),
+        ("mongodb_pool_connections_created_total", "created", "counter", "Connections created"),
+        ("mongodb_pool_checkout_failures_total", "checkout_failed", "counter", "Failed checkouts"),
+    ):
+        yield f"# HELP {metric} {help}"
+        yield f"# TYPE {metric} {kind}"
+        for address, stats in pools:
+            yield f"{metric}{format_labels({'address': address})} {getattr(stats, attr)}"
+    yield "# HELP mongodb_pool_checkout_wait_seconds Time waiting to check out a connection"
+    yield "# TYPE mongodb_pool_checkout_wait_seconds histogram"
+    for address, stats in pools:
+        yield from histogram_lines("mongodb_pool_checkout_wait_seconds",
+                                   {"address": address}, stats.checkout_wait)
+
+
+register_collector(_collect_prometheus)
+
+
+# ------------------------------------------------------------------------
+# Query budgets (tests / local profiling)
+# ------------------------------------------------------------------------
+@contextmanager
+def track_db_calls():
+    """Charge DB commands issued inside the block to a fresh RequestDbStats."""
+    stats = RequestDbStats()
+    token = current_db_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_db_stats.reset(token)
+
+
+def assert_query_budget(response, max_queries: int) -> None:
+    """
+    Fail if a response (e.g. from fastapi TestClient, with DB_STATS_HEADERS
+    enabled) reports more DB round trips than `max_queries`.
+        assert_query_budget(client.get("/blog/some-slug"), 1)
+    """
+    calls = response.headers.get("X-DB-Calls")
+    if calls is None:
+        raise AssertionError("response has no X-DB-Calls header (enable DB_STATS_HEADERS)")
+    if int(calls) > max_queries:
+        raise AssertionError(
+            f"{response.request.method} {response.request.url.path} issued "
+            f"{calls} DB queries (budget {max_queries})")
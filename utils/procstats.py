@@ -0,0 +1,61 @@
+# utils/procstats.py
+"""
+Process memory figures for sizing instances (Linux /proc; other platforms
+fall back to getrusage for the current process only).
+
+  rss:            resident set size, counts shared pages in full
+  pss:            proportional share of shared pages (sums correctly
+                  across prefork workers)
+  private_dirty:  pages this process alone has written - what each extra
+                  worker really costs once copy-on-write has kicked in
+"""
+import os
+from typing import Dict, Optional
+
+
+def _read_kb_fields(path: str, wanted) -> Dict[str, int]:
+    fields: Dict[str, int] = {}
+    try:
+        with open(path) as fh:
+            for line in fh:
+                key, _, rest = line.partition(":")
+                if key in wanted:
+                    fields[key] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return fields
+
+
+def memory_info(pid: Optional[int] = None) -> Dict[str, int]:
+    """{"rss", "pss", "private_dirty", "shared"} in bytes; missing keys if unavailable."""
+    pid = pid or os.getpid()
+    rollup = _read_kb_fields(f"/proc/{pid}/smaps_rollup",
+                             ("Rss", "Pss", "Private_Dirty", "Shared_Clean", "Shared_Dirty"))
+    if rollup:
+        return {
+            "rss": rollup.get("Rss", 0),
+            "pss": rollup.get("Pss", 0),
+            "private_dirty": rollup.get("Private_Dirty", 0),
+            "shared": rollup.get("Shared_Clean", 0) + rollup.get("Shared_Dirty", 0),
+        }
+    status = _read_kb_fields(f"/proc/{pid}/status", ("VmRSS",))
+    if status:
+        return {"rss": status["VmRSS"]}
+    if pid == os.getpid():
+        try:
+            import resource
+            import sys
+            # ru_maxrss: peak, KiB on Linux, bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return {"rss": peak if sys.platform == "darwin" else peak * 1024}
+        except ImportError:
+            pass
+    return {}
+
+
+def rss_bytes(pid: Optional[int] = None) -> int:
+    pid = pid or os.getpid()
+    status = _read_kb_fields(f"/proc/{pid}/status", ("VmRSS",))
+    if status:
+        return status["VmRSS"]
+    return memory_info(pid).get("rss", 0)
@@ -0,0 +1,188 @@
+# utils/profiler.py
+"""
+On-demand sampling profiler for single requests.
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>` or is
+picked by PROFILE_SAMPLE_RATE. A helper thread then samples the event-loop
+thread's stack every PROFILE_INTERVAL_MS (CPU-bound code can't be sampled
+faster than the GIL switch interval, 5 ms) until the response is sent and
+writes the result as collapsed stacks (flamegraph.pl / speedscope / inferno
+input) into PROFILE_DIR, keeping only the newest PROFILE_MAX_FILES files.
+
+Samples are attributed to the request only while its own coroutine chain is
+on the stack (the profiler middleware's frame is an ancestor of the sampled
+frame); the rest of the time - waiting on Mongo / SMTP or running other
+requests - is counted as "[awaiting]". Sync (threadpool) endpoints and
+work in child tasks also show up as "[awaiting]".
+
+ProfilerMiddleware is only installed when profiling is enabled, so a
+disabled profiler costs nothing; it must be the innermost middleware so it
+runs in the same task as the endpoint.
+"""
+import asyncio
+import hmac
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from utils.request_timing import sampled
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_SUFFIX = ".collapsed"
+PROFILE_NAME_RE = re.compile(r"^[\w.-]+\.collapsed$")
+AWAITING = "[awaiting]"
+
+_seq = itertools.count(1)
+_active = threading.Lock()  # one profile at a time per process
+
+
+def profiling_enabled() -> bool:
+    return bool(settings.PROFILE_TOKEN) or settings.PROFILE_SAMPLE_RATE > 0
+
+
+def profile_dir() -> Path:
+    return Path(settings.PROFILE_DIR)
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, thread_id: int, anchor, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.anchor = anchor
+        self.interval = interval
+        self.samples = 0
+        self.counts: Counter = Counter()
+        self._done = threading.Event()
+
+    def _stack(self):
+        frame = sys._current_frames().get(self.thread_id)
+        codes = []
+        while frame is not None and frame is not self.anchor:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        return tuple(reversed(codes)) if frame is not None else None
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            self.counts[self._stack()] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+    def collapsed(self, root: str) -> str:
+        lines = []
+        for codes, count in self.counts.items():
+            if codes is None:
+                stack = f"{root};{AWAITING}"
+            else:
+                stack = ";".join([root, *(_frame_label(c) for c in codes)])
+            lines.append(f"{stack} {count}")
+        return "".join(line + "\n" for line in sorted(lines))
+
+
+def _write_profile(name: str, body: str) -> None:
+    """Write one profile and drop the oldest beyond PROFILE_MAX_FILES (blocking)."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = directory / (name + ".tmp")
+    tmp_path.write_text(body, encoding="utf-8")
+    os.replace(tmp_path, directory / name)
+
+    profiles = sorted(directory.glob("*" + PROFILE_SUFFIX))
+    for old in profiles[:-settings.PROFILE_MAX_FILES]:
+        try:
+            old.unlink()
+        except FileNotFoundError:
+            pass  # another worker pruned it first
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in sorted(directory.glob("*" + PROFILE_SUFFIX), reverse=True):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        profiles.append({"name": path.name, "size": stat.st_size,
+                         "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ",
+                                                     time.gmtime(stat.st_mtime))})
+    return profiles
+
+
+def profile_path(name: str) -> Optional[Path]:
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
+
+
+def _slug(route: str) -> str:
+    return re.sub(r"[^\w-]+", "_", route).strip("_") or "root"
+
+
+class ProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._token = settings.PROFILE_TOKEN.encode() if settings.PROFILE_TOKEN else None
+
+    def _requested(self, scope) -> bool:
+        if self._token is not None:
+            for key, value in scope["headers"]:
+                if key == PROFILE_HEADER:
+                    return hmac.compare_digest(value, self._token)
+        return sampled(settings.PROFILE_SAMPLE_RATE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope) \
+                or not _active.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{os.getpid()}-{next(_seq):06d}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()),
+                                      (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = _Sampler(threading.get_ident(), sys._getframe(),
+                           settings.PROFILE_INTERVAL_MS / 1000)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            _active.release()
+            elapsed = time.perf_counter() - start
+
+            route = scope.get("route")
+            label = route.path if route is not None else scope.get("path", "")
+            root = f"{scope['method']} {label}"
+            name = f"{profile_id}-{_slug(label)}{PROFILE_SUFFIX}"
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, _write_profile, name, sampler.collapsed(root))
+                logger.info("Profiled %s in %.1f ms (%d samples): %s",
+                            root, elapsed * 1000, sampler.samples, name)
+            except OSError:
+                logger.exception("Could not write profile %s", name)
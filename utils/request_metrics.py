@@ -0,0 +1,56 @@
+# utils/request_metrics.py
+"""
+ASGI middleware recording request latency per *route template*
+(`/blog/{slug}`, not `/blog/my-post`) and the in-flight request gauge.
+Plain ASGI rather than @app.middleware("http") so it adds no extra
+task / stream per request.
+"""
+import time
+
+from starlette.routing import Mount
+
+from utils.metrics import http_request_seconds, http_requests_in_flight
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._mounts = None  # mount prefixes (/static ...), resolved on first request
+
+    def _route_label(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        if self._mounts is None:
+            self._mounts = tuple(r.path for r in getattr(scope.get("app"), "routes", ())
+                                 if isinstance(r, Mount))
+        path = scope.get("path", "")
+        for prefix in self._mounts:
+            if path.startswith(prefix + "/"):
+                return prefix + "/{path}"
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        in_flight = http_requests_in_flight.labels(method)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            http_request_seconds.labels(method, self._route_label(scope), str(status)) \
+                .observe(time.perf_counter() - start)
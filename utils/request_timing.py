@@ -0,0 +1,68 @@
+# utils/request_timing.py
+"""
+Per-request phase timings for the Server-Timing header.
+
+The HTTP middleware in main.py puts a RequestTimings in `current_timings`
+for sampled requests only; instrumented code calls `record_phase()`, which
+is a single ContextVar lookup when the request isn't sampled.
+
+Phases:
+  db    MongoDB time + round trips (RequestDbStats, fed by the command listener)
+  tpl   Jinja2 rendering (utils.templating.TimedTemplate)
+  ser   JSON encoding (utils.json_response.MongoJSONResponse)
+  app   everything else: routing, validation, Python work in the handler
+"""
+import random
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+
+class RequestTimings:
+    __slots__ = ("phases",)
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "current_timings", default=None)
+
+
+def record_phase(name: str, seconds: float) -> None:
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def sampled(rate: float) -> bool:
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def breakdown(timings: RequestTimings, db_stats, total: float) -> Dict[str, Any]:
+    """Phase durations in ms (plus db call count); `app` is the remainder."""
+    result: Dict[str, Any] = {"total": total * 1000}
+    accounted = 0.0
+    if db_stats is not None:
+        result["db"] = db_stats.time * 1000
+        result["db_calls"] = db_stats.calls
+        accounted += db_stats.time
+    for name, seconds in timings.phases.items():
+        result[name] = seconds * 1000
+        accounted += seconds
+    result["app"] = max(0.0, total - accounted) * 1000
+    return result
+
+
+def server_timing_header(phases: Dict[str, Any]) -> str:
+    parts = []
+    for name, value in phases.items():
+        if name == "db_calls":
+            continue
+        if name == "db":
+            parts.append(f'db;dur={value:.1f};desc="{phases.get("db_calls", 0)} queries"')
+        else:
+            parts.append(f"{name};dur={value:.1f}")
+    return ", ".join(parts)
@@ -3,6 +3,8 @@ import asyncio
 import bcrypt
 from typing import Callable, Any
 
+from utils.metrics import bcrypt_seconds, timed
+
 
 def _run_in_executor(func: Callable[..., Any], *args) -> Any:
     """
@@ -15,7 +17,8 @@ def _run_in_executor(func: Callable[..., Any], *args) -> Any:
 
 async def hash_password(password: str) -> str:
     def _hash(pw: bytes) -> bytes:
-        return bcrypt.hashpw(pw, bcrypt.gensalt())
+        with timed(bcrypt_seconds.labels("hash")):
+            return bcrypt.hashpw(pw, bcrypt.gensalt())
     hashed = await _run_in_executor(_hash, password.encode("utf-8"))
     return hashed.decode("utf-8")
 
@@ -23,7 +26,8 @@ async def hash_password(password: str) -> str:
 async def verify_password(password: str, hashed: str) -> bool:
     def _check(pw: bytes, h: bytes) -> bool:
         try:
-            return bcrypt.checkpw(pw, h)
+            with timed(bcrypt_seconds.labels("verify")):
+                return bcrypt.checkpw(pw, h)
         except Exception:
             return False
     return await _run_in_executor(_check, password.encode("utf-8"), hashed.encode("utf-8"))
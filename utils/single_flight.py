@@ -0,0 +1,140 @@
+# utils/single_flight.py
+"""
+Request coalescing for hot reads.
+
+SingleFlight: concurrent calls for the same key share one in-flight
+awaitable, so a burst of identical reads costs one database round trip.
+A waiter that is cancelled (client went away) doesn't cancel the shared
+load for the others.
+
+SWRCache: a small in-process LRU on top of SingleFlight with
+stale-while-revalidate. A fresh entry is served as is. An expired but
+still-stale-usable entry is served immediately while one background task
+refreshes it. A missing entry is loaded once, however many requests ask
+for it at the same moment. `invalidate()` also discards loads already in
+flight, so a write is never overwritten by the read that raced it.
+
+A `cacheable` predicate keeps some results (e.g. "not found") out of the
+cache; they are still coalesced, and they replace any entry for the key.
+
+Cached values are shared between requests and must be treated as
+read-only. Each worker process has its own cache.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from utils.memory import register_cache
+from utils.metrics import counter
+
+logger = logging.getLogger(__name__)
+
+cache_lookups = counter(
+    "cache_lookups_total", "In-process cache lookups by result "
+    "(hit, stale, miss, coalesced)", ("cache", "result"))
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            future.exception()  # retrieved: waiters may all have gone
+
+    async def do(self, key: Hashable, load: Loader) -> Any:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(load())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        return await asyncio.shield(future)
+
+
+class SWRCache:
+    def __init__(self, name: str, ttl: float, stale_ttl: float, max_entries: int,
+                 cacheable: Optional[Callable[[Any], bool]] = None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.cacheable = cacheable
+        # key -> (value, fresh_until, stale_until)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._flight = SingleFlight()
+        self._generation = 0
+        self._refreshes: Set[asyncio.Task] = set()
+        self._hits = cache_lookups.labels(name, "hit")
+        self._stale = cache_lookups.labels(name, "stale")
+        self._misses = cache_lookups.labels(name, "miss")
+        self._coalesced = cache_lookups.labels(name, "coalesced")
+        register_cache(name, lambda: len(self._entries))
+
+    async def get(self, key: Hashable, load: Loader) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            now = time.monotonic()
+            if now < fresh_until:
+                self._entries.move_to_end(key)
+                self._hits.inc()
+                return value
+            if now < stale_until:
+                self._stale.inc()
+                self._refresh(key, load)
+                return value
+        flight_key = (self._generation, key)
+        if self._flight.in_flight(flight_key):
+            self._coalesced.inc()
+        else:
+            self._misses.inc()
+        return await self._flight.do(flight_key, lambda: self._load(key, load))
+
+    async def _load(self, key: Hashable, load: Loader) -> Any:
+        generation = self._generation
+        value = await load()
+        if self.cacheable is not None and not self.cacheable(value):
+            if generation == self._generation:
+                self._entries.pop(key, None)
+        elif generation == self._generation:
+            now = time.monotonic()
+            self._entries[key] = (value, now + self.ttl, now + self.ttl + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def _refresh(self, key: Hashable, load: Loader) -> None:
+        flight_key = (self._generation, key)
+        if self._flight.in_flight(flight_key):
+            return
+        # run outside the triggering request's context so its DB time isn't
+        # billed to that request
+        task = contextvars.Context().run(
+            asyncio.ensure_future, self._flight.do(flight_key, lambda: self._load(key, load)))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background refresh of %s cache failed: %r",
+                           self.name, task.exception())
+
+    def invalidate(self, key: Hashable = None) -> None:
+        """Drop one key (or everything) and any load already in flight."""
+        self._generation += 1
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
@@ -0,0 +1,36 @@
+# utils/templating.py
+import time
+
+from jinja2 import Template
+
+from utils.memory import register_cache
+from utils.metrics import template_render_seconds
+from utils.request_timing import record_phase
+
+
+class TimedTemplate(Template):
+    """
+    Template that records its render time under its template name, and as
+    the request's "tpl" Server-Timing phase.
+    """
+
+    def render(self, *args, **kwargs) -> str:
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            template_render_seconds.labels(self.name or "<string>").observe(elapsed)
+            record_phase("tpl", elapsed)
+
+
+def instrument_templates(templates, name: str = "main"):
+    """
+    Make a Jinja2Templates instance compile TimedTemplate objects. Call it
+    before any template is loaded (the environment caches compiled ones).
+    Its compiled-template cache is reported as `jinja_<name>`.
+    """
+    env = templates.env
+    env.template_class = TimedTemplate
+    register_cache(f"jinja_{name}", lambda: len(env.cache) if env.cache is not None else 0)
+    return templates